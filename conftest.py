@@ -0,0 +1,18 @@
+# Modules for optional dependencies are skipped during doctest collection
+# when the dependency isn't installed.
+import importlib
+
+OPTIONAL_MODULES = {
+    'etl_toolbox/arrow_functions.py': 'pyarrow',
+    'etl_toolbox/cache_functions.py': 'pyarrow',
+    'etl_toolbox/parquet_functions.py': 'pyarrow',
+    'etl_toolbox/polars_functions.py': 'polars',
+}
+
+collect_ignore = []
+
+for path, dependency in OPTIONAL_MODULES.items():
+    try:
+        importlib.import_module(dependency)
+    except ImportError:
+        collect_ignore.append(path)
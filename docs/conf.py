@@ -27,6 +27,9 @@ extensions = [
     'sphinx.ext.intersphinx',
 ]
 
+# Optional dependencies don't need to be installed to build the docs
+autodoc_mock_imports = ['polars', 'pyarrow']
+
 language = 'en'
 
 master_doc = "index"
@@ -1 +1,160 @@
+'''
+The public functions of every module can be imported from the package:
+
+  >>> from etl_toolbox import clean_null, dataframe_clean_null
+
+Modules are only imported when one of their names is first used, so
+``from etl_toolbox import clean_null`` doesn't import pandas or numpy.
+This needs Python 3.7 or later. On older versions, every module is imported
+with the package.
+'''
+
+import importlib
+import sys
+
 __version__ = '0.0.3'
+
+# The module that each public name is loaded from. Names that are defined in
+# more than one module (like polars_functions.dataframe_clean_null) are
+# exposed from the module that dispatches to the others.
+_LAZY_NAMES = {
+    'arrow_functions': [
+        'arrow_clean_null',
+        'arrow_dataset_clean_null',
+        'arrow_null_mask',
+    ],
+    'cache_functions': [
+        'cached_clean_file',
+        'clear_cache',
+    ],
+    'cleaning_functions': [
+        'FALSEY_INDICATORS',
+        'NULL_INDICATORS',
+        'classify_null',
+        'clean_null',
+        'clean_whitespace',
+        'fingerprint',
+        'fingerprint_hash',
+    ],
+    'database_functions': [
+        'BulkWriter',
+        'ConnectionPool',
+        'write_frame',
+        'write_frames',
+    ],
+    'dataframe_functions': [
+        'BOOLEAN_STRINGS',
+        'CleaningMask',
+        'NullProfile',
+        'coerce_column_types',
+        'dataframe_clean_null',
+        'find_column_labels',
+        'find_duplicate_clusters',
+        'index_is_default',
+        'infer_column_type',
+        'is_polars_frame',
+        'load_cleaning_mask',
+        'merge_columns_by_label',
+        'profile_nulls',
+        'save_cleaning_mask',
+        'unpack_cleaning_mask',
+    ],
+    'file_functions': [
+        'ARCHIVE_SEPARATOR',
+        'get_file_list_from_dir',
+        'iter_archive_members',
+        'open_file',
+        'scan_column_labels',
+        'scan_null_ratios',
+        'shard_file_list',
+        'split_archive_path',
+        'uncompressed_name',
+    ],
+    'ingest_functions': [
+        'clean_file_frame',
+        'ingest_files',
+        'ingest_files_async',
+        'normalize_files',
+        'read_file',
+        'read_json_batches',
+    ],
+    'mapping_functions': [
+        'HashedFingerprintMap',
+        'append_count',
+        'hash_fingerprint_map',
+        'hash_fingerprints',
+        'map_labels',
+        'rename_duplicate_labels',
+    ],
+    'parquet_functions': [
+        'PartitionedParquetWriter',
+        'write_parquet_dataset',
+    ],
+    'partition_functions': [
+        'is_dask_frame',
+        'map_partitions',
+        'partitioned_clean_null',
+        'partitioned_clean_whitespace',
+        'partitioned_map_labels',
+    ],
+    'polars_functions': [
+        'fingerprint_expr',
+        'null_indicating_expr',
+    ],
+    'record_functions': [
+        'clean_records',
+    ],
+    'rule_functions': [
+        'RULE_STEPS',
+        'RulePlan',
+        'apply_rules',
+        'compile_rules',
+    ],
+}
+
+_MODULES = {
+    name: module for module, names in _LAZY_NAMES.items() for name in names
+}
+
+__all__ = sorted(_MODULES)
+
+
+def __getattr__(name):
+    if name in _MODULES:
+        module = importlib.import_module('.' + _MODULES[name], __name__)
+        value = getattr(module, name)
+        # Later lookups find the name without calling __getattr__
+        globals()[name] = value
+        return value
+
+    if name in _LAZY_NAMES:
+        return importlib.import_module('.' + name, __name__)
+
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name)
+    )
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULES) | set(_LAZY_NAMES))
+
+
+def _import_all():
+    """
+    Imports the public names of every module whose dependencies are
+    installed, for Python versions without module ``__getattr__`` (PEP 562).
+    """
+    for module_name, names in _LAZY_NAMES.items():
+        try:
+            module = importlib.import_module('.' + module_name, __name__)
+        except ImportError:
+            # An optional dependency of the module is missing
+            continue
+
+        globals()[module_name] = module
+        for name in names:
+            globals()[name] = getattr(module, name)
+
+
+if sys.version_info < (3, 7):
+    _import_all()
@@ -0,0 +1,226 @@
+'''
+Array kernels shared by the dataframe functions.
+
+Uses the compiled ``etl_toolbox._speedups`` extension when it is installed,
+and falls back to pure Python (and numpy) otherwise. Both produce the same
+results.
+'''
+
+import numpy as np
+
+from .cleaning_functions import (
+    FALSEY_INDICATORS,
+    NULL_INDICATORS,
+    classify_null,
+    fingerprint,
+)
+
+try:
+    from . import _speedups
+except ImportError:  # pragma: no cover
+    _speedups = None
+
+#: Whether the compiled kernels are available
+NATIVE = _speedups is not None
+
+FNV_OFFSET = np.uint64(14695981039346656037)
+FNV_PRIME = np.uint64(1099511628211)
+
+
+def null_classes():
+    """
+    Returns the list of classes returned by
+    :func:`cleaning_functions.classify_null()
+    <etl_toolbox.cleaning_functions.classify_null>`, ordered so that the
+    codes of the classes that are *null-indicating* regardless of
+    ``falsey_is_null`` come first. The code ``len(null_classes())`` is used
+    for populated values.
+    """
+    return (
+        ['missing'] + NULL_INDICATORS + ['container']
+        + FALSEY_INDICATORS + ['falsey']
+    )
+
+
+def falsey_code():
+    """
+    Returns the code of the first class that is only *null-indicating* if
+    ``falsey_is_null`` is set.
+    """
+    return len(NULL_INDICATORS) + 2
+
+
+def fnv1a_hashes(strings, chunksize=65536):
+    """
+    Returns a ``uint64`` :class:`numpy.ndarray` of the 64-bit FNV-1a hash of
+    the UTF-8 encoding of each string in ``strings``.
+
+    Each chunk of strings is packed into a fixed-width byte matrix and hashed
+    one byte column at a time, so the loop runs over the length of the
+    longest string rather than over every string.
+    """
+    hashes = np.empty(len(strings), dtype=np.uint64)
+
+    for start in range(0, len(strings), chunksize):
+        encoded = [
+            s.encode('utf-8') for s in strings[start:start + chunksize]
+        ]
+        lengths = np.fromiter(
+            (len(b) for b in encoded), dtype=np.int64, count=len(encoded)
+        )
+        width = int(lengths.max()) if len(encoded) else 0
+
+        matrix = np.zeros((len(encoded), max(width, 1)), dtype=np.uint8)
+        if width:
+            packed = np.array(encoded, dtype='S{}'.format(width))
+            matrix[:] = packed.view(np.uint8).reshape(len(encoded), width)
+
+        h = np.full(len(encoded), FNV_OFFSET, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for j in range(width):
+                active = lengths > j
+                h[active] = (h[active] ^ matrix[active, j]) * FNV_PRIME
+
+        hashes[start:start + chunksize] = h
+
+    return hashes
+
+
+def lookup_sorted(hashes, sorted_hashes):
+    """
+    Returns the position of each of ``hashes`` in the sorted ``uint64`` array
+    ``sorted_hashes``, or ``-1`` if it isn't there.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    positions = np.searchsorted(sorted_hashes, hashes)
+    positions[positions == len(sorted_hashes)] = 0
+
+    found = np.zeros(len(hashes), dtype=bool)
+    if len(sorted_hashes):
+        found = sorted_hashes[positions] == hashes
+
+    return np.where(found, positions, -1)
+
+
+def is_hashed(fingerprints):
+    """
+    Returns ``True`` if ``fingerprints`` is a ``uint64`` array of hashed
+    fingerprints, such as one returned by
+    :func:`mapping_functions.hash_fingerprints()
+    <etl_toolbox.mapping_functions.hash_fingerprints>`.
+    """
+    return isinstance(fingerprints, np.ndarray) and fingerprints.dtype == np.uint64
+
+
+def classify_values(values, special_characters='', hashes=True,
+                    chunksize=65536):
+    """
+    Returns a tuple of a ``uint64`` array of the FNV-1a hash of the
+    fingerprint of each value in ``values`` (or ``None`` if ``hashes`` is
+    ``False``), and an ``int8`` array of the index of each value's
+    :func:`cleaning_functions.classify_null()
+    <etl_toolbox.cleaning_functions.classify_null>` class in
+    :func:`null_classes()` (``len(null_classes())`` if it isn't
+    *null-indicating*).
+
+    With the compiled kernels, ASCII strings, ``None``, and ``NaN`` are
+    classified in one pass without creating any temporary strings. Other
+    values, and everything when the kernels aren't installed, go through
+    :func:`_classify_values_python()`. Values are passed to the kernels
+    ``chunksize`` at a time, which bounds the size of the temporary list made
+    from an array.
+    """
+    n = len(values)
+    codes = np.empty(n, dtype=np.int8)
+    value_hashes = np.empty(n, dtype=np.uint64) if hashes else None
+
+    if _speedups is None:
+        classify = _classify_values_python
+    else:
+        classify = _classify_values_native
+
+    for start in range(0, n, chunksize):
+        chunk = values[start:start + chunksize]
+        if not isinstance(chunk, list):
+            chunk = list(chunk) if isinstance(chunk, tuple) else chunk.tolist()
+
+        chunk_hashes, chunk_codes = classify(
+            chunk, special_characters, hashes
+        )
+        codes[start:start + chunksize] = chunk_codes
+        if hashes:
+            value_hashes[start:start + chunksize] = chunk_hashes
+
+    return value_hashes, codes
+
+
+def _classify_values_native(values, special_characters='', hashes=True):
+    """
+    Version of :func:`classify_values()` for a list that uses the compiled
+    kernels, with a fallback to Python for values they can't classify.
+    """
+    value_hashes, codes = _speedups.classify_values(
+        values,
+        special_characters,
+        [x.encode('utf-8') for x in NULL_INDICATORS],
+        [x.encode('utf-8') for x in FALSEY_INDICATORS],
+        hashes,
+    )
+    codes = np.frombuffer(codes, dtype=np.int8)
+    if hashes:
+        value_hashes = np.frombuffer(value_hashes, dtype=np.uint64)
+
+    unknown = np.flatnonzero(codes < 0)
+    if len(unknown):
+        unknown_hashes, unknown_codes = _classify_values_python(
+            [values[i] for i in unknown], special_characters, hashes
+        )
+        codes[unknown] = unknown_codes
+        if hashes:
+            value_hashes[unknown] = unknown_hashes
+
+    return value_hashes, codes
+
+
+def _classify_values_python(values, special_characters='', hashes=True):
+    """
+    Pure-Python version of :func:`classify_values()` for a list.
+    """
+    classes = null_classes()
+    class_codes = {x: code for code, x in enumerate(classes)}
+    populated_code = len(classes)
+
+    # Null-indicating strings repeat, so each distinct string is classified
+    # once. Other values are usually unique (like floats), so caching them
+    # would only cost memory.
+    seen = {}
+
+    def classify(x):
+        is_str = type(x) is str
+        if is_str:
+            code = seen.get(x)
+            if code is not None:
+                return code
+
+        code = class_codes.get(
+            classify_null(x, special_characters=special_characters),
+            populated_code
+        )
+
+        if is_str:
+            if len(seen) >= 4096:
+                seen.clear()
+            seen[x] = code
+
+        return code
+
+    codes = np.fromiter(
+        (classify(x) for x in values), dtype=np.int8, count=len(values)
+    )
+
+    if not hashes:
+        return None, codes
+
+    return fnv1a_hashes(
+        [fingerprint(x, special_characters) for x in values]
+    ), codes
@@ -0,0 +1,432 @@
+/*
+ * Optional compiled kernels for etl_toolbox.
+ *
+ * Fingerprints ASCII strings in a single pass over their characters, without
+ * the temporary strings created by str.lower() and re.sub(). Anything these
+ * kernels can't handle exactly (non-ASCII text, non-string values, strings
+ * that may be Python literals) is reported back so the caller can fall back
+ * to the pure-Python implementation in etl_toolbox._kernel.
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include <math.h>
+#include <stdint.h>
+#include <string.h>
+
+#define FNV_OFFSET 14695981039346656037ULL
+#define FNV_PRIME 1099511628211ULL
+
+#define CODE_UNKNOWN -1
+#define CODE_MISSING 0
+
+#define STACK_BUFFER_SIZE 256
+
+
+/* The characters kept by fingerprint() for the last special_characters seen.
+ * Rebuilding the table is cheap, but fingerprint() is called once per value,
+ * so it's only rebuilt when special_characters changes. */
+static PyObject *cached_special = NULL;
+static unsigned char keep_table[128];
+
+
+/* Returns 0 on success, 1 if special_characters isn't ASCII (so the
+ * pure-Python implementation must be used), or -1 on error. */
+static int
+load_keep_table(PyObject *special)
+{
+    Py_ssize_t i, length;
+    const Py_UCS1 *data;
+
+    if (!PyUnicode_Check(special)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "special_characters must be a string");
+        return -1;
+    }
+
+    if (cached_special != NULL
+            && (special == cached_special
+                || PyUnicode_Compare(special, cached_special) == 0)) {
+        return 0;
+    }
+
+    if (PyUnicode_READY(special) < 0) {
+        return -1;
+    }
+    if (!PyUnicode_IS_ASCII(special)) {
+        return 1;
+    }
+
+    memset(keep_table, 0, sizeof(keep_table));
+    for (i = '0'; i <= '9'; i++) {
+        keep_table[i] = 1;
+    }
+    for (i = 'a'; i <= 'z'; i++) {
+        keep_table[i] = 1;
+    }
+
+    data = PyUnicode_1BYTE_DATA(special);
+    length = PyUnicode_GET_LENGTH(special);
+    for (i = 0; i < length; i++) {
+        keep_table[data[i]] = 1;
+    }
+
+    Py_INCREF(special);
+    Py_XDECREF(cached_special);
+    cached_special = special;
+
+    return 0;
+}
+
+
+/* Writes the fingerprint of an ASCII string to out, which must be at least
+ * as long as the string, and returns its length. */
+static Py_ssize_t
+fingerprint_ascii(const Py_UCS1 *data, Py_ssize_t length, char *out)
+{
+    Py_ssize_t i, n = 0;
+    Py_UCS1 c;
+
+    for (i = 0; i < length; i++) {
+        c = data[i];
+        if (c >= 'A' && c <= 'Z') {
+            c += 'a' - 'A';
+        }
+        if (keep_table[c]) {
+            out[n++] = (char)c;
+        }
+    }
+
+    return n;
+}
+
+
+static uint64_t
+fnv1a(const char *data, Py_ssize_t length)
+{
+    uint64_t h = FNV_OFFSET;
+    Py_ssize_t i;
+
+    for (i = 0; i < length; i++) {
+        h ^= (unsigned char)data[i];
+        h *= FNV_PRIME;
+    }
+
+    return h;
+}
+
+
+PyDoc_STRVAR(fingerprint_doc,
+"fingerprint(x, special_characters)\n\n"
+"Returns the fingerprint of the ASCII string x, or None if x is not an\n"
+"ASCII string.");
+
+static PyObject *
+speedups_fingerprint(PyObject *self, PyObject *args)
+{
+    PyObject *x, *special, *result;
+    Py_ssize_t length, n;
+    char stack_buffer[STACK_BUFFER_SIZE];
+    char *buffer = stack_buffer;
+    int status;
+
+    if (!PyArg_ParseTuple(args, "OO:fingerprint", &x, &special)) {
+        return NULL;
+    }
+
+    if (!PyUnicode_CheckExact(x)) {
+        Py_RETURN_NONE;
+    }
+    if (PyUnicode_READY(x) < 0) {
+        return NULL;
+    }
+    if (!PyUnicode_IS_ASCII(x)) {
+        Py_RETURN_NONE;
+    }
+
+    status = load_keep_table(special);
+    if (status < 0) {
+        return NULL;
+    }
+    if (status > 0) {
+        Py_RETURN_NONE;
+    }
+
+    length = PyUnicode_GET_LENGTH(x);
+    if (length > STACK_BUFFER_SIZE) {
+        buffer = PyMem_Malloc(length);
+        if (buffer == NULL) {
+            return PyErr_NoMemory();
+        }
+    }
+
+    n = fingerprint_ascii(PyUnicode_1BYTE_DATA(x), length, buffer);
+    result = PyUnicode_FromStringAndSize(buffer, n);
+
+    if (buffer != stack_buffer) {
+        PyMem_Free(buffer);
+    }
+
+    return result;
+}
+
+
+/* The encoded indicator strings that a fingerprint is compared against. */
+typedef struct {
+    Py_ssize_t count;
+    const char **data;
+    Py_ssize_t *lengths;
+} indicator_list;
+
+
+static int
+load_indicators(PyObject *indicators, indicator_list *out)
+{
+    Py_ssize_t i;
+    PyObject *item;
+
+    out->count = PySequence_Fast_GET_SIZE(indicators);
+    out->data = PyMem_Malloc(sizeof(char *) * (out->count + 1));
+    out->lengths = PyMem_Malloc(sizeof(Py_ssize_t) * (out->count + 1));
+    if (out->data == NULL || out->lengths == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+
+    for (i = 0; i < out->count; i++) {
+        item = PySequence_Fast_GET_ITEM(indicators, i);
+        if (!PyBytes_Check(item)) {
+            PyErr_SetString(PyExc_TypeError, "indicators must be bytes");
+            return -1;
+        }
+        out->data[i] = PyBytes_AS_STRING(item);
+        out->lengths[i] = PyBytes_GET_SIZE(item);
+    }
+
+    return 0;
+}
+
+
+static void
+free_indicators(indicator_list *list)
+{
+    PyMem_Free(list->data);
+    PyMem_Free(list->lengths);
+}
+
+
+static Py_ssize_t
+find_indicator(const indicator_list *list, const char *fp, Py_ssize_t length)
+{
+    Py_ssize_t i;
+
+    for (i = 0; i < list->count; i++) {
+        if (list->lengths[i] == length
+                && memcmp(list->data[i], fp, length) == 0) {
+            return i;
+        }
+    }
+
+    return -1;
+}
+
+
+/* Classifies one str value, writing its fingerprint hash and code. The code
+ * is left as CODE_UNKNOWN if the string isn't ASCII or may be a Python
+ * literal. Returns -1 on error. */
+static int
+classify_string(PyObject *x, const indicator_list *null_list,
+                const indicator_list *falsey_list, Py_ssize_t falsey_offset,
+                Py_ssize_t populated_code, char **buffer,
+                Py_ssize_t *buffer_size, uint64_t *hash, signed char *code)
+{
+    const Py_UCS1 *data;
+    Py_ssize_t length, fp_length, found;
+
+    if (PyUnicode_READY(x) < 0) {
+        return -1;
+    }
+    if (!PyUnicode_IS_ASCII(x)) {
+        return 0;
+    }
+
+    data = PyUnicode_1BYTE_DATA(x);
+    length = PyUnicode_GET_LENGTH(x);
+
+    if (length > *buffer_size) {
+        *buffer_size = length > STACK_BUFFER_SIZE ? length : STACK_BUFFER_SIZE;
+        PyMem_Free(*buffer);
+        *buffer = PyMem_Malloc(*buffer_size);
+        if (*buffer == NULL) {
+            PyErr_NoMemory();
+            return -1;
+        }
+    }
+
+    fp_length = fingerprint_ascii(data, length, *buffer);
+    *hash = fnv1a(*buffer, fp_length);
+
+    found = find_indicator(null_list, *buffer, fp_length);
+    if (found >= 0) {
+        *code = (signed char)(found + 1);
+        return 0;
+    }
+
+    /* Strings that may be Python literals are evaluated in Python */
+    if (length > 0 && (data[0] == '[' || data[0] == '{' || data[0] == '('
+            || (length > 1 && (data[1] == '"' || data[1] == '\'')))) {
+        return 0;
+    }
+
+    found = find_indicator(falsey_list, *buffer, fp_length);
+    if (found >= 0) {
+        *code = (signed char)(falsey_offset + found);
+        return 0;
+    }
+
+    *code = (signed char)populated_code;
+    return 0;
+}
+
+
+PyDoc_STRVAR(classify_values_doc,
+"classify_values(values, special_characters, null_indicators,\n"
+"                falsey_indicators, hashes=True)\n\n"
+"Returns a tuple of two bytearrays: the 64-bit FNV-1a hash of the UTF-8\n"
+"fingerprint of each value (or None if hashes is false), and a signed\n"
+"8-bit null class code for each value. Codes are laid out as in\n"
+"etl_toolbox._kernel.null_classes(). A code of -1 means the value must be\n"
+"classified (and hashed) in Python.");
+
+static PyObject *
+speedups_classify_values(PyObject *self, PyObject *args)
+{
+    PyObject *values, *special, *null_arg, *falsey_arg;
+    PyObject *seq = NULL, *null_seq = NULL, *falsey_seq = NULL;
+    PyObject *hashes = NULL, *codes = NULL, *result = NULL;
+    PyObject *x;
+    indicator_list null_list = {0, NULL, NULL};
+    indicator_list falsey_list = {0, NULL, NULL};
+    Py_ssize_t i, n, buffer_size = 0;
+    Py_ssize_t falsey_offset, populated_code;
+    uint64_t *hash_out = NULL;
+    uint64_t hash;
+    signed char *code_out;
+    char *buffer = NULL;
+    int status, with_hashes = 1;
+
+    if (!PyArg_ParseTuple(args, "OOOO|p:classify_values",
+                          &values, &special, &null_arg, &falsey_arg,
+                          &with_hashes)) {
+        return NULL;
+    }
+
+    status = load_keep_table(special);
+    if (status < 0) {
+        return NULL;
+    }
+
+    seq = PySequence_Fast(values, "values must be a sequence");
+    null_seq = PySequence_Fast(null_arg, "null_indicators must be a sequence");
+    falsey_seq = PySequence_Fast(falsey_arg,
+                                 "falsey_indicators must be a sequence");
+    if (seq == NULL || null_seq == NULL || falsey_seq == NULL) {
+        goto done;
+    }
+    if (load_indicators(null_seq, &null_list) < 0
+            || load_indicators(falsey_seq, &falsey_list) < 0) {
+        goto done;
+    }
+
+    /* missing, each null indicator, container, each falsey indicator,
+     * falsey, populated */
+    falsey_offset = null_list.count + 2;
+    populated_code = falsey_offset + falsey_list.count + 1;
+    if (populated_code > 127) {
+        PyErr_SetString(PyExc_ValueError, "too many indicators");
+        goto done;
+    }
+
+    n = PySequence_Fast_GET_SIZE(seq);
+    if (with_hashes) {
+        hashes = PyByteArray_FromStringAndSize(NULL, n * sizeof(uint64_t));
+        if (hashes == NULL) {
+            goto done;
+        }
+        hash_out = (uint64_t *)PyByteArray_AS_STRING(hashes);
+    }
+    else {
+        Py_INCREF(Py_None);
+        hashes = Py_None;
+    }
+    codes = PyByteArray_FromStringAndSize(NULL, n);
+    if (codes == NULL) {
+        goto done;
+    }
+    code_out = (signed char *)PyByteArray_AS_STRING(codes);
+
+    for (i = 0; i < n; i++) {
+        x = PySequence_Fast_GET_ITEM(seq, i);
+        hash = 0;
+        code_out[i] = CODE_UNKNOWN;
+
+        if (x == Py_None) {
+            hash = fnv1a("none", 4);
+            code_out[i] = CODE_MISSING;
+        }
+        else if (PyFloat_CheckExact(x) && isnan(PyFloat_AS_DOUBLE(x))) {
+            hash = fnv1a("nan", 3);
+            code_out[i] = CODE_MISSING;
+        }
+        else if (status == 0 && PyUnicode_CheckExact(x)) {
+            if (classify_string(x, &null_list, &falsey_list, falsey_offset,
+                                populated_code, &buffer, &buffer_size,
+                                &hash, &code_out[i]) < 0) {
+                goto done;
+            }
+        }
+
+        if (hash_out != NULL) {
+            hash_out[i] = hash;
+        }
+    }
+
+    result = PyTuple_Pack(2, hashes, codes);
+
+done:
+    PyMem_Free(buffer);
+    free_indicators(&null_list);
+    free_indicators(&falsey_list);
+    Py_XDECREF(seq);
+    Py_XDECREF(null_seq);
+    Py_XDECREF(falsey_seq);
+    Py_XDECREF(hashes);
+    Py_XDECREF(codes);
+
+    return result;
+}
+
+
+static PyMethodDef speedups_methods[] = {
+    {"fingerprint", speedups_fingerprint, METH_VARARGS, fingerprint_doc},
+    {"classify_values", speedups_classify_values, METH_VARARGS,
+     classify_values_doc},
+    {NULL, NULL, 0, NULL}
+};
+
+
+static struct PyModuleDef speedups_module = {
+    PyModuleDef_HEAD_INIT,
+    "_speedups",
+    "Optional compiled kernels for etl_toolbox.",
+    -1,
+    speedups_methods
+};
+
+
+PyMODINIT_FUNC
+PyInit__speedups(void)
+{
+    return PyModule_Create(&speedups_module);
+}
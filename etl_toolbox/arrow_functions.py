@@ -0,0 +1,392 @@
+'''
+.. epigraph:: Functions for working with :class:`pyarrow.Table`\\ s and
+   :class:`pyarrow.RecordBatch`\\ es
+
+Null values are found with :mod:`pyarrow.compute` kernels, so data can be
+cleaned without converting it to a :class:`pandas.DataFrame`.
+
+.. note::
+   This module requires `pyarrow <https://arrow.apache.org/docs/python/>`_,
+   which is an optional dependency of etl-toolbox.
+'''
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .cleaning_functions import FALSEY_INDICATORS, NULL_INDICATORS
+from .dataframe_functions import _populated_masks
+
+
+def arrow_null_mask(array, falsey_is_null=False, special_characters=''):
+    """
+    Returns a boolean array that is ``true`` where the values of ``array``
+    are *null-indicating*
+
+    The rules of :func:`cleaning_functions.clean_null()
+    <etl_toolbox.cleaning_functions.clean_null>` are applied according to the
+    type of ``array``:
+
+    - String values are *null-indicating* if their fingerprint is in
+      :const:`~etl_toolbox.cleaning_functions.NULL_INDICATORS` (or
+      :const:`~etl_toolbox.cleaning_functions.FALSEY_INDICATORS` if
+      ``falsey_is_null``)
+    - Numeric, boolean, and duration values are *null-indicating* if they are
+      zero or ``false`` and ``falsey_is_null`` is set
+    - List values are *null-indicating* if they are empty or all of their
+      elements are *null-indicating*
+    - Dictionary values are checked once per dictionary entry
+    - Null and NaN values are always *null-indicating*
+
+    .. note::
+       Strings that contain Python literals (such as ``'[None, None]'``) are
+       not evaluated.
+
+    Usage:
+      >>> import pyarrow as pa
+      >>> from etl_toolbox.arrow_functions import arrow_null_mask
+      >>> arrow_null_mask(pa.array(['AAA', 'N/A', None, 'false'])).to_pylist()
+      [False, True, True, False]
+
+    :param array:
+        A :class:`pyarrow.Array` or :class:`pyarrow.ChunkedArray`.
+
+    :param falsey_is_null:
+        Controls whether falsey values are considered *null-indicating*.
+        Default is ``False``.
+
+    :type falsey_is_null: boolean, optional
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprints. See :func:`cleaning_functions.fingerprint()
+        <etl_toolbox.cleaning_functions.fingerprint>` for details.
+
+    :type special_characters: string, optional
+
+    :return:
+        Returns a :class:`pyarrow.BooleanArray` (or a
+        :class:`pyarrow.ChunkedArray` if ``array`` is chunked) with no nulls.
+    """
+    if isinstance(array, pa.ChunkedArray):
+        return pa.chunked_array(
+            [
+                arrow_null_mask(chunk, falsey_is_null, special_characters)
+                for chunk in array.chunks
+            ],
+            type=pa.bool_(),
+        )
+
+    array_type = array.type
+
+    if pa.types.is_floating(array_type):
+        null_mask = pc.is_null(array, nan_is_null=True)
+    else:
+        null_mask = pc.is_null(array)
+
+    if pa.types.is_string(array_type) or pa.types.is_large_string(array_type):
+        indicators = list(NULL_INDICATORS)
+        if falsey_is_null:
+            indicators += FALSEY_INDICATORS
+
+        # Special characters are written as hex escapes, which mean the same
+        # thing in every position of a RE2 character class.
+        remove_regex = r'[^0-9a-z{}]'.format(
+            ''.join(r'\x{{{:x}}}'.format(ord(c)) for c in special_characters)
+        )
+        fingerprints = pc.replace_substring_regex(
+            pc.utf8_lower(array), pattern=remove_regex, replacement=''
+        )
+
+        null_mask = pc.or_(
+            null_mask, pc.is_in(fingerprints, value_set=pa.array(indicators))
+        )
+
+    elif pa.types.is_boolean(array_type):
+        if falsey_is_null:
+            null_mask = pc.or_(null_mask, pc.invert(array))
+
+    elif (
+        pa.types.is_integer(array_type)
+        or pa.types.is_floating(array_type)
+        or pa.types.is_decimal(array_type)
+    ):
+        if falsey_is_null:
+            null_mask = pc.or_(null_mask, pc.equal(array, 0))
+
+    elif pa.types.is_duration(array_type):
+        if falsey_is_null:
+            null_mask = pc.or_(
+                null_mask, pc.equal(array.cast(pa.int64()), 0)
+            )
+
+    elif pa.types.is_dictionary(array_type):
+        # Clean each dictionary entry once, then look up the result for each
+        # value
+        dictionary_null_mask = arrow_null_mask(
+            array.dictionary, falsey_is_null, special_characters
+        )
+        null_mask = pc.or_(
+            null_mask, pc.take(dictionary_null_mask, array.indices)
+        )
+
+    elif pa.types.is_list(array_type) or pa.types.is_large_list(array_type):
+        # Count the elements of each list that aren't null-indicating
+        element_null_mask = arrow_null_mask(
+            array.flatten(), falsey_is_null, special_characters
+        )
+        parents = pc.list_parent_indices(array).to_numpy()
+        populated_counts = np.bincount(
+            parents[~np.asarray(element_null_mask)],
+            minlength=len(array),
+        )
+
+        null_mask = pc.or_(null_mask, pa.array(populated_counts == 0))
+
+    return pc.fill_null(null_mask, True)
+
+
+def _set_null(array, null_mask):
+    """
+    Returns ``array`` with the values where ``null_mask`` is ``true`` set to
+    null.
+
+    Where the array layout allows it, only a new validity bitmap is created
+    and the value buffers of ``array`` are reused.
+    """
+    if isinstance(array, pa.ChunkedArray):
+        return pa.chunked_array(
+            [
+                _set_null(chunk, chunk_mask)
+                for chunk, chunk_mask in zip(
+                    array.chunks, null_mask.chunks
+                )
+            ],
+            type=array.type,
+        )
+
+    if not pc.any(null_mask).as_py():
+        return array
+
+    array_type = array.type
+
+    if (
+        pa.types.is_primitive(array_type)
+        or pa.types.is_string(array_type)
+        or pa.types.is_large_string(array_type)
+        or pa.types.is_binary(array_type)
+        or pa.types.is_large_binary(array_type)
+    ):
+        # The validity bitmap has to line up with the array's offset into
+        # its buffers
+        valid = np.zeros(array.offset + len(array), dtype=bool)
+        valid[array.offset:] = ~np.asarray(null_mask)
+        validity = pa.py_buffer(np.packbits(valid, bitorder='little'))
+
+        return pa.Array.from_buffers(
+            array_type,
+            len(array),
+            [validity] + array.buffers()[1:],
+            offset=array.offset,
+        )
+
+    if pa.types.is_dictionary(array_type):
+        return pa.DictionaryArray.from_arrays(
+            _set_null(array.indices, null_mask), array.dictionary
+        )
+
+    return pc.if_else(null_mask, pa.nulls(len(array), array_type), array)
+
+
+def _clean_columns(data, falsey_is_null, special_characters):
+    """
+    Returns a tuple of the columns of ``data`` with *null-indicating* values
+    set to null, and a boolean :class:`numpy.ndarray` null mask for ``data``.
+    """
+    columns = []
+    null_mask = np.zeros((data.num_rows, data.num_columns), dtype=bool)
+
+    for j, column in enumerate(data.columns):
+        column_null_mask = arrow_null_mask(
+            column,
+            falsey_is_null=falsey_is_null,
+            special_characters=special_characters,
+        )
+        columns.append(_set_null(column, column_null_mask))
+        null_mask[:, j] = np.asarray(column_null_mask)
+
+    return columns, null_mask
+
+
+def _select(data, columns, keep_rows, keep_columns):
+    """
+    Returns a new :class:`pyarrow.Table` or :class:`pyarrow.RecordBatch` like
+    ``data``, made from the kept ``columns`` and rows.
+    """
+    column_locs = np.flatnonzero(keep_columns)
+
+    result = type(data).from_arrays(
+        [columns[j] for j in column_locs],
+        schema=pa.schema([data.schema.field(int(j)) for j in column_locs]),
+    )
+
+    # Filtering copies the data, so it is skipped if every row is kept
+    if not keep_rows.all():
+        result = result.filter(pa.array(keep_rows))
+
+    return result
+
+
+def arrow_clean_null(
+    data,
+    empty_row_thresh=1,
+    empty_column_thresh=1,
+    falsey_is_null=False,
+    special_characters='',
+):
+    """
+    Cleans null values of a :class:`pyarrow.Table` or
+    :class:`pyarrow.RecordBatch` and removes empty rows/columns.
+
+    This follows the same rules as :func:`dataframe_functions.dataframe_clean_null()
+    <etl_toolbox.dataframe_functions.dataframe_clean_null>`, using
+    :func:`arrow_null_mask()` to find the null cells.
+
+    For most column types, values are nulled by creating a new validity
+    bitmap and reusing the existing value buffers, and columns are dropped
+    without copying. Rows are only copied if some of them are removed.
+
+    Usage:
+      >>> import pyarrow as pa
+      >>> from etl_toolbox.arrow_functions import arrow_clean_null
+      >>> table = pa.table({
+      ...     'id': ['AAA', 'BAA', 'CAA', 'DAA'],
+      ...     'email': [None, 'baa@baa.com', 'caa@caa.com', 'blocked'],
+      ...     'phone': ['111-111-1111', '-', 'notavailable', '444-444-4444'],
+      ...     'col4': ['empty', '-', '...', 'null']
+      ... })
+      >>> arrow_clean_null(table).to_pydict()  # doctest: +NORMALIZE_WHITESPACE
+      {'id': ['AAA', 'BAA', 'CAA', 'DAA'],
+       'email': [None, 'baa@baa.com', 'caa@caa.com', None],
+       'phone': ['111-111-1111', None, None, '444-444-4444']}
+
+    :param data:
+        A :class:`pyarrow.Table` or :class:`pyarrow.RecordBatch`.
+
+        To clean a :class:`pyarrow.dataset.Dataset` that doesn't fit in
+        memory, use :func:`arrow_dataset_clean_null()`.
+
+    :param empty_row_thresh:
+        The number of non-null values required for a row to be considered
+        populated/non-empty. Default is ``1``.
+
+    :type empty_row_thresh: int, optional
+
+    :param empty_column_thresh:
+        The number of non-null values required for a column to be considered
+        populated/non-empty. Default is ``1``.
+
+    :type empty_column_thresh: int, optional
+
+    :param falsey_is_null:
+        Controls whether falsey objects are considered *null-indicating*.
+        Default is ``False``.
+
+    :type falsey_is_null: boolean, optional
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprints. See :func:`cleaning_functions.fingerprint()
+        <etl_toolbox.cleaning_functions.fingerprint>` for details.
+
+    :type special_characters: string, optional
+
+    :return:
+        Returns a new object of the same type as ``data``.
+    """
+    columns, null_mask = _clean_columns(
+        data, falsey_is_null, special_characters
+    )
+
+    keep_rows, keep_columns = _populated_masks(
+        null_mask, empty_row_thresh, empty_column_thresh
+    )
+
+    return _select(data, columns, keep_rows, keep_columns)
+
+
+def arrow_dataset_clean_null(
+    dataset,
+    empty_row_thresh=1,
+    empty_column_thresh=1,
+    falsey_is_null=False,
+    special_characters='',
+    **kwargs
+):
+    """
+    Cleans null values of a :class:`pyarrow.dataset.Dataset` and removes
+    empty rows/columns, yielding one cleaned :class:`pyarrow.RecordBatch` at
+    a time.
+
+    This follows the same rules as :func:`arrow_clean_null()`, applied to
+    the dataset as a whole. Rows are cleaned batch by batch. Since a column
+    can only be removed once it's known to be empty in **every** batch, the
+    dataset is scanned twice if ``empty_column_thresh`` is not ``0``: once to
+    count the populated cells in each column, and once to yield the results.
+
+    Usage:
+      >>> import pyarrow.dataset as ds
+      >>> from etl_toolbox.arrow_functions import arrow_dataset_clean_null
+      >>> dataset = ds.dataset('data/', format='parquet')  # doctest: +SKIP
+      >>> for batch in arrow_dataset_clean_null(dataset):  # doctest: +SKIP
+      ...     writer.write_batch(batch)
+
+    :param dataset:
+        A :class:`pyarrow.dataset.Dataset`.
+
+    :param empty_row_thresh:
+        See :func:`arrow_clean_null()`.
+
+    :param empty_column_thresh:
+        See :func:`arrow_clean_null()`.
+
+    :param falsey_is_null:
+        See :func:`arrow_clean_null()`.
+
+    :param special_characters:
+        See :func:`arrow_clean_null()`.
+
+    :param kwargs:
+        Any other keyword arguments are passed to
+        :meth:`pyarrow.dataset.Dataset.to_batches`, such as ``batch_size``.
+
+    :return:
+        Returns a generator of :class:`pyarrow.RecordBatch`\\ es. Batches
+        with no remaining rows are skipped.
+    """
+    column_counts = None
+
+    if empty_column_thresh > 0:
+        column_counts = np.zeros(len(dataset.schema), dtype=np.int64)
+
+        for batch in dataset.to_batches(**kwargs):
+            _, null_mask = _clean_columns(
+                batch, falsey_is_null, special_characters
+            )
+            keep_rows, _ = _populated_masks(null_mask, empty_row_thresh, 0)
+            column_counts += (~null_mask[keep_rows]).sum(axis=0)
+
+    for batch in dataset.to_batches(**kwargs):
+        columns, null_mask = _clean_columns(
+            batch, falsey_is_null, special_characters
+        )
+
+        keep_rows, keep_columns = _populated_masks(
+            null_mask,
+            empty_row_thresh,
+            empty_column_thresh,
+            column_counts=column_counts,
+        )
+
+        if keep_rows.any():
+            yield _select(batch, columns, keep_rows, keep_columns)
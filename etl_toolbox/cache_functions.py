@@ -0,0 +1,375 @@
+'''
+.. epigraph:: Functions for caching cleaned files on disk
+
+Cleaned frames are stored as Feather files, keyed by a hash of the source
+file's contents and the cleaning parameters. A repeat run of the same file
+with the same parameters reads the cleaned columns back instead of loading
+and cleaning the file again.
+
+.. note::
+   This module requires `pyarrow <https://arrow.apache.org/docs/python/>`_,
+   which is an optional dependency of etl-toolbox.
+'''
+
+import functools
+import hashlib
+import json
+import os
+import types
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from . import __version__
+from .file_functions import open_file, split_archive_path
+from .ingest_functions import clean_file_frame, read_file
+
+_CACHE_EXTENSION = '.feather'
+_LABELS_KEY = b'etl_toolbox_labels'
+
+
+def cached_clean_file(
+    file_path,
+    cache_dir,
+    max_cache_bytes=2 ** 30,
+    reader=read_file,
+    processor=clean_file_frame,
+    **kwargs
+):
+    """
+    Loads and cleans a file, or returns the cleaned result from an earlier
+    call if the file's contents and the cleaning parameters haven't changed
+
+    The cache key is a SHA-256 hash of the file's contents, ``reader``,
+    ``processor``, ``kwargs``, and the etl-toolbox version, so a renamed or
+    copied file still hits the cache and an edited file never does. When the
+    total size of the cache is more than ``max_cache_bytes``, the least
+    recently used entries are removed.
+
+    Functions (including lambdas and local functions) are identified by
+    their name, their compiled code, and their default and closure values,
+    so editing a processor's body changes the key. Global names that a
+    function uses are not part of the key.
+
+    Usage:
+      >>> import tempfile
+      >>> from etl_toolbox.cache_functions import cached_clean_file
+      >>> cache_dir = tempfile.mkdtemp()
+      >>> cached_clean_file(
+      ...     'test_data/animals.tsv', cache_dir,
+      ...     label_fingerprints={'commonname', 'ein'}, label_match_thresh=2
+      ... ).head(2)
+              common_name        scientific_name         EIN shirt_size
+      0     Golden jackal           Canis aureus  71-0005605          L
+      1  Pie, rufous tree  Dendrocitta vagabunda  45-7634212        3XL
+
+    The second call reads the cleaned frame from ``cache_dir``:
+      >>> cached_clean_file(
+      ...     'test_data/animals.tsv', cache_dir,
+      ...     label_fingerprints={'commonname', 'ein'}, label_match_thresh=2
+      ... ).shape
+      (37, 4)
+
+    :param file_path:
+        The path of the file to load.
+
+    :param cache_dir:
+        The directory to store cached frames in. It is created if it doesn't
+        exist. Several processes on the same host can share one
+        ``cache_dir``.
+
+    :param max_cache_bytes:
+        The maximum total size of the cached frames in ``cache_dir``.
+        Defaults to 1 GiB.
+
+    :param reader:
+        A function that reads a file path into a :class:`pandas.DataFrame`.
+        Defaults to :func:`ingest_functions.read_file()
+        <etl_toolbox.ingest_functions.read_file>`.
+
+    :param processor:
+        A function that cleans the :class:`pandas.DataFrame` returned by
+        ``reader``. It is called with ``kwargs``. Defaults to
+        :func:`ingest_functions.clean_file_frame()
+        <etl_toolbox.ingest_functions.clean_file_frame>`.
+
+    :param kwargs:
+        Any other keyword arguments are passed to ``processor``, and are part
+        of the cache key.
+
+    :return:
+        Returns a :class:`pandas.DataFrame`.
+
+    .. note::
+        Entries are written to a temporary file and renamed into place, so a
+        concurrent reader never sees a partial entry. Two processes that miss
+        on the same key both clean the file, and the last one to finish
+        replaces the other's entry.
+
+    .. note::
+        If the cleaned frame can't be stored as Feather (for example, an
+        object column that mixes strings and numbers), it is returned without
+        being cached.
+    """
+    key = _cache_key(file_path, reader, processor, kwargs)
+    entry_path = os.path.join(cache_dir, key + _CACHE_EXTENSION)
+
+    df = _read_entry(entry_path)
+    if df is not None:
+        return df
+
+    df = processor(reader(file_path), **kwargs)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    if _write_entry(entry_path, df):
+        _evict(cache_dir, max_cache_bytes, keep=entry_path)
+
+    return df
+
+
+def clear_cache(cache_dir):
+    """
+    Removes all of the cached frames in ``cache_dir``
+
+    :param cache_dir:
+        A directory used as the ``cache_dir`` of :func:`cached_clean_file()`.
+    """
+    for path, _, _ in _cache_entries(cache_dir):
+        _remove(path)
+
+
+def _file_digest(file_path, blocksize=1 << 20):
+    """
+    Returns the SHA-256 hex digest of the contents of ``file_path``.
+    """
+    digest = hashlib.sha256()
+
+    # Files inside archives are hashed by their own contents. Other files,
+    # including compressed ones, are hashed as they are on disk.
+    if split_archive_path(file_path)[1] is None:
+        f = open(file_path, 'rb')
+    else:
+        f = open_file(file_path)
+
+    with f:
+        for block in iter(functools.partial(f.read, blocksize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _param_token(value):
+    """
+    Returns a JSON-serializable version of ``value`` that is the same in
+    every process, for use in a cache key.
+    """
+    if isinstance(value, functools.partial):
+        return [
+            'partial',
+            _param_token(value.func),
+            _param_token(value.args),
+            _param_token(value.keywords),
+        ]
+    if isinstance(value, types.MethodType):
+        return ['method', _param_token(value.__func__)]
+    if isinstance(value, types.FunctionType):
+        return [
+            'function',
+            value.__module__,
+            value.__qualname__,
+            _code_token(value.__code__),
+            _param_token(value.__defaults__),
+            _param_token(value.__kwdefaults__),
+            [_cell_token(cell) for cell in value.__closure__ or ()],
+        ]
+    if callable(value):
+        if hasattr(value, '__qualname__'):
+            # Classes and builtins
+            return ['callable', value.__module__, value.__qualname__]
+
+        # Instances of classes with a __call__ method
+        call = getattr(type(value).__call__, '__func__', None) or (
+            type(value).__call__
+        )
+        return [
+            'instance',
+            type(value).__module__,
+            type(value).__qualname__,
+            _param_token(call) if isinstance(call, types.FunctionType)
+            else None,
+        ]
+    if isinstance(value, dict):
+        return [
+            'dict',
+            sorted([_param_token(k), _param_token(v)] for k, v in value.items())
+        ]
+    if isinstance(value, (set, frozenset)):
+        return ['set', sorted(_param_token(x) for x in value)]
+    if isinstance(value, (list, tuple)):
+        return [type(value).__name__, [_param_token(x) for x in value]]
+    if hasattr(value, 'tolist'):
+        return [type(value).__name__, value.tolist()]
+    return [type(value).__name__, repr(value)]
+
+
+def _code_token(code):
+    """
+    Returns a hex digest of a code object's bytecode, constants, and names.
+    """
+    consts = [
+        _code_token(c) if isinstance(c, types.CodeType) else _param_token(c)
+        for c in code.co_consts
+    ]
+
+    digest = hashlib.sha256(code.co_code)
+    digest.update(
+        json.dumps([consts, code.co_names], sort_keys=True).encode('utf-8')
+    )
+    return digest.hexdigest()
+
+
+def _cell_token(cell):
+    """
+    Returns the :func:`_param_token()` of a closure cell's value.
+    """
+    try:
+        value = cell.cell_contents
+    except ValueError:
+        # The variable hasn't been assigned yet
+        return None
+
+    if isinstance(value, types.FunctionType):
+        # Closures can refer to themselves, so only the name is used
+        return ['function', value.__module__, value.__qualname__]
+    return _param_token(value)
+
+
+def _cache_key(file_path, reader, processor, kwargs):
+    """
+    Returns the cache key for cleaning ``file_path`` with ``reader``,
+    ``processor``, and ``kwargs``.
+    """
+    params = json.dumps(
+        [__version__, _param_token(reader), _param_token(processor),
+         _param_token(kwargs)],
+        sort_keys=True
+    )
+
+    digest = hashlib.sha256(_file_digest(file_path).encode('ascii'))
+    digest.update(params.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _write_entry(entry_path, df):
+    """
+    Writes ``df`` to ``entry_path`` through a temporary file. Returns
+    ``False`` if ``df`` can't be stored as Feather.
+    """
+    # Feather requires string column names, so the columns are stored by
+    # position and the labels are kept in the schema metadata
+    stored = df.copy(deep=False)
+    stored.columns = [str(i) for i in range(df.shape[1])]
+
+    try:
+        labels = json.dumps([df.columns.tolist(), df.columns.name])
+        table = pa.Table.from_pandas(stored, preserve_index=True)
+    except (TypeError, ValueError):
+        return False
+
+    metadata = dict(table.schema.metadata or {})
+    metadata[_LABELS_KEY] = labels.encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+
+    temp_path = '{}.{}.tmp'.format(entry_path, uuid.uuid4().hex)
+    try:
+        feather.write_feather(table, temp_path)
+        os.replace(temp_path, entry_path)
+    finally:
+        _remove(temp_path)
+
+    return True
+
+
+def _read_entry(entry_path):
+    """
+    Returns the cached frame at ``entry_path``, or ``None`` if there isn't
+    one. A hit marks the entry as recently used.
+    """
+    try:
+        table = feather.read_table(entry_path, memory_map=True)
+        os.utime(entry_path)
+    except (FileNotFoundError, pa.ArrowInvalid):
+        # Missing, or removed by another process's eviction
+        return None
+
+    df = table.to_pandas()
+
+    # Arrow reads null strings as None, but cleaned frames use NaN, so a hit
+    # would otherwise differ from a miss
+    for column in df.columns[(df.dtypes == object).to_numpy()]:
+        df[column] = df[column].where(df[column].notna(), np.nan)
+
+    labels, labels_name = json.loads(
+        table.schema.metadata[_LABELS_KEY].decode('utf-8')
+    )
+    df.columns = labels
+    df.columns.name = labels_name
+
+    return df
+
+
+def _cache_entries(cache_dir):
+    """
+    Returns a list of ``(path, size, mtime)`` for each entry in
+    ``cache_dir``.
+    """
+    entries = []
+
+    try:
+        names = os.listdir(cache_dir)
+    except FileNotFoundError:
+        return entries
+
+    for name in names:
+        if not name.endswith(_CACHE_EXTENSION):
+            continue
+
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((path, stat.st_size, stat.st_mtime))
+
+    return entries
+
+
+def _evict(cache_dir, max_cache_bytes, keep=None):
+    """
+    Removes the least recently used entries in ``cache_dir`` until their
+    total size is at most ``max_cache_bytes``. The entry at ``keep`` is never
+    removed.
+    """
+    entries = sorted(_cache_entries(cache_dir), key=lambda e: e[2])
+    total = sum(size for _, size, _ in entries)
+
+    for path, size, _ in entries:
+        if total <= max_cache_bytes:
+            break
+        if path == keep:
+            continue
+
+        _remove(path)
+        total -= size
+
+
+def _remove(path):
+    """
+    Removes ``path`` if it exists. Another process may have removed it
+    already, or (on Windows) still have it open.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -4,10 +4,17 @@
 
 import ast
 import collections.abc
+import functools
 import re
+import unicodedata
 
+try:
+    from . import _speedups
+except ImportError:  # pragma: no cover
+    _speedups = None
 
-def fingerprint(x, special_characters=''):
+
+def fingerprint(x, special_characters='', transliterate=False):
     """
     Returns a lowercase, alphanumeric representation of ``x``
 
@@ -37,14 +44,172 @@ def fingerprint(x, special_characters=''):
 
     :type special_characters: string, optional
 
+    :param transliterate:
+        If ``True``, letters with accents and other marks are converted to
+        their ASCII letters (using the NFKD normal form), and letters like
+        ``'ß'`` and ``'æ'`` are spelled out, instead of being removed.
+        Characters in ``special_characters`` are kept as they are. Default is
+        ``False``.
+
+          >>> fingerprint('Dirección', transliterate=True)
+          'direccion'
+          >>> fingerprint('Straße', transliterate=True)
+          'strasse'
+
+        ASCII strings are fingerprinted exactly as without
+        ``transliterate``, and don't pay for the conversion.
+
+    :type transliterate: boolean, optional
+
     :return:
         Returns a string.
+
+    .. note::
+        If the optional compiled extension is installed, ASCII strings are
+        fingerprinted by it in a single pass. Other values always use the
+        pure-Python implementation, and the results are identical.
     """
+    if transliterate:
+        x = str(x)
+        if not _is_ascii(x):
+            x = _transliterate(x, special_characters)
+
+    if _speedups is not None and type(x) is str:
+        x_fingerprint = _speedups.fingerprint(x, special_characters)
+        if x_fingerprint is not None:
+            return x_fingerprint
+
     remove_regex = r'[^0-9a-z{}]'.format(re.escape(special_characters))
 
     return re.sub(remove_regex, '', str(x).lower())
 
 
+# Letters that NFKD doesn't decompose into ASCII letters, spelled out
+_TRANSLITERATIONS = {
+    'ß': 'ss',
+    'æ': 'ae',
+    'œ': 'oe',
+    'ø': 'o',
+    'đ': 'd',
+    'ð': 'd',
+    'þ': 'th',
+    'ł': 'l',
+    'ı': 'i',
+    'ħ': 'h',
+    'ŧ': 't',
+    'ŋ': 'n',
+    'ĸ': 'k',
+}
+
+
+class _TransliterationTable(dict):
+    """
+    A :meth:`str.translate` table from code points to their ASCII
+    transliteration. Code points are added the first time they are looked
+    up, so each character is only normalized once.
+    """
+
+    def __init__(self, special_characters):
+        super().__init__()
+        self.special_characters = special_characters
+
+        # Latin letters are by far the most common, so they are precomputed
+        for code_point in range(0x80, 0x250):
+            self[code_point]
+
+    def __missing__(self, code_point):
+        c = chr(code_point)
+
+        if c in self.special_characters:
+            value = c
+        else:
+            value = ''.join(
+                _TRANSLITERATIONS.get(d, d)
+                for d in unicodedata.normalize('NFKD', c.lower())
+            )
+
+        self[code_point] = value
+        return value
+
+
+@functools.lru_cache(maxsize=64)
+def _transliteration_table(special_characters):
+    """
+    Returns the :class:`_TransliterationTable` for ``special_characters``.
+    """
+    return _TransliterationTable(special_characters)
+
+
+def _encodes_as_ascii(x):
+    """
+    Returns ``True`` if the string ``x`` only contains ASCII characters.
+    """
+    try:
+        x.encode('ascii')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+# str.isascii() is faster, but needs Python 3.7
+_is_ascii = getattr(str, 'isascii', _encodes_as_ascii)
+
+
+def _transliterate(x, special_characters=''):
+    """
+    Returns the string ``x`` with its characters converted to ASCII where
+    possible, for :func:`fingerprint()`.
+    """
+    return x.translate(_transliteration_table(special_characters))
+
+
+_FNV_OFFSET = 0xcbf29ce484222325
+_FNV_PRIME = 0x100000001b3
+
+
+def fingerprint_hash(x, special_characters=''):
+    """
+    Returns a 64-bit hash of the fingerprint of ``x``
+
+    The hash is the 64-bit FNV-1a hash of the UTF-8 encoded
+    :func:`fingerprint()`. Hashes take 8 bytes each when stored in a
+    :class:`numpy.ndarray`, compared to 50 or more bytes for a fingerprint
+    string, so they are useful for large lookup and deduplication indexes.
+    See :func:`mapping_functions.hash_fingerprints()
+    <etl_toolbox.mapping_functions.hash_fingerprints>`.
+
+    Usage:
+      >>> from etl_toolbox.cleaning_functions import fingerprint_hash
+      >>> fingerprint_hash('(Aa_Bb_Cc)') == fingerprint_hash('aabbcc')
+      True
+      >>> hex(fingerprint_hash(''))
+      '0xcbf29ce484222325'
+
+    :param x:
+        The object to be fingerprinted and hashed.
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprint of ``x``. See :func:`fingerprint()` for more details.
+
+    :type special_characters: string, optional
+
+    :return:
+        Returns an int from ``0`` to ``2**64 - 1``.
+
+    .. note::
+        Different fingerprints can have the same hash. The chance of that
+        happening for any pair out of ``n`` fingerprints is about
+        ``n**2 / 2**65``, or roughly one in 37 million for a million
+        fingerprints.
+    """
+    h = _FNV_OFFSET
+    for byte in fingerprint(x, special_characters).encode('utf-8'):
+        h = ((h ^ byte) * _FNV_PRIME) & 0xFFFFFFFFFFFFFFFF
+
+    return h
+
+
 #: A list of strings that are considered equivalent to ``None``. Used by
 #: :func:`clean_null()`.
 NULL_INDICATORS = [
@@ -190,6 +355,80 @@ def clean_null(x, falsey_is_null=False, special_characters=''):
     return x
 
 
+def classify_null(x, special_characters=''):
+    """
+    Returns the reason ``x`` is *null-indicating*, or ``None`` if it is not
+
+    This applies the same rules as :func:`clean_null()`, but reports which
+    rule matched instead of returning ``x``:
+
+    - ``'missing'`` if ``x`` is ``None`` or a float ``NaN``
+    - the fingerprint of ``x``, if it is in :const:`NULL_INDICATORS`
+    - ``'container'`` if ``x`` is an empty or *null-indicating* container,
+      or a string that evaluates as one
+    - the fingerprint of ``x``, if it is in :const:`FALSEY_INDICATORS`
+    - ``'falsey'`` if ``x`` is *null-indicating* only because it is falsey
+
+    The last two are only *null-indicating* if ``falsey_is_null`` is set.
+
+    Usage:
+      >>> from etl_toolbox.cleaning_functions import classify_null
+      >>> classify_null('N/A')
+      'na'
+      >>> classify_null('[None, "empty"]')
+      'container'
+      >>> classify_null('False')
+      'false'
+      >>> classify_null(0.0)
+      'falsey'
+      >>> classify_null('abc') is None
+      True
+
+    :param x:
+        The object to be evaluated.
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprint of ``x``. See :func:`fingerprint()` for more details.
+
+    :type special_characters: string, optional
+
+    :return:
+        Returns a string or ``None``.
+    """
+    if x is None or (isinstance(x, float) and x != x):
+        return 'missing'
+
+    for falsey_is_null in (False, True):
+        if clean_null(
+            x,
+            falsey_is_null=falsey_is_null,
+            special_characters=special_characters
+        ) is not None:
+            continue
+
+        # Containers are reported as containers, even if their string
+        # representation happens to fingerprint to an indicator
+        if (
+            isinstance(x, collections.abc.Iterable)
+            and not isinstance(x, str)
+        ):
+            return 'falsey' if falsey_is_null else 'container'
+
+        x_fingerprint = fingerprint(x, special_characters)
+
+        if not falsey_is_null:
+            if x_fingerprint in NULL_INDICATORS:
+                return x_fingerprint
+            return 'container'
+
+        if x_fingerprint in FALSEY_INDICATORS:
+            return x_fingerprint
+        return 'falsey'
+
+    return None
+
+
 def clean_whitespace(x):
     """
     Returns ``x`` with whitespace characters trimmed and condensed
@@ -0,0 +1,592 @@
+'''
+.. epigraph:: Functions for bulk loading :class:`pandas.DataFrame`\\ s into
+   databases
+
+Frames are loaded with each database's bulk path instead of one ``INSERT``
+per row: ``executemany()`` in a single transaction for SQLite, and
+``COPY ... FROM STDIN`` for PostgreSQL (with
+`psycopg2 <https://www.psycopg.org/>`_ or psycopg 3). Connections are
+DB-API connections, or a :class:`ConnectionPool` that is shared by every
+write of an ingest run.
+'''
+
+import collections
+import concurrent.futures
+import contextlib
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Python types that database drivers accept as parameters
+_PARAMETER_TYPES = (str, int, float, bool, bytes)
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of database connections
+
+    Connections are opened by calling ``connect`` when they are first
+    needed, up to ``max_size`` at once, and are reused after that. A
+    connection that raises an error is rolled back before it is reused, or
+    closed if it can't be.
+
+    Usage:
+      >>> import functools, sqlite3
+      >>> from etl_toolbox.database_functions import ConnectionPool
+      >>> pool = ConnectionPool(functools.partial(
+      ...     sqlite3.connect, ':memory:', check_same_thread=False))
+      >>> with pool.connection() as connection:
+      ...     connection.execute('SELECT 1').fetchone()
+      (1,)
+      >>> pool.close()
+
+    :param connect:
+        A function that returns a new DB-API connection. SQLite connections
+        must be opened with ``check_same_thread=False`` to be shared between
+        threads.
+
+    :param max_size:
+        The maximum number of open connections. Default is ``4``.
+
+    :type max_size: int, optional
+    """
+
+    def __init__(self, connect, max_size=4):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1.')
+
+        self.connect = connect
+        self.max_size = max_size
+        self._idle = []
+        self._open = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        Returns a context manager that checks out a connection, waiting for
+        one to be returned if ``max_size`` are in use.
+        """
+        connection = self._acquire()
+        try:
+            yield connection
+        except BaseException:
+            self._release(connection, failed=True)
+            raise
+        else:
+            self._release(connection)
+
+    def close(self):
+        """
+        Closes the idle connections. Connections that are checked out are
+        closed when they are returned.
+        """
+        with self._condition:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+            self._condition.notify_all()
+
+        for connection in idle:
+            self._discard(connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _acquire(self):
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise ValueError('The connection pool is closed.')
+                if self._idle:
+                    return self._idle.pop()
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+                self._condition.wait()
+
+        # Connecting can be slow, so it isn't done while holding the lock
+        try:
+            return self.connect()
+        except BaseException:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, connection, failed=False):
+        if failed:
+            try:
+                connection.rollback()
+            except Exception:
+                self._discard(connection)
+                return
+
+        with self._condition:
+            if not self._closed:
+                self._idle.append(connection)
+                self._condition.notify()
+                return
+
+        self._discard(connection)
+
+    def _discard(self, connection):
+        with self._condition:
+            self._open -= 1
+            self._condition.notify()
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def write_frame(df, table, connection, create_table=True, chunksize=10000):
+    """
+    Bulk loads the rows of a :class:`pandas.DataFrame` into a database table
+
+    All of the rows are written in one transaction, which is committed at
+    the end. For SQLite, the rows are inserted with ``executemany()``,
+    ``chunksize`` rows at a time. For PostgreSQL, each chunk of rows is
+    written to an in-memory CSV buffer and loaded with ``COPY ... FROM
+    STDIN``.
+
+    Missing values (``None``, ``np.nan``, ``pd.NaT``, and ``pd.NA``) are
+    written as ``NULL``. Values that aren't numbers, strings, or bytes are
+    written as strings, so datetimes are written like
+    ``'2020-01-02 00:00:00'``. The index isn't written.
+
+    Usage:
+      >>> import sqlite3
+      >>> import pandas as pd
+      >>> from etl_toolbox.database_functions import write_frame
+      >>> connection = sqlite3.connect(':memory:')
+      >>> df = pd.DataFrame({'email': ['aaa@aaa.com', None],
+      ...                    'visits': [3, 4]})
+      >>> write_frame(df, 'customers', connection)
+      2
+      >>> connection.execute('SELECT * FROM customers').fetchall()
+      [('aaa@aaa.com', 3), (None, 4)]
+
+    :param df:
+        A :class:`pandas.DataFrame` with unique column labels, which are used
+        as the column names.
+
+    :param table:
+        The name of the table.
+
+    :param connection:
+        A :mod:`sqlite3`, psycopg2, or psycopg connection, or a
+        :class:`ConnectionPool` of them.
+
+    :param create_table:
+        If ``True``, the table is created if it doesn't exist, with a column
+        type for each dtype. Default is ``True``.
+
+    :type create_table: boolean, optional
+
+    :param chunksize:
+        The number of rows converted and sent at a time. Default is
+        ``10000``.
+
+    :type chunksize: int, optional
+
+    :raises ValueError:
+        Raised if the column labels aren't unique, or if the connection
+        isn't from a supported driver.
+
+    :return:
+        Returns the number of rows written.
+    """
+    if isinstance(connection, ConnectionPool):
+        with connection.connection() as pooled_connection:
+            return write_frame(
+                df,
+                table,
+                pooled_connection,
+                create_table=create_table,
+                chunksize=chunksize,
+            )
+
+    if df.columns.duplicated().any():
+        raise ValueError('Column labels must be unique to be written.')
+
+    dialect = _dialect(connection)
+
+    try:
+        cursor = connection.cursor()
+        try:
+            if create_table:
+                cursor.execute(_create_table_sql(df, table, dialect))
+
+            for start in range(0, df.shape[0], chunksize):
+                chunk = df.iloc[start:start + chunksize]
+                if dialect == 'sqlite':
+                    cursor.executemany(
+                        _insert_sql(df, table), _parameter_rows(chunk)
+                    )
+                else:
+                    _copy(cursor, _copy_sql(df, table), _copy_csv(chunk))
+        finally:
+            cursor.close()
+
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+
+    return df.shape[0]
+
+
+def write_frames(frames, connection, max_workers=None, **kwargs):
+    """
+    Bulk loads a stream of frames into database tables, writing to
+    different tables in parallel
+
+    This is a shortcut for writing each frame with a :class:`BulkWriter`.
+
+    Usage:
+      >>> import functools, os, sqlite3, tempfile
+      >>> import pandas as pd
+      >>> from etl_toolbox.database_functions import ConnectionPool
+      >>> from etl_toolbox.database_functions import write_frames
+      >>> path = os.path.join(tempfile.mkdtemp(), 'ingest.db')
+      >>> pool = ConnectionPool(functools.partial(
+      ...     sqlite3.connect, path, check_same_thread=False))
+      >>> frames = [('a', pd.DataFrame({'x': [1, 2]})),
+      ...           ('b', pd.DataFrame({'y': ['z']})),
+      ...           ('a', pd.DataFrame({'x': [3]}))]
+      >>> sorted(write_frames(frames, pool).items())
+      [('a', 3), ('b', 1)]
+      >>> pool.close()
+
+    :param frames:
+        An iterable of ``(table, df)`` tuples. It is consumed lazily, so it
+        can be a generator.
+
+    :param connection:
+        A :class:`ConnectionPool`, or a single connection (which writes one
+        frame at a time).
+
+    :param max_workers:
+        See :class:`BulkWriter`.
+
+    :param kwargs:
+        Any other keyword arguments are passed to :func:`write_frame()`.
+
+    :return:
+        Returns a dict of the number of rows written to each table.
+    """
+    with BulkWriter(connection, max_workers=max_workers, **kwargs) as writer:
+        for table, df in frames:
+            writer.write(table, df)
+
+    return writer.row_counts
+
+
+class BulkWriter:
+    """
+    Writes frames to database tables on background threads
+
+    Frames for the same table are written one at a time, in the order they
+    are given, so only one connection writes to a table at once. Frames for
+    different tables are written in parallel, each with its own connection
+    from the pool. :meth:`write` waits when ``2 * max_workers`` frames are
+    waiting to be written, so a fast producer can't fill memory with
+    frames.
+
+    It can be used as the ``on_result`` function of
+    :func:`ingest_functions.ingest_files()
+    <etl_toolbox.ingest_functions.ingest_files>`:
+
+      >>> with BulkWriter(pool) as writer:  # doctest: +SKIP
+      ...     ingest_files(file_paths, on_result=lambda path, df:
+      ...                  writer.write('customers', df))
+
+    Leaving the ``with`` block waits for every frame to be written, and
+    raises the first error from any of the writes.
+
+    :param connection:
+        A :class:`ConnectionPool`, or a single connection. A single
+        connection can't be shared between threads, so frames are written
+        one at a time with it.
+
+    :param max_workers:
+        The maximum number of tables written at once. Default is the
+        ``max_size`` of the pool, or ``1`` for a single connection.
+
+    :type max_workers: int, optional
+
+    :param kwargs:
+        Any other keyword arguments are passed to :func:`write_frame()`.
+
+    :ivar row_counts:
+        A dict of the number of rows written to each table so far.
+    """
+
+    def __init__(self, connection, max_workers=None, **kwargs):
+        if not isinstance(connection, ConnectionPool):
+            max_workers = 1
+        elif max_workers is None:
+            max_workers = connection.max_size
+
+        self.connection = connection
+        self.max_workers = max_workers
+        self.row_counts = {}
+
+        self._kwargs = kwargs
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(2 * max_workers)
+        self._futures = []
+        self._error = None
+
+    def write(self, table, df):
+        """
+        Queues ``df`` to be written to ``table``.
+
+        :raises Exception:
+            Raises the error of an earlier write that failed.
+        """
+        self._slots.acquire()
+        with self._lock:
+            if self._error is not None:
+                self._slots.release()
+                raise self._error
+
+            # A table that already has queued frames has a task draining
+            # them, which picks up this frame too
+            frames = self._queues.get(table)
+            if frames is None:
+                frames = self._queues[table] = collections.deque()
+                self._futures.append(
+                    self._executor.submit(self._drain, table)
+                )
+            frames.append(df)
+
+    def close(self):
+        """
+        Waits for the queued frames to be written.
+
+        :raises Exception:
+            Raises the first error from any of the writes.
+        """
+        self._executor.shutdown(wait=True)
+        for future in self._futures:
+            future.result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _drain(self, table):
+        """
+        Writes the frames queued for ``table`` until there are none left.
+        """
+        while True:
+            with self._lock:
+                frames = self._queues[table]
+                if not frames or self._error is not None:
+                    # Frames left after an error are dropped
+                    for _ in frames:
+                        self._slots.release()
+                    del self._queues[table]
+                    return
+                df = frames.popleft()
+
+            try:
+                rows = write_frame(df, table, self.connection, **self._kwargs)
+            except BaseException as e:
+                with self._lock:
+                    if self._error is None:
+                        self._error = e
+                raise
+            finally:
+                self._slots.release()
+
+            with self._lock:
+                self.row_counts[table] = self.row_counts.get(table, 0) + rows
+
+
+def _dialect(connection):
+    """
+    Returns ``'sqlite'`` or ``'postgres'`` for a DB-API ``connection``,
+    based on the module of its class. The drivers aren't imported to check.
+    """
+    module = type(connection).__module__.split('.')[0]
+    if module in ('sqlite3', '_sqlite3'):
+        return 'sqlite'
+    if module in ('psycopg2', 'psycopg'):
+        return 'postgres'
+
+    raise ValueError(
+        'Unsupported connection type {!r}. Connections must be from sqlite3, '
+        'psycopg2, or psycopg.'.format(type(connection).__name__)
+    )
+
+
+def _quote(name):
+    """
+    Returns ``name`` as a quoted SQL identifier.
+    """
+    return '"{}"'.format(str(name).replace('"', '""'))
+
+
+def _column_type(dtype, dialect):
+    """
+    Returns the SQL column type for a pandas ``dtype``.
+    """
+    if isinstance(dtype, pd.SparseDtype):
+        dtype = dtype.subtype
+
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'INTEGER' if dialect == 'sqlite' else 'BOOLEAN'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER' if dialect == 'sqlite' else 'BIGINT'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL' if dialect == 'sqlite' else 'DOUBLE PRECISION'
+    if dialect == 'postgres':
+        if pd.api.types.is_datetime64tz_dtype(dtype):
+            return 'TIMESTAMPTZ'
+        if pd.api.types.is_datetime64_dtype(dtype):
+            return 'TIMESTAMP'
+        if pd.api.types.is_timedelta64_dtype(dtype):
+            return 'INTERVAL'
+    return 'TEXT'
+
+
+def _create_table_sql(df, table, dialect):
+    return 'CREATE TABLE IF NOT EXISTS {} ({})'.format(
+        _quote(table),
+        ', '.join(
+            '{} {}'.format(_quote(label), _column_type(dtype, dialect))
+            for label, dtype in df.dtypes.items()
+        ),
+    )
+
+
+def _insert_sql(df, table):
+    return 'INSERT INTO {} ({}) VALUES ({})'.format(
+        _quote(table),
+        ', '.join(_quote(label) for label in df.columns),
+        ', '.join('?' * df.shape[1]),
+    )
+
+
+def _copy_sql(df, table):
+    return 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+        _quote(table),
+        ', '.join(_quote(label) for label in df.columns),
+    )
+
+
+def _column_values(column):
+    """
+    Returns the values of ``column`` as an object :class:`numpy.ndarray` of
+    Python objects that drivers accept, with ``None`` for missing values.
+    """
+    null_mask = column.isna().to_numpy(dtype=bool)
+    dtype = column.dtype
+
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iufb':
+        # Converting a numpy array to object gives Python scalars
+        values = column.to_numpy().astype(object)
+    else:
+        values = column.to_numpy(dtype=object).copy()
+        for i, x in enumerate(values):
+            if isinstance(x, np.generic):
+                values[i] = x.item()
+            elif not isinstance(x, _PARAMETER_TYPES):
+                values[i] = str(x)
+
+    values[null_mask] = None
+    return values
+
+
+def _parameter_rows(df):
+    """
+    Returns an iterator of the rows of ``df`` as tuples of parameters.
+    """
+    return zip(*(_column_values(df.iloc[:, j]) for j in range(df.shape[1])))
+
+
+def _copy_csv(df):
+    """
+    Returns the rows of ``df`` as CSV text for ``COPY ... WITH (FORMAT
+    csv)``. Strings are always quoted, so that empty strings aren't read
+    as ``NULL`` (which is an unquoted empty field).
+    """
+    if not df.shape[0] or not df.shape[1]:
+        return ''
+
+    columns = [_copy_csv_column(df.iloc[:, j]) for j in range(df.shape[1])]
+    return '\n'.join(map(','.join, zip(*columns))) + '\n'
+
+
+def _copy_csv_column(column):
+    """
+    Returns the CSV fields of ``column`` as a list of strings.
+
+    Each column is formatted with the conversion for its dtype, so only
+    columns of mixed types check the type of each value. Categorical
+    columns format each category once.
+    """
+    null_mask = column.isna().to_numpy(dtype=bool)
+    dtype = column.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = _copy_csv_column(pd.Series(dtype.categories))
+        # Missing values have the code -1, which takes the last field
+        fields = np.array(categories + [''], dtype=object)
+        return fields[column.cat.codes.to_numpy()].tolist()
+
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iub':
+        return list(map(str, column.to_numpy().tolist()))
+
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+        # Formatted like Python floats, as the other drivers see them
+        text = column.to_numpy().astype(np.float64).astype(str).tolist()
+    elif pd.api.types.infer_dtype(column, skipna=True) == 'string':
+        values = column.to_numpy(dtype=object, na_value='')
+        text = [
+            '"' + x.replace('"', '""') + '"' for x in values.tolist()
+        ]
+    else:
+        return list(map(_copy_csv_field, _column_values(column)))
+
+    for i in np.flatnonzero(null_mask).tolist():
+        text[i] = ''
+    return text
+
+
+def _copy_csv_field(x):
+    """
+    Returns a value from :func:`_column_values()` as a CSV field.
+    """
+    if x is None:
+        return ''
+    if isinstance(x, (int, float)):
+        return str(x)
+    if isinstance(x, bytes):
+        x = '\\x' + x.hex()
+    return '"{}"'.format(x.replace('"', '""'))
+
+
+def _copy(cursor, sql, data):
+    """
+    Runs a ``COPY ... FROM STDIN`` statement with ``data`` on a psycopg2 or
+    psycopg cursor.
+    """
+    if hasattr(cursor, 'copy_expert'):
+        cursor.copy_expert(sql, io.StringIO(data))
+    else:
+        with cursor.copy(sql) as copy:
+            copy.write(data)
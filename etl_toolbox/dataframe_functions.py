@@ -2,14 +2,26 @@
 .. epigraph:: Functions for working with :class:`pandas.DataFrame`\\ s
 '''
 
+import collections
+import difflib
+import itertools
+import json
+import re
+
 import numpy as np
 import pandas as pd
 
-from .cleaning_functions import clean_null, fingerprint
+from . import _kernel, file_functions
+from .cleaning_functions import NULL_INDICATORS, fingerprint
+from .mapping_functions import rename_duplicate_labels
 
 
 def find_column_labels(
-    df, label_fingerprints, label_match_thresh=3, special_characters=''
+    df,
+    label_fingerprints,
+    label_match_thresh=3,
+    special_characters='',
+    return_new=False,
 ):
     """
     Finds a row of column labels within a :class:`pandas.DataFrame` based on
@@ -58,6 +70,10 @@ def find_column_labels(
         A :class:`pandas.DataFrame` containing column labels as a row, possibly
         preceded by misc. non-data rows.
 
+        A :class:`polars.DataFrame` or :class:`polars.LazyFrame` can also be
+        passed. See :func:`polars_functions.find_column_labels()
+        <etl_toolbox.polars_functions.find_column_labels>`.
+
     :param label_fingerprints:
         Fingerprinted label names that are expected in the column labels row.
         It can contain many variations on the expected label names, which
@@ -75,7 +91,12 @@ def find_column_labels(
         :mod:`~etl_toolbox.mapping_functions` module can be passed as
         ``label_fingerprints``.
 
-    :type label_fingerprints: set, list, or dict
+        For large collections of fingerprints, the sorted array of hashes
+        returned by :func:`mapping_functions.hash_fingerprints()
+        <etl_toolbox.mapping_functions.hash_fingerprints>` can be passed
+        instead, which uses much less memory.
+
+    :type label_fingerprints: set, list, dict, or numpy.ndarray
 
     :param label_match_thresh:
         The number of fingerprints that must be found in
@@ -142,6 +163,12 @@ def find_column_labels(
 
     :type special_characters: string, optional
 
+    :param return_new:
+        If ``True``, ``df`` is left unchanged and a new
+        :class:`~pandas.DataFrame` is returned instead. Default is ``False``.
+
+    :type return_new: boolean, optional
+
     :raises IndexError:
         Raised if a label row can not be identified in the given
         :class:`~pandas.DataFrame`.
@@ -150,84 +177,88 @@ def find_column_labels(
         Raised if the ``label_match_thresh`` is set to `0`.
 
     :return:
-        Returns ``None``. The ``df`` argument is mutated.
+        Returns ``None``. The ``df`` argument is mutated. If ``return_new`` is
+        ``True``, returns a new :class:`~pandas.DataFrame` instead. Polars
+        frames are immutable, so a new Polars frame is always returned.
+
+    .. note::
+       The rows below the label row are copied exactly once, so peak memory
+       use is at most the size of ``df`` plus the size of the result.
     """
+    if is_polars_frame(df):
+        from . import polars_functions
+
+        return polars_functions.find_column_labels(
+            df,
+            label_fingerprints,
+            label_match_thresh=label_match_thresh,
+            special_characters=special_characters,
+        )
+
     if label_match_thresh == 0:
         raise ValueError("label_match_thresh can not be 0.")
 
     # First, check if the initial labels are already correct. If they are,
     # exit without changing df.
 
-    label_count = 0
+    label_count = _count_labels(
+        df.columns, label_fingerprints, special_characters
+    )
 
-    for cell in df.columns:
-        cell_fingerprint = fingerprint(
-            cell, special_characters=special_characters
-        )
-
-        if cell_fingerprint in label_fingerprints:
-            label_count += 1
-
-    
     if label_count >= label_match_thresh:
-        return None
+        return df.copy() if return_new else None
 
-    # Check whether the index is something other than the default RangeIndex,
-    # and temporarily change it to a RangeIndex if it is.
-    #
-    # This is necessary because pandas doesn't provide a way to drop rows in
-    # place using integer locations, however using the named index will produce
-    # unexpected results if the DataFrame has duplicate index values.
-    initial_index = df.index
-    initial_index_is_default = index_is_default(df)
-
-    if not initial_index_is_default:
-        df.reset_index(drop=True, inplace=True)
-
-    # Iterate over rows to find the label index
-    label_index = None
+    # Iterate over rows to find the integer location of the label row.
+    # itertuples() avoids building a Series for every row.
+    label_iloc = None
 
-    for i, row in df.iterrows():
+    for i, row in enumerate(df.itertuples(index=False, name=None)):
         # Count the number of fingerprinted cell values found in
         # label_fingerprints for this row
-        label_count = 0
-
-        for cell in row.iteritems():
-            cell_fingerprint = fingerprint(
-                cell[1], special_characters=special_characters
-            )
-
-            if cell_fingerprint in label_fingerprints:
-                label_count += 1
+        label_count = _count_labels(
+            row, label_fingerprints, special_characters
+        )
 
-        # When label row is found, record the index and break
+        # When label row is found, record the location and break
         if label_count >= label_match_thresh:
-            label_index = i
+            label_iloc = i
             break
 
-    if label_index is None:
+    if label_iloc is None:
         raise IndexError(
             'Label row could not be identified. Make sure '
             'label_fingerprints contains the expected label names.'
         )
 
-    # Set DataFrame column labels
-    df.rename(columns=df.loc[label_index], inplace=True)
-
-    # Remove rows up to and including the label index
-    df.drop(df.loc[:label_index].index, inplace=True)
+    labels = pd.Index(df.iloc[label_iloc].tolist(), name=df.columns.name)
 
-    # If the initial index was a default RangeIndex, reset it so it is
-    # numbered from 0.
-    # Otherwise, restore the intial index, sliced to line up with the
-    # modified DataFrame.
-    if initial_index_is_default:
-        df.reset_index(drop=True, inplace=True)
+    # If the initial index was a default RangeIndex, number the result from
+    # 0. Otherwise, keep the initial index, sliced to line up with the
+    # result.
+    if index_is_default(df):
+        new_index = pd.RangeIndex(df.shape[0] - label_iloc - 1)
     else:
-        df.index = initial_index[label_index + 1:]
+        new_index = df.index[label_iloc + 1:]
+
+    if return_new:
+        # Slicing returns a view, so this is the only copy of the data
+        new_df = df.iloc[label_iloc + 1:].copy()
+        new_df.columns = labels
+        new_df.index = new_index
+        return new_df
 
+    # pandas doesn't provide a way to drop rows in place using integer
+    # locations, and dropping by the named index will produce unexpected
+    # results if it has duplicate values. Relabeling the index is cheap
+    # (no data is copied), so a temporary RangeIndex is used for the drop.
+    df.index = pd.RangeIndex(df.shape[0])
+    df.drop(index=range(label_iloc + 1), inplace=True)
 
-def merge_columns_by_label(df, deduplicate_values=False):
+    df.columns = labels
+    df.index = new_index
+
+
+def merge_columns_by_label(df, deduplicate_values=False, return_new=False):
     """
     Merges columns of a :class:`pandas.DataFrame` that have identical labels
 
@@ -270,6 +301,10 @@ def merge_columns_by_label(df, deduplicate_values=False):
     :param df:
         A :class:`pandas.DataFrame`.
 
+        A :class:`polars.DataFrame` or :class:`polars.LazyFrame` can also be
+        passed, but since Polars doesn't allow duplicate column labels it will
+        be returned unchanged.
+
     :param deduplicate_values:
         If ``True``, the values of the combined columns will be deduplicated
         and stored in the modified :class:`~pandas.DataFrame` as a `set`
@@ -277,50 +312,101 @@ def merge_columns_by_label(df, deduplicate_values=False):
 
     :type deduplicate_values: boolean, optional
 
+    :param return_new:
+        If ``True``, ``df`` is left unchanged and a new
+        :class:`~pandas.DataFrame` is returned instead. Default is ``False``.
+
+    :type return_new: boolean, optional
+
     :return:
-        Returns ``None``. The ``df`` argument is mutated.
+        Returns ``None``. The ``df`` argument is mutated. If ``return_new`` is
+        ``True``, returns a new :class:`~pandas.DataFrame` instead. Polars
+        frames are always returned.
+
+    .. note::
+       The columns that are kept are copied exactly once, so peak memory use
+       is at most the size of ``df`` plus the size of the result (including
+       the merged lists or sets).
     """
+    if is_polars_frame(df):
+        from . import polars_functions
+
+        return polars_functions.merge_columns_by_label(
+            df, deduplicate_values=deduplicate_values
+        )
 
-    # Get the set of duplicate column labels
-    duplicate_labels = set(df.columns[df.columns.duplicated()])
+    columns = df.columns
+    duplicated = columns.duplicated()
 
-    for label in duplicate_labels:
-        # Get integer location of first instance of label
-        first_iloc = next(i for i, x in enumerate(df.columns) if x == label)
+    if not duplicated.any():
+        return df.copy() if return_new else None
 
-        # Make a new column that combines the values for all instances of label
-        temp_column = []
+    # Make a column for each duplicate label that combines the values for all
+    # instances of the label. It replaces the first instance of the label.
+    merged_columns = {}
 
-        for cell in df[label].values:
-            cell = [x for x in cell if not pd.isnull(x)]  # Remove None and nan
+    for label in columns[duplicated].unique():
+        locs = np.sort(columns.get_indexer_for([label]))
+
+        merged_column = np.empty(df.shape[0], dtype=object)
+
+        instances = [df.iloc[:, loc] for loc in locs]
+
+        for i, row in enumerate(zip(*instances)):
+            cell = [x for x in row if not pd.isnull(x)]  # Remove None and nan
 
             if deduplicate_values:
-                temp_column.append(set(cell))
+                merged_column[i] = set(cell)
             else:
-                temp_column.append(cell)
-
-        df.insert(first_iloc, 'temp', temp_column)
-
-        # Drop the duplicate columns
-        temp_labels = df.columns.tolist()
-        temp_labels[first_iloc] = 'temp'
-
-        if label is None:
-            # drop() can't take None as a column name, so this is a workaround.
-            # As long df doesn't contain this exact label name, it will work
-            # as expected.
-            placeholder_label = '**be15492e-d01e-4ab9-9f2c-116525a26897**-label'
-            df.columns = [
-                placeholder_label if x is None else x for x in df.columns
-            ]
-            df.drop(columns=placeholder_label, inplace=True)
-        else:
-            df.drop(columns=label, inplace=True)
+                merged_column[i] = cell
+
+        merged_columns[locs[0]] = merged_column
+
+    # Drop the other instances by integer location. Labeling the columns with
+    # their integer locations is cheap and avoids any problems with dropping
+    # labels like None.
+    keep_locs = np.flatnonzero(~duplicated)
+
+    if return_new:
+        new_df = df.take(keep_locs, axis=1)
+    else:
+        new_df = df
+        new_df.columns = pd.RangeIndex(columns.shape[0])
+        new_df.drop(columns=np.flatnonzero(duplicated), inplace=True)
+
+    new_df.columns = keep_locs
+
+    for loc, merged_column in merged_columns.items():
+        new_df[loc] = merged_column
+
+    new_df.columns = columns[keep_locs]
+
+    if return_new:
+        return new_df
+
 
-        # Name the new column back to the original label
-        temp_labels = df.columns.tolist()
-        temp_labels[first_iloc] = label
-        df.columns = temp_labels
+def _count_labels(cells, label_fingerprints, special_characters=''):
+    """
+    Returns the number of ``cells`` whose fingerprint is in
+    ``label_fingerprints``, which may be a sorted array of hashes.
+    """
+    if _kernel.is_hashed(label_fingerprints):
+        hashes = _kernel.classify_values(list(cells), special_characters)[0]
+        return int(
+            (_kernel.lookup_sorted(hashes, label_fingerprints) >= 0).sum()
+        )
+
+    label_count = 0
+
+    for cell in cells:
+        cell_fingerprint = fingerprint(
+            cell, special_characters=special_characters
+        )
+
+        if cell_fingerprint in label_fingerprints:
+            label_count += 1
+
+    return label_count
 
 
 def index_is_default(df):
@@ -334,12 +420,43 @@ def index_is_default(df):
     return df.index.equals(pd.RangeIndex(df.shape[0])) and df.index.name is None
 
 
+def is_polars_frame(df):
+    """
+    Returns ``True`` if ``df`` is a :class:`polars.DataFrame` or
+    :class:`polars.LazyFrame`.
+
+    Else returns ``False``. Polars is not imported to check.
+    """
+
+    return type(df).__module__.split('.')[0] == 'polars'
+
+
+#: The cells changed by :func:`dataframe_clean_null()`, returned when
+#: ``return_mask`` or ``dry_run`` is set. ``bits`` is a
+#: :func:`numpy.packbits` array with a row of bits for each column of the
+#: original frame, and ``shape`` is the original shape. ``dropped_rows``
+#: and ``dropped_columns`` are the labels of the rows and columns that were
+#: removed, and ``dropped_row_positions`` and ``dropped_column_positions``
+#: are their positions in the original frame (which identify them even if
+#: labels are duplicated).
+CleaningMask = collections.namedtuple(
+    'CleaningMask', [
+        'bits', 'shape', 'dropped_rows', 'dropped_columns',
+        'dropped_row_positions', 'dropped_column_positions',
+    ]
+)
+
+
 def dataframe_clean_null(
     df,
     empty_row_thresh=1,
     empty_column_thresh=1,
     falsey_is_null=False,
     special_characters='',
+    return_new=False,
+    sparse_thresh=None,
+    return_mask=False,
+    dry_run=False,
 ):
     """
     Cleans null values of a :class:`pandas.DataFrame` and removes empty
@@ -347,7 +464,9 @@ def dataframe_clean_null(
 
     .. warning::
        This function is computationally intensive and might be slow on large
-       :class:`~pandas.DataFrame`\\ s.
+       :class:`~pandas.DataFrame`\\ s with many object or string columns.
+       Numeric, boolean, datetime, and categorical columns are cleaned with
+       vectorized operations.
 
     Usage:
       >>> import pandas as pd
@@ -378,6 +497,10 @@ def dataframe_clean_null(
     :param df:
         A :class:`pandas.DataFrame`.
 
+        A :class:`polars.DataFrame` or :class:`polars.LazyFrame` can also be
+        passed. See :func:`polars_functions.dataframe_clean_null()
+        <etl_toolbox.polars_functions.dataframe_clean_null>`.
+
     :param empty_row_thresh:
         The number of non-null values required for a row to be considered
         populated/non-empty. Default is ``1``.
@@ -417,34 +540,1426 @@ def dataframe_clean_null(
 
     :type special_characters: string, optional
 
+    :param return_new:
+        If ``True``, ``df`` is left unchanged and a new
+        :class:`~pandas.DataFrame` is returned instead. Default is ``False``.
+
+    :type return_new: boolean, optional
+
+    :param sparse_thresh:
+        If given, columns whose ratio of null values (after empty rows are
+        removed) is at least ``sparse_thresh`` are stored as
+        :class:`pandas.SparseDtype` columns with ``np.nan`` as the fill
+        value. Each column is built from only its non-null values, so a
+        dense cleaned copy of the column is never made. The number of bytes
+        saved, compared to the dense columns, is stored in
+        ``df.attrs['sparse_bytes_saved']`` (not counting the values of the
+        objects in object columns, which are shared). Datetime, timedelta,
+        and categorical columns are left dense. Default is ``None`` (no
+        columns are made sparse). Polars frames ignore this argument.
+
+        Example:
+          >>> df = pd.DataFrame({'id': range(100),
+          ...                    'fax': ['n/a'] * 98 + ['555-1111', '-']})
+          >>> dataframe_clean_null(df, sparse_thresh=0.9)
+          >>> df.dtypes
+          id                   int64
+          fax    Sparse[object, nan]
+          dtype: object
+          >>> df.attrs['sparse_bytes_saved']
+          788
+
+    :type sparse_thresh: float, optional
+
+    :param return_mask:
+        If ``True``, a :class:`CleaningMask` of the cells that were set to
+        ``np.nan`` (not counting cells that were already missing) and the
+        labels and positions of the removed rows and columns is returned. The mask covers
+        every cell of the original ``df``, including the removed ones, and
+        takes one bit per cell. See :func:`unpack_cleaning_mask()` and
+        :func:`save_cleaning_mask()`. Default is ``False``.
+
+        Example:
+          >>> from etl_toolbox.dataframe_functions import (
+          ...     unpack_cleaning_mask)
+          >>> df = pd.DataFrame({'a': ['x', 'n/a', None], 'b': ['-', 'y', '']})
+          >>> mask = dataframe_clean_null(df, return_mask=True)
+          >>> unpack_cleaning_mask(mask)
+          array([[False,  True],
+                 [ True, False],
+                 [False,  True]])
+          >>> mask.dropped_rows.tolist(), mask.dropped_columns.tolist()
+          ([2], [])
+          >>> mask.dropped_row_positions
+          array([2])
+
+    :type return_mask: boolean, optional
+
+    :param dry_run:
+        If ``True``, ``df`` is left unchanged and only the
+        :class:`CleaningMask` is returned. Default is ``False``.
+
+    :type dry_run: boolean, optional
+
+    :raises ValueError:
+        Raised if ``return_mask`` or ``dry_run`` is set for a Polars frame.
+
     :return:
-        Returns ``None``. The ``df`` argument is mutated.
+        Returns ``None``. The ``df`` argument is mutated. If ``return_new`` is
+        ``True``, returns a new :class:`~pandas.DataFrame` instead. Polars
+        frames are immutable, so a new Polars frame is always returned.
+
+        If ``return_mask`` is ``True``, the :class:`CleaningMask` is returned
+        instead of ``None``, or as a tuple of ``(new_df, mask)`` if
+        ``return_new`` is also ``True``. If ``dry_run`` is ``True``, only the
+        mask is returned.
+
+    .. note::
+       The rows and columns to remove are found before ``df`` is changed, so
+       only the remaining values are copied. Peak memory use is at most twice
+       the size of ``df``, plus a boolean mask with one byte per cell. If
+       ``return_new`` is ``True`` and both rows and columns are removed, an
+       intermediate copy without the removed columns is also made.
     """
+    if is_polars_frame(df):
+        if return_mask or dry_run:
+            raise ValueError(
+                'return_mask and dry_run are only supported for pandas '
+                'DataFrames.'
+            )
 
-    initial_index_is_default = index_is_default(df)
+        from . import polars_functions
 
-    # Apply clean_null() to every cell in df
-    for i in range(df.shape[0]):
-        for j in range(df.shape[1]):
-            val = clean_null(
-                df.iloc[i, j],
-                falsey_is_null=falsey_is_null,
-                special_characters=special_characters,
+        return polars_functions.dataframe_clean_null(
+            df,
+            empty_row_thresh=empty_row_thresh,
+            empty_column_thresh=empty_column_thresh,
+            falsey_is_null=falsey_is_null,
+            special_characters=special_characters,
+        )
+
+    # Find the null cells, then find the rows and columns that will be kept
+    null_mask = _null_mask(
+        df,
+        falsey_is_null=falsey_is_null,
+        special_characters=special_characters,
+    )
+
+    keep_rows, keep_columns = _populated_masks(
+        null_mask, empty_row_thresh, empty_column_thresh
+    )
+
+    mask = None
+    if return_mask or dry_run:
+        mask = _cleaning_mask(df, null_mask, keep_rows, keep_columns)
+        if dry_run:
+            return mask
+
+    new_df = _apply_null_mask(
+        df,
+        null_mask,
+        keep_rows,
+        keep_columns,
+        return_new=return_new,
+        sparse_thresh=sparse_thresh,
+    )
+
+    if mask is None:
+        return new_df
+    if return_new:
+        return (new_df, mask)
+    return mask
+
+
+def unpack_cleaning_mask(mask):
+    """
+    Returns the :class:`CleaningMask` ``mask`` as a boolean
+    :class:`numpy.ndarray` with the shape of the original frame, which is
+    ``True`` for each cell that :func:`dataframe_clean_null()` set to
+    ``np.nan``.
+    """
+    n_rows, n_columns = mask.shape
+    if not n_rows or not n_columns:
+        return np.zeros(mask.shape, dtype=bool)
+
+    return np.unpackbits(mask.bits, axis=1, count=n_rows).T.astype(bool)
+
+
+def save_cleaning_mask(mask, file_path):
+    """
+    Saves a :class:`CleaningMask` to a compressed ``.npz`` file
+
+    The mask is stored as its packed bits, and the positions of the removed
+    rows and columns as integer arrays. The removed labels are stored as
+    JSON, so labels that aren't JSON types (like timestamps) are stored as
+    strings. Use the positions to find the removed rows and columns in the
+    original frame.
+
+    Usage:
+      >>> import pandas as pd
+      >>> from etl_toolbox.dataframe_functions import dataframe_clean_null
+      >>> from etl_toolbox.dataframe_functions import save_cleaning_mask
+      >>> from etl_toolbox.dataframe_functions import load_cleaning_mask
+      >>> df = pd.DataFrame({'a': ['x', 'n/a', None], 'b': ['-', 'y', '']})
+      >>> mask = dataframe_clean_null(df, dry_run=True)
+      >>> save_cleaning_mask(mask, 'audit.npz') # doctest:+SKIP
+      >>> load_cleaning_mask('audit.npz').dropped_rows # doctest:+SKIP
+      Index([2], dtype='object')
+
+    :param mask:
+        A :class:`CleaningMask`.
+
+    :param file_path:
+        The path to write to, or a binary file object.
+    """
+    labels = {
+        'dropped_rows': list(mask.dropped_rows),
+        'dropped_columns': list(mask.dropped_columns),
+    }
+
+    np.savez_compressed(
+        file_path,
+        bits=mask.bits,
+        shape=np.array(mask.shape, dtype=np.int64),
+        labels=np.array(json.dumps(labels, default=str)),
+        dropped_row_positions=mask.dropped_row_positions,
+        dropped_column_positions=mask.dropped_column_positions,
+    )
+
+
+def load_cleaning_mask(file_path):
+    """
+    Loads a :class:`CleaningMask` saved by :func:`save_cleaning_mask()`. The
+    removed labels are returned as :class:`pandas.Index`\\ es of object
+    dtype.
+    """
+    with np.load(file_path, allow_pickle=False) as data:
+        labels = json.loads(str(data['labels']))
+        return CleaningMask(
+            bits=data['bits'],
+            shape=tuple(int(n) for n in data['shape']),
+            dropped_rows=pd.Index(labels['dropped_rows'], dtype=object),
+            dropped_columns=pd.Index(labels['dropped_columns'], dtype=object),
+            dropped_row_positions=data['dropped_row_positions'],
+            dropped_column_positions=data['dropped_column_positions'],
+        )
+
+
+def _cleaning_mask(df, null_mask, keep_rows, keep_columns):
+    """
+    Returns the :class:`CleaningMask` for cleaning ``df`` with
+    ``null_mask``, ``keep_rows``, and ``keep_columns``.
+    """
+    n_rows, n_columns = df.shape
+    bits = np.zeros((n_columns, (n_rows + 7) // 8), dtype=np.uint8)
+
+    # Each column is packed separately, so only one column's mask is
+    # unpacked at a time
+    for j in range(n_columns):
+        changed = null_mask[:, j] & df.iloc[:, j].notna().to_numpy(dtype=bool)
+        bits[j] = np.packbits(changed)
+
+    return CleaningMask(
+        bits=bits,
+        shape=(n_rows, n_columns),
+        dropped_rows=df.index[~keep_rows],
+        dropped_columns=df.columns[~keep_columns],
+        dropped_row_positions=np.flatnonzero(~keep_rows),
+        dropped_column_positions=np.flatnonzero(~keep_columns),
+    )
+
+
+def _apply_null_mask(
+    df,
+    null_mask,
+    keep_rows,
+    keep_columns,
+    return_new=False,
+    sparse_thresh=None,
+):
+    """
+    Removes the rows and columns of ``df`` that aren't marked in
+    ``keep_rows``/``keep_columns``, then sets the remaining cells marked in
+    ``null_mask`` to ``np.nan``. Columns with a null ratio of at least
+    ``sparse_thresh`` are made sparse (see :func:`dataframe_clean_null()`).
+
+    Mutates ``df`` and returns ``None``, or returns a new
+    :class:`~pandas.DataFrame` if ``return_new`` is ``True``.
+    """
+    initial_index_is_default = index_is_default(df)
+    initial_index = df.index
+    initial_columns = df.columns
+
+    null_mask = null_mask[keep_rows][:, keep_columns]
+
+    # Remove the empty rows and columns first, so that only the values that
+    # are kept are copied.
+    row_locs = np.flatnonzero(keep_rows)
+    column_locs = np.flatnonzero(keep_columns)
+
+    drop_rows = row_locs.shape[0] < df.shape[0]
+    drop_columns = column_locs.shape[0] < df.shape[1]
+
+    if return_new:
+        new_df = df
+        if drop_columns:
+            new_df = new_df.take(column_locs, axis=1)
+        if drop_rows:
+            new_df = new_df.take(row_locs, axis=0)
+        if new_df is df:
+            new_df = df.copy()
+    else:
+        new_df = df
+        # Integer labels are used for the drops so that duplicate labels
+        # don't cause extra rows or columns to be removed.
+        new_df.index = pd.RangeIndex(df.shape[0])
+        new_df.columns = pd.RangeIndex(df.shape[1])
+        if drop_columns:
+            new_df.drop(
+                columns=np.flatnonzero(~keep_columns), inplace=True
+            )
+        if drop_rows:
+            new_df.drop(index=np.flatnonzero(~keep_rows), inplace=True)
+
+    # Set the null cells that are left to np.nan
+    new_df.columns = pd.RangeIndex(new_df.shape[1])
+    sparse_bytes_saved = 0
+
+    for j in range(new_df.shape[1]):
+        if sparse_thresh is not None and _use_sparse(
+            new_df[j], null_mask[:, j], sparse_thresh
+        ):
+            sparse_column = _sparse_column(new_df[j], null_mask[:, j])
+            new_df[j] = sparse_column
+
+            # Compared to the dense column that would have been made
+            dense_bytes = (
+                len(sparse_column) * sparse_column.dtype.subtype.itemsize
             )
-            if val is None:
-                df.iloc[i, j] = np.nan
+            sparse_bytes_saved += dense_bytes - sparse_column.nbytes
+        elif null_mask[:, j].any():
+            new_df.iloc[null_mask[:, j], j] = np.nan
 
-    # Drop rows with fewer populated cells than empty_row_thresh
-    df.dropna(axis=0, thresh=empty_row_thresh, inplace=True)
+    if sparse_thresh is not None:
+        new_df.attrs['sparse_bytes_saved'] = int(sparse_bytes_saved)
 
-    # Drop columns with fewer populated cells than empty_column_thresh
-    df.dropna(axis=1, thresh=empty_column_thresh, inplace=True)
+    # Reset the index if it was initially a default index
+    if initial_index_is_default:
+        new_df.index = pd.RangeIndex(new_df.shape[0])
+    else:
+        new_df.index = initial_index[row_locs]
+
+    new_df.columns = initial_columns[column_locs]
+
+    if return_new:
+        return new_df
+
+
+def _use_sparse(column, column_null_mask, sparse_thresh):
+    """
+    Returns ``True`` if ``column`` should be made sparse by
+    :func:`_apply_null_mask()`.
+    """
+    dtype = column.dtype
+    if (
+        not column_null_mask.shape[0]
+        or isinstance(dtype, (pd.CategoricalDtype, pd.SparseDtype))
+        or pd.api.types.is_datetime64_any_dtype(dtype)
+        or pd.api.types.is_timedelta64_dtype(dtype)
+    ):
+        return False
+
+    return column_null_mask.mean() >= sparse_thresh
+
+
+def _sparse_column(column, column_null_mask):
+    """
+    Returns a :class:`pandas.arrays.SparseArray` of ``column`` with the
+    cells marked in ``column_null_mask`` set to ``np.nan``, which is the
+    fill value.
+
+    Only the values that aren't marked are copied, so a dense copy of the
+    column is never made. Numeric columns stay numeric (integers become
+    floats, as they do when a dense column is given a ``np.nan``), and other
+    columns become object columns.
+    """
+    keep = ~column_null_mask
+
+    values = np.asarray(column.array[keep])
+    if values.dtype.kind in 'iuf':
+        values = values.astype(np.float64, copy=False)
+    else:
+        values = values.astype(object, copy=False)
+
+    # The integer sparse index class is only exposed through the public
+    # SparseArray.sp_index attribute
+    index_class = type(
+        pd.arrays.SparseArray([np.nan], fill_value=np.nan, kind='integer')
+        .sp_index
+    )
+    sparse_index = index_class(
+        len(column), np.flatnonzero(keep).astype(np.int32)
+    )
+
+    return pd.arrays.SparseArray(
+        values, sparse_index=sparse_index, fill_value=np.nan
+    )
+
+
+def _null_mask(df, falsey_is_null=False, special_characters=''):
+    """
+    Returns a boolean :class:`numpy.ndarray` with the same shape as ``df``
+    that is ``True`` for every cell that is *null-indicating*.
+    """
+    null_mask = np.zeros(df.shape, dtype=bool)
+
+    for j in range(df.shape[1]):
+        null_mask[:, j] = _column_null_mask(
+            df.iloc[:, j],
+            falsey_is_null=falsey_is_null,
+            special_characters=special_characters,
+        )
+
+    return null_mask
+
+
+def _column_null_mask(column, falsey_is_null=False, special_characters=''):
+    """
+    Returns a boolean :class:`numpy.ndarray` that is ``True`` for every
+    *null-indicating* value in the :class:`pandas.Series` ``column``.
+
+    Only object and string columns need :func:`clean_null()` to be called on
+    each value (through :func:`_kernel.classify_values()`, which uses the
+    compiled kernels if they are installed). The string representation of a
+    number, boolean, or date is never in ``NULL_INDICATORS`` (other than
+    ``'nan'``), so for those dtypes the only *null-indicating* values are the
+    ones pandas already considers missing, plus zero/``False`` if
+    ``falsey_is_null`` is set. Datetimes are never falsey.
+    """
+    dtype = column.dtype
+    null_mask = column.isna().to_numpy(dtype=bool)
+
+    if (
+        pd.api.types.is_numeric_dtype(dtype)
+        or pd.api.types.is_bool_dtype(dtype)
+    ):
+        if falsey_is_null:
+            null_mask |= (column == 0).fillna(False).to_numpy(dtype=bool)
+
+    elif pd.api.types.is_timedelta64_dtype(dtype):
+        if falsey_is_null:
+            null_mask |= (column == pd.Timedelta(0)).to_numpy(dtype=bool)
+
+    elif pd.api.types.is_datetime64_any_dtype(dtype):
+        pass
+
+    elif isinstance(dtype, pd.CategoricalDtype):
+        # Clean each category once, then look up the result for each value
+        category_null_mask = _column_null_mask(
+            pd.Series(dtype.categories),
+            falsey_is_null=falsey_is_null,
+            special_characters=special_characters,
+        )
+        codes = column.cat.codes.to_numpy()
+        null_mask |= category_null_mask[codes] & (codes >= 0)
+
+    else:
+        codes = _kernel.classify_values(
+            column.to_numpy(dtype=object), special_characters, hashes=False
+        )[1]
+        if falsey_is_null:
+            null_mask |= codes < len(_kernel.null_classes())
+        else:
+            null_mask |= codes < _kernel.falsey_code()
+
+    return null_mask
+
+
+def _populated_masks(
+    null_mask, empty_row_thresh, empty_column_thresh, column_counts=None
+):
+    """
+    Returns a tuple of boolean arrays marking the rows and columns that are
+    kept by :func:`dataframe_clean_null()` for a given ``null_mask``.
+
+    If ``null_mask`` is one part of a larger dataset, ``column_counts`` can be
+    given to apply ``empty_column_thresh`` to the populated cell counts of the
+    whole dataset instead.
+    """
+    populated = ~null_mask
+
+    # Rows with fewer populated cells than empty_row_thresh are removed
+    keep_rows = populated.sum(axis=1) >= empty_row_thresh
+
+    # Columns with fewer populated cells than empty_column_thresh are removed,
+    # counting only the rows that are kept
+    if column_counts is None:
+        column_counts = populated[keep_rows].sum(axis=0)
+
+    keep_columns = column_counts >= empty_column_thresh
 
     # Make sure there are no empty rows in the final df
     # (unless empty_row_thresh is 0)
     if empty_column_thresh > 1 and empty_row_thresh != 0:
-        df.dropna(axis=0, how='all', inplace=True)
+        keep_rows &= populated[:, keep_columns].any(axis=1)
 
-    # Reset the index if it was initially a default index
-    if initial_index_is_default:
-        df.reset_index(drop=True, inplace=True)
+    return keep_rows, keep_columns
+
+
+#: The result of :func:`profile_nulls()`.
+NullProfile = collections.namedtuple('NullProfile', ['columns', 'rows'])
+
+
+def profile_nulls(
+    data,
+    falsey_is_null=False,
+    special_characters='',
+    label_fingerprints=None,
+    label_match_thresh=3,
+    delimiter=None,
+    encoding='utf-8',
+):
+    """
+    Counts the *null-indicating* values in each column and row of a
+    :class:`pandas.DataFrame` or delimited file
+
+    Every value is classified once with
+    :func:`cleaning_functions.classify_null()
+    <etl_toolbox.cleaning_functions.classify_null>`, which applies the same
+    rules as :func:`dataframe_clean_null()`, so the counts can be used to
+    choose ``empty_row_thresh`` and ``empty_column_thresh`` without running
+    the cleaner repeatedly.
+
+    Usage:
+      >>> import pandas as pd
+      >>> from etl_toolbox.dataframe_functions import profile_nulls
+      >>> df = pd.DataFrame([
+      ...     ['AAA', 'null', None, 0],
+      ...     ['BAA', 'n/a', '{None, None}', 1],
+      ...     ['none', 'x', 'false', 0]
+      ... ], columns=['id', 'email', 'phone', 'count'])
+      >>> profile = profile_nulls(df)
+      >>> profile.columns.loc[:, profile.columns.any()]
+             missing  na  none  null  container  false  0  populated
+      id           0   0     1     0          0      0  0          2
+      email        0   1     0     1          0      0  0          1
+      phone        1   0     0     0          1      1  0          1
+      count        0   0     0     0          0      0  2          3
+      >>> profile.rows
+      populated
+      0    0
+      1    0
+      2    2
+      3    1
+      4    0
+      Name: rows, dtype: int64
+
+      With the default ``empty_row_thresh=1``, :func:`dataframe_clean_null()`
+      would keep ``profile.rows[1:].sum()`` rows.
+
+    :param data:
+        A :class:`pandas.DataFrame`, or the path of a delimited file. Files
+        are read one row at a time with the same scanner as
+        :func:`file_functions.scan_null_ratios()
+        <etl_toolbox.file_functions.scan_null_ratios>`, so they are never
+        loaded into memory. Every field of a file is a string, so an empty
+        field is counted as ``''`` rather than ``'missing'``, and only fields
+        missing from short rows are ``'missing'``.
+
+    :param falsey_is_null:
+        Controls whether falsey values count as *null-indicating* in the
+        ``'populated'`` counts and in ``rows``. The falsey classes are
+        counted either way. Default is ``False``.
+
+    :type falsey_is_null: boolean, optional
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprints. See :func:`cleaning_functions.fingerprint()
+        <etl_toolbox.cleaning_functions.fingerprint>` for details.
+
+    :type special_characters: string, optional
+
+    :param label_fingerprints:
+        Only used when ``data`` is a file path. If given, the label row is
+        found as in :func:`file_functions.scan_column_labels()
+        <etl_toolbox.file_functions.scan_column_labels>` and only the rows
+        after it are profiled. Otherwise, columns are labeled by position.
+
+    :param label_match_thresh:
+        Only used with ``label_fingerprints``. Default is ``3``.
+
+    :param delimiter:
+        Only used when ``data`` is a file path. See
+        :func:`file_functions.scan_column_labels()
+        <etl_toolbox.file_functions.scan_column_labels>`.
+
+    :param encoding:
+        Only used when ``data`` is a file path. Default is ``'utf-8'``.
+
+    :return:
+        Returns a :class:`NullProfile` named tuple of:
+
+        - ``columns``: a :class:`pandas.DataFrame` with a row for each column
+          of ``data``, and a column counting each class returned by
+          :func:`cleaning_functions.classify_null()
+          <etl_toolbox.cleaning_functions.classify_null>` (``'missing'``,
+          each of ``NULL_INDICATORS``, ``'container'``, each of
+          ``FALSEY_INDICATORS``, and ``'falsey'``), plus a ``'populated'``
+          count of the values that are not *null-indicating*
+        - ``rows``: a :class:`pandas.Series` indexed by the number of
+          populated values in a row, counting the rows with that many
+    """
+    classes = _kernel.null_classes()
+    class_codes = {x: code for code, x in enumerate(classes)}
+
+    # Codes below null_limit are null-indicating. The falsey classes come
+    # last, so they are only included if falsey_is_null is set.
+    populated_code = len(classes)
+    null_limit = populated_code if falsey_is_null else _kernel.falsey_code()
+
+    if isinstance(data, str):
+        labels, counts, row_counts = _profile_file_nulls(
+            data,
+            populated_code,
+            null_limit,
+            label_fingerprints=label_fingerprints,
+            label_match_thresh=label_match_thresh,
+            special_characters=special_characters,
+            delimiter=delimiter,
+            encoding=encoding,
+        )
+    else:
+        labels = data.columns
+        counts = np.zeros((data.shape[1], populated_code + 1), dtype=np.int64)
+        row_counts = np.zeros(data.shape[0], dtype=np.int64)
+
+        for j in range(data.shape[1]):
+            codes = _column_null_codes(
+                data.iloc[:, j], class_codes, populated_code,
+                special_characters=special_characters,
+            )
+            counts[j] = np.bincount(codes, minlength=populated_code + 1)
+            row_counts += codes >= null_limit
+
+        row_counts = np.bincount(row_counts, minlength=len(labels) + 1)
+
+    columns = pd.DataFrame(
+        counts, index=labels, columns=classes + ['populated']
+    )
+    # Populated is the complement of null-indicating, which depends on
+    # falsey_is_null
+    columns['populated'] = columns.iloc[:, null_limit:].sum(axis=1)
+
+    rows = pd.Series(row_counts, name='rows')
+    rows.index.name = 'populated'
+
+    return NullProfile(columns, rows)
+
+
+def _column_null_codes(
+    column, class_codes, populated_code, special_characters=''
+):
+    """
+    Returns an integer :class:`numpy.ndarray` of the
+    :func:`profile_nulls()` class code of every value in ``column``.
+
+    Like :func:`_column_null_mask()`, only object and string columns need
+    each value to be classified.
+    """
+    dtype = column.dtype
+    codes = np.full(column.shape[0], populated_code, dtype=np.int64)
+    missing = column.isna().to_numpy(dtype=bool)
+
+    if pd.api.types.is_bool_dtype(dtype):
+        codes[~column.fillna(True).to_numpy(dtype=bool)] = (
+            class_codes['false']
+        )
+
+    elif pd.api.types.is_numeric_dtype(dtype):
+        # Integer zero fingerprints to '0', other zeros are just falsey
+        zero_class = (
+            '0' if pd.api.types.is_integer_dtype(dtype) else 'falsey'
+        )
+        codes[(column == 0).fillna(False).to_numpy(dtype=bool)] = (
+            class_codes.get(zero_class, class_codes['falsey'])
+        )
+
+    elif pd.api.types.is_timedelta64_dtype(dtype):
+        codes[(column == pd.Timedelta(0)).to_numpy(dtype=bool)] = (
+            class_codes['falsey']
+        )
+
+    elif pd.api.types.is_datetime64_any_dtype(dtype):
+        pass
+
+    elif isinstance(dtype, pd.CategoricalDtype):
+        # Classify each category once, then look up the result for each value
+        category_codes = _column_null_codes(
+            pd.Series(dtype.categories), class_codes, populated_code,
+            special_characters=special_characters,
+        )
+        value_codes = column.cat.codes.to_numpy()
+        codes = category_codes[value_codes]
+
+    else:
+        codes[:] = _kernel.classify_values(
+            column.to_numpy(dtype=object), special_characters, hashes=False
+        )[1]
+
+    codes[missing] = class_codes['missing']
+
+    return codes
+
+
+def _profile_file_nulls(
+    file_path,
+    populated_code,
+    null_limit,
+    label_fingerprints=None,
+    label_match_thresh=3,
+    special_characters='',
+    delimiter=None,
+    encoding='utf-8',
+):
+    """
+    Returns the labels, class counts, and row histogram of
+    :func:`profile_nulls()` for a delimited file, reading it one row at a
+    time.
+    """
+    rows = file_functions._scan_rows(
+        file_path, delimiter=delimiter, encoding=encoding
+    )
+
+    labels = []
+    if label_fingerprints is not None:
+        labels = file_functions._find_label_row(
+            rows,
+            label_fingerprints,
+            label_match_thresh=label_match_thresh,
+            special_characters=special_characters,
+        )[1]
+
+    counts = [[0] * (populated_code + 1) for _ in labels]
+    row_counts = [0] * (len(labels) + 1)
+    row_count = 0
+
+    while True:
+        # Classify the fields of a block of rows at once
+        block = list(itertools.islice(rows, 4096))
+        if not block:
+            break
+
+        codes = _kernel.classify_values(
+            [x for row in block for x in row],
+            special_characters,
+            hashes=False,
+        )[1].tolist()
+        k = 0
+
+        for row in block:
+            # Fields missing from short rows are missing, including the rows
+            # before a column first appears
+            if len(row) > len(counts):
+                for _ in range(len(row) - len(counts)):
+                    counts.append([0] * (populated_code + 1))
+                    counts[-1][0] = row_count
+                row_counts.extend([0] * (len(counts) + 1 - len(row_counts)))
+
+            populated = 0
+
+            for j in range(len(row)):
+                code = codes[k]
+                k += 1
+
+                counts[j][code] += 1
+                populated += code >= null_limit
+
+            for j in range(len(row), len(counts)):
+                counts[j][0] += 1
+
+            row_counts[populated] += 1
+            row_count += 1
+
+    labels = labels + list(range(len(labels), len(counts)))
+
+    return (
+        rename_duplicate_labels(labels),
+        np.array(counts, dtype=np.int64).reshape(-1, populated_code + 1),
+        np.array(row_counts, dtype=np.int64),
+    )
+
+
+#: Strings that :func:`infer_column_type()` recognizes as boolean values
+BOOLEAN_STRINGS = {
+    'true': True, 't': True, 'yes': True, 'y': True,
+    'false': False, 'f': False, 'no': False, 'n': False,
+}
+
+# Integers are parsed from strings like these without going through float,
+# so that large values are exact
+_INTEGER_REGEX = r'[+-]?[0-9]+\Z'
+
+# Numbers with leading zeros (like zip codes) are identifiers, not numbers
+_LEADING_ZEROS_REGEX = r'[+-]?0[0-9]'
+
+# The largest magnitude that every float64 integer below is exact up to
+_MAX_EXACT_FLOAT = 2**53
+
+
+def infer_column_type(
+    column, sample_size=1000, type_match_thresh=0.95, category_thresh=0.5
+):
+    """
+    Infers the type of the values in a :class:`pandas.Series`, such as a
+    column cleaned by :func:`dataframe_clean_null()`
+
+    The non-null values of ``column`` are sampled at evenly spaced positions,
+    and the first of these types that at least ``type_match_thresh`` of the
+    sample can be converted to is returned:
+
+    - ``'boolean'``: ``bool`` values, or strings in :data:`BOOLEAN_STRINGS`
+      (ignoring case)
+    - ``'integer'``: numbers (or numeric strings) without a fractional part
+    - ``'float'``: other numbers
+    - ``'datetime'``: dates and times that :func:`pandas.to_datetime` can
+      parse
+    - ``'category'``: anything else, if the number of distinct values is at
+      most ``category_thresh`` times the number of values
+    - ``'string'``: anything else
+
+    Numeric strings with leading zeros, like zip codes, aren't counted as
+    numbers, since converting them would lose the zeros.
+
+    Usage:
+      >>> import pandas as pd
+      >>> from etl_toolbox.dataframe_functions import infer_column_type
+      >>> infer_column_type(pd.Series(['1', ' 2', None, '30']))
+      'integer'
+      >>> infer_column_type(pd.Series(['2020-06-07', '07jun2020']))
+      'datetime'
+      >>> infer_column_type(pd.Series(['Yes', 'no', 'YES']))
+      'boolean'
+      >>> infer_column_type(pd.Series(['red', 'blue', 'red', 'red']))
+      'category'
+
+    :param column:
+        A :class:`pandas.Series`.
+
+    :param sample_size:
+        The maximum number of values to sample. Default is ``1000``.
+
+    :type sample_size: int, optional
+
+    :param type_match_thresh:
+        The fraction of the sample that must match a type. Default is
+        ``0.95``.
+
+    :type type_match_thresh: float, optional
+
+    :param category_thresh:
+        The maximum ratio of distinct values to values for ``'category'``,
+        counted over the whole column. Default is ``0.5``.
+
+    :type category_thresh: float, optional
+
+    :return:
+        Returns one of the type names above, or ``None`` if ``column`` has
+        no non-null values or a dtype (like ``timedelta64``) that isn't
+        converted.
+    """
+    dtype = column.dtype
+
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'boolean'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'integer'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'category'
+
+    values = column.dropna()
+    if not len(values):
+        return None
+
+    if pd.api.types.is_float_dtype(dtype):
+        return 'integer' if (values % 1 == 0).all() else 'float'
+
+    if not (
+        pd.api.types.is_object_dtype(dtype)
+        or pd.api.types.is_string_dtype(dtype)
+    ):
+        return None
+
+    positions = np.unique(
+        np.linspace(0, len(values) - 1, min(sample_size, len(values)))
+        .astype(np.int64)
+    )
+    sample = _stripped_strings(values.iloc[positions])
+
+    def matches(converted):
+        return converted.notna().mean() >= type_match_thresh
+
+    if matches(sample.str.lower().map(BOOLEAN_STRINGS)):
+        return 'boolean'
+
+    leading_zeros = sample.str.match(_LEADING_ZEROS_REGEX).astype(bool)
+    numbers = pd.to_numeric(sample.where(~leading_zeros), errors='coerce')
+    if matches(numbers):
+        integers = sample.str.match(_INTEGER_REGEX).astype(bool) | (
+            numbers % 1 == 0
+        )
+        return 'integer' if integers[numbers.notna()].all() else 'float'
+
+    if matches(pd.to_datetime(sample, errors='coerce')):
+        return 'datetime'
+
+    if values.nunique() <= category_thresh * len(values):
+        return 'category'
+
+    return 'string'
+
+
+def coerce_column_types(
+    df,
+    column_types=None,
+    sample_size=1000,
+    type_match_thresh=0.95,
+    category_thresh=0.5,
+    string_dtype=None,
+    return_new=False,
+):
+    """
+    Converts each column of a :class:`pandas.DataFrame` to the most compact
+    dtype for its inferred type, and reports the values that couldn't be
+    converted
+
+    This is meant to follow :func:`dataframe_clean_null()`, which leaves the
+    columns of a file as ``object`` columns. Each column's type is found with
+    :func:`infer_column_type()` and the column is converted in bulk:
+
+    - ``'integer'`` columns are downcast to the smallest integer dtype that
+      holds their values (a nullable ``Int`` dtype if they have nulls)
+    - ``'float'`` columns become ``float64``
+    - ``'boolean'`` columns become ``bool`` (or nullable ``boolean``)
+    - ``'datetime'`` columns become ``datetime64[ns]``
+    - ``'category'`` columns become ``category``
+    - ``'string'`` columns become ``string_dtype``
+
+    Values that can't be converted to their column's type are set to null,
+    and returned so that they can be checked.
+
+    Usage:
+      >>> import pandas as pd
+      >>> from etl_toolbox.dataframe_functions import coerce_column_types
+      >>> df = pd.DataFrame({
+      ...     'id': ['1', '2', '3', '4'],
+      ...     'score': ['1.5', '2', None, '4.25'],
+      ...     'active': ['yes', 'no', 'Y', 'n'],
+      ...     'color': ['red', 'blue', 'red', 'red'],
+      ... })
+      >>> coerce_column_types(df)
+      {}
+      >>> df.dtypes
+      id            int8
+      score      float64
+      active        bool
+      color     category
+      dtype: object
+      >>> df = pd.DataFrame({'count': ['1', '2', 'three', '4']})
+      >>> failures = coerce_column_types(df, type_match_thresh=0.75)
+      >>> df['count'].tolist()
+      [1, 2, <NA>, 4]
+      >>> failures[0]
+      2    three
+      Name: count, dtype: object
+
+    :param df:
+        A :class:`pandas.DataFrame`.
+
+    :param column_types:
+        A dictionary of column labels mapped to type names, which are used
+        instead of inferring the types of those columns. ``None`` leaves a
+        column unchanged.
+
+    :type column_types: dict, optional
+
+    :param sample_size:
+        Passed to :func:`infer_column_type()`, along with
+        ``type_match_thresh`` and ``category_thresh``.
+
+    :param string_dtype:
+        The dtype of ``'string'`` columns. Default is ``'string[pyarrow]'``
+        if `pyarrow <https://arrow.apache.org/docs/python/>`_ is installed
+        and pandas supports it (pandas 1.3 or later), and ``'string'``
+        otherwise.
+
+    :param return_new:
+        If ``True``, ``df`` is left unchanged and a new
+        :class:`~pandas.DataFrame` is returned along with the failures.
+        Default is ``False``.
+
+    :type return_new: boolean, optional
+
+    :return:
+        Returns a dictionary of column positions mapped to a
+        :class:`pandas.Series` of the values in that column that couldn't be
+        converted, indexed like ``df`` and named by the column's label.
+        Columns are keyed by position so that columns with duplicate labels
+        are reported separately. Only columns with failures are included.
+        If ``return_new`` is ``True``, returns a tuple of the new
+        :class:`~pandas.DataFrame` and the dictionary.
+    """
+    if column_types is None:
+        column_types = {}
+
+    if string_dtype is None:
+        string_dtype = 'string'
+        try:
+            pd.api.types.pandas_dtype('string[pyarrow]')
+            string_dtype = 'string[pyarrow]'
+        except (ImportError, TypeError):
+            # pyarrow isn't installed, or pandas is older than 1.3
+            pass
+
+    new_df = df.copy(deep=False) if return_new else df
+
+    # Columns are replaced by position, so that duplicate labels are
+    # converted separately
+    labels = new_df.columns
+    new_df.columns = pd.RangeIndex(new_df.shape[1])
+
+    failures = {}
+
+    try:
+        for j, label in enumerate(labels):
+            column = new_df[j]
+
+            if label in column_types:
+                column_type = column_types[label]
+            else:
+                column_type = infer_column_type(
+                    column,
+                    sample_size=sample_size,
+                    type_match_thresh=type_match_thresh,
+                    category_thresh=category_thresh,
+                )
+
+            if column_type is None:
+                continue
+
+            converted = _coerce_column(column, column_type, string_dtype)
+
+            failed = converted.isna().to_numpy() & column.notna().to_numpy()
+            if failed.any():
+                failed_values = column[failed]
+                failed_values.index = df.index[failed]
+                failed_values.name = label
+                failures[j] = failed_values
+
+            new_df[j] = converted
+    finally:
+        new_df.columns = labels
+
+    if return_new:
+        return new_df, failures
+
+    return failures
+
+
+def _stripped_strings(values):
+    """
+    Returns ``values`` as stripped strings, keeping nulls.
+    """
+    return values.astype(str).str.strip().where(values.notna())
+
+
+def _coerce_column(column, column_type, string_dtype):
+    """
+    Returns ``column`` converted to the dtype for ``column_type`` (see
+    :func:`coerce_column_types()`). Values that can't be converted are null.
+    """
+    if column_type == 'category':
+        return column.astype('category')
+
+    if column_type == 'string':
+        return column.astype(string_dtype)
+
+    if column_type == 'datetime':
+        if pd.api.types.is_datetime64_any_dtype(column.dtype):
+            return column
+        return pd.to_datetime(_stripped_strings(column), errors='coerce')
+
+    if column_type == 'boolean':
+        if pd.api.types.is_bool_dtype(column.dtype):
+            return column
+        converted = _stripped_strings(column).str.lower().map(BOOLEAN_STRINGS)
+        if converted.isna().any():
+            return converted.astype('boolean')
+        return converted.astype(bool)
+
+    if column_type == 'float':
+        if pd.api.types.is_numeric_dtype(column.dtype):
+            return column.astype(np.float64)
+        return pd.to_numeric(_stripped_strings(column), errors='coerce')
+
+    if column_type != 'integer':
+        raise ValueError('Unknown column type {!r}.'.format(column_type))
+
+    if pd.api.types.is_integer_dtype(column.dtype):
+        # Already exact, so only the size changes
+        return pd.to_numeric(column, downcast='integer')
+
+    if pd.api.types.is_numeric_dtype(column.dtype):
+        numbers = column.astype(np.float64)
+        integers = numbers.where(numbers % 1 == 0)
+    else:
+        integers = _string_integers(column)
+
+    valid = integers.dropna()
+    if len(valid):
+        low, high = min(valid), max(valid)
+
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if not len(valid) or (low >= info.min and high <= info.max):
+            if len(valid) < len(integers):
+                # Nullable integer dtypes are named like 'Int8'
+                return pd.Series(
+                    pd.array(
+                        integers.astype(object).where(integers.notna(), None)
+                        .to_numpy(),
+                        dtype=np.dtype(dtype).name.capitalize(),
+                    ),
+                    index=column.index,
+                    name=column.name,
+                )
+            return integers.astype(dtype)
+
+    # Too large for an integer dtype
+    return integers
+
+
+def _string_integers(column):
+    """
+    Returns an ``object`` :class:`pandas.Series` of the values of ``column``
+    parsed as Python ``int``\\ s, or ``None`` where a value isn't an integer
+    or can't be converted exactly.
+
+    Integer strings are parsed directly, so they are never rounded. Other
+    numbers (like ``'2.0'`` or ``'1e3'``) are parsed as floats, and are only
+    kept if they are whole and small enough to be exact. Strings with leading
+    zeros are not converted.
+    """
+    strings = _stripped_strings(column)
+
+    leading_zeros = strings.str.match(_LEADING_ZEROS_REGEX)
+    leading_zeros = leading_zeros.fillna(False).astype(bool)
+    is_integer = strings.str.match(_INTEGER_REGEX).fillna(False).astype(bool)
+    is_integer &= ~leading_zeros
+
+    numbers = pd.to_numeric(
+        strings.where(~is_integer & ~leading_zeros), errors='coerce'
+    )
+    exact = (
+        (numbers % 1 == 0) & (numbers.abs() < _MAX_EXACT_FLOAT)
+    ).to_numpy()
+
+    integers = pd.Series(
+        np.empty(len(column), dtype=object), index=column.index,
+        name=column.name
+    )
+    integers[is_integer.to_numpy()] = [
+        int(x) for x in strings[is_integer.to_numpy()]
+    ]
+    integers[exact] = [int(x) for x in numbers[exact]]
+
+    return integers
+
+
+def find_duplicate_clusters(
+    df,
+    blocking_keys,
+    window=1,
+    similarity_thresh=0.9,
+    special_characters='',
+    chunksize=100000,
+):
+    """
+    Groups the rows of a :class:`pandas.DataFrame` into clusters of likely
+    duplicate records and returns a cluster ID for each row.
+
+    Each row is given a *blocking key* made from the fingerprints of the
+    values in the ``blocking_keys`` columns. Rows with the same blocking key
+    are placed in the same cluster. Instead of comparing every pair of rows,
+    the blocking keys are hashed and grouped, so the work grows roughly
+    linearly with the number of rows.
+
+    Usage:
+      >>> import pandas as pd
+      >>> from etl_toolbox.dataframe_functions import find_duplicate_clusters
+      >>> df = pd.DataFrame(
+      ...     [
+      ...         ["Jane Doe",   "jane@aaa.com", "111-111-1111"],
+      ...         ["JANE DOE",   "Jane@AAA.com", "(111) 111-1111"],
+      ...         ["John Roe",   "john@baa.com", "222-222-2222"],
+      ...         ["jane-doe",           "none", "111.111.1111"]
+      ...     ],
+      ...     columns=["name", "email", "phone"]
+      ... )
+      >>> find_duplicate_clusters(df, ["name", "email"]).tolist()
+      [0, 0, 1, 2]
+      >>> find_duplicate_clusters(df, [["name", "email"], ["phone"]]).tolist()
+      [0, 0, 1, 0]
+
+    :param df:
+        A :class:`pandas.DataFrame`.
+
+    :param blocking_keys:
+        The column labels to build the blocking key from. If a list of lists
+        is provided, each inner list is used as a separate blocking pass, and
+        rows that share a blocking key in **any** pass are clustered together
+        (clusters are transitive across passes).
+
+        Values are fingerprinted before comparison, and *null-indicating*
+        fingerprints (see :const:`cleaning_functions.NULL_INDICATORS
+        <etl_toolbox.cleaning_functions.NULL_INDICATORS>`) are treated as
+        empty. Rows whose blocking key is entirely empty are not clustered by
+        that pass.
+
+    :type blocking_keys: list
+
+    :param window:
+        The size of the sorted-neighborhood window. If greater than ``1``,
+        the blocking keys of each pass are sorted and every key is compared to
+        the next ``window - 1`` keys. Neighboring keys with a similarity ratio
+        of at least ``similarity_thresh`` are clustered together. Default is
+        ``1`` (only identical blocking keys are clustered).
+
+        .. note::
+           Sorted-neighborhood passes keep the fingerprinted blocking keys in
+           memory for the duration of the pass. With the default ``window``,
+           only a 64-bit hash of each key is kept, built from the
+           :func:`cleaning_functions.fingerprint_hash()
+           <etl_toolbox.cleaning_functions.fingerprint_hash>` of each value
+           without creating the key strings. Two different keys with the same
+           hash would be clustered together, but the odds are about one in
+           37 million for a million distinct keys.
+
+    :type window: int, optional
+
+    :param similarity_thresh:
+        The minimum :meth:`difflib.SequenceMatcher.ratio` for two neighboring
+        blocking keys to be clustered together when ``window`` is greater than
+        ``1``. Default is ``0.9``.
+
+    :type similarity_thresh: float, optional
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprints. See :func:`cleaning_functions.fingerprint()
+        <etl_toolbox.cleaning_functions.fingerprint>` for details.
+
+    :type special_characters: string, optional
+
+    :param chunksize:
+        The number of rows fingerprinted at a time. With the default
+        ``window``, this bounds the number of temporary fingerprint strings
+        held in memory. Sorted-neighborhood passes keep a key string for
+        every row regardless. Default is ``100000``.
+
+    :type chunksize: int, optional
+
+    :return:
+        Returns a :class:`pandas.Series` of integer cluster IDs with the same
+        index as ``df``. Cluster IDs are numbered from ``0`` in order of first
+        appearance.
+    """
+    if not len(blocking_keys):
+        raise ValueError("blocking_keys can not be empty.")
+
+    # A list of lists is a multi-pass blocking spec
+    if all(isinstance(x, (list, tuple)) for x in blocking_keys):
+        passes = blocking_keys
+    else:
+        passes = [blocking_keys]
+
+    n = df.shape[0]
+    groups = []
+    edges = []
+
+    for columns in passes:
+        if window > 1:
+            keys = _blocking_keys(df, columns, special_characters, chunksize)
+            empty = keys == ''
+
+            codes, uniques = pd.factorize(keys)
+            edges.append(
+                _sorted_neighborhood_edges(
+                    codes, uniques, window, similarity_thresh
+                )
+            )
+        else:
+            hashes, empty = _blocking_hashes(
+                df, columns, special_characters, chunksize
+            )
+            codes, uniques = pd.factorize(hashes)
+
+        codes[empty] = -1
+        groups.append(codes)
+
+    labels = _connected_components(n, groups, edges)
+
+    return pd.Series(
+        pd.factorize(labels)[0], index=df.index, name='cluster_id'
+    )
+
+
+def _fingerprint_series(s, special_characters=''):
+    """
+    Returns the fingerprints of the values in :class:`pandas.Series` ``s``,
+    with *null-indicating* fingerprints replaced by ``''``.
+    """
+    remove_regex = r'[^0-9a-z{}]'.format(re.escape(special_characters))
+
+    fingerprints = s.astype(str).str.lower().str.replace(
+        remove_regex, '', regex=True
+    )
+
+    return fingerprints.where(~fingerprints.isin(NULL_INDICATORS), '')
+
+
+def _blocking_keys(df, columns, special_characters, chunksize):
+    """
+    Returns an object array of fingerprinted blocking keys for ``df``, built
+    ``chunksize`` rows at a time.
+
+    The fingerprints are only temporary for each chunk, but the returned
+    array holds a key string for every row. Passes that only need to group
+    identical keys use :func:`_blocking_hashes()` instead.
+    """
+    # Fingerprints never contain a null character unless it's explicitly
+    # preserved, so it's safe to use as a separator.
+    separator = '' if '\x00' in special_characters else '\x00'
+
+    keys = np.empty(df.shape[0], dtype=object)
+
+    for start in range(0, df.shape[0], chunksize):
+        chunk = df.iloc[start:start + chunksize]
+
+        parts = [
+            _fingerprint_series(chunk[c], special_characters) for c in columns
+        ]
+        key = parts[0]
+        for part in parts[1:]:
+            key = key + separator + part
+
+        # A key made of only separators has no populated values
+        key = key.where(key.str.strip(separator) != '', '')
+
+        keys[start:start + chunksize] = key.to_numpy()
+
+    return keys
+
+
+def _blocking_hashes(df, columns, special_characters, chunksize):
+    """
+    Returns a ``uint64`` array of the hashed blocking keys for ``df``, and a
+    boolean array that is ``True`` where the blocking key is empty.
+
+    This matches hashing the keys from :func:`_blocking_keys()`, but each
+    column's fingerprints are hashed and combined a chunk at a time, so only
+    8 bytes per row are kept instead of a key string.
+    """
+    null_hashes = np.sort(_kernel.fnv1a_hashes(NULL_INDICATORS))
+    empty_hash = _kernel.fnv1a_hashes([''])[0]
+
+    n = df.shape[0]
+    hashes = np.full(n, _kernel.FNV_OFFSET, dtype=np.uint64)
+    empty = np.ones(n, dtype=bool)
+
+    for start in range(0, n, chunksize):
+        chunk = slice(start, start + chunksize)
+
+        for c in columns:
+            part = _kernel.classify_values(
+                df[c].iloc[chunk].astype(str).to_numpy(), special_characters
+            )[0]
+
+            # Null-indicating fingerprints are treated as empty
+            part_empty = _kernel.lookup_sorted(part, null_hashes) >= 0
+            part[part_empty] = empty_hash
+
+            with np.errstate(over='ignore'):
+                hashes[chunk] = (hashes[chunk] ^ part) * _kernel.FNV_PRIME
+            empty[chunk] &= part_empty
+
+    return hashes, empty
+
+
+def _sorted_neighborhood_edges(codes, uniques, window, similarity_thresh):
+    """
+    Returns a pair of row position arrays for every pair of similar blocking
+    keys found within ``window`` of each other in sorted order.
+    """
+    order = np.argsort(uniques)
+    sorted_keys = uniques[order]
+
+    matched_codes = []
+    for i in range(len(sorted_keys)):
+        if sorted_keys[i] == '':
+            continue
+
+        for j in range(i + 1, min(i + window, len(sorted_keys))):
+            ratio = difflib.SequenceMatcher(
+                None, sorted_keys[i], sorted_keys[j]
+            ).ratio()
+
+            if ratio >= similarity_thresh:
+                matched_codes.append((order[i], order[j]))
+
+    # Map each matched pair of keys back to a representative row position
+    first_rows = pd.Series(np.arange(len(codes))).groupby(codes).first()
+
+    left = np.array(
+        [first_rows[a] for a, b in matched_codes], dtype=np.int64
+    )
+    right = np.array(
+        [first_rows[b] for a, b in matched_codes], dtype=np.int64
+    )
+
+    return left, right
+
+
+def _connected_components(n, groups, edges):
+    """
+    Returns an array labeling each of ``n`` rows with the smallest row
+    position in its connected component.
+
+    ``groups`` is a list of code arrays where rows with the same code are
+    connected (``-1`` means unconnected), and ``edges`` is a list of
+    ``(left, right)`` row position arrays.
+    """
+    labels = np.arange(n)
+
+    while True:
+        previous = labels.copy()
+
+        for codes in groups:
+            connected = codes >= 0
+            group_min = pd.Series(labels[connected]).groupby(
+                codes[connected]
+            ).transform('min').to_numpy()
+            labels[connected] = np.minimum(labels[connected], group_min)
+
+        for left, right in edges:
+            edge_min = np.minimum(labels[left], labels[right])
+            np.minimum.at(labels, left, edge_min)
+            np.minimum.at(labels, right, edge_min)
+
+        # Point each label at its own label to shortcut long chains
+        labels = labels[labels]
+
+        if np.array_equal(labels, previous):
+            return labels
@@ -2,11 +2,56 @@
 .. epigraph:: Functions for working with files and directories
 '''
 
+import bz2
+import collections
+import contextlib
+import csv
+import functools
+import gzip
+import hashlib
+import io
+import lzma
+import mmap
 import os
 import re
+import tarfile
+import zipfile
 
+from .cleaning_functions import clean_null, fingerprint
+from .mapping_functions import rename_duplicate_labels
 
-def get_file_list_from_dir(dir_path, recursive=False, include_regex=None):
+#: Separates the path of an archive from the name of a file inside it in the
+#: virtual paths listed by :func:`get_file_list_from_dir()`, as in
+#: ``'drops/2020.zip!/customers.csv'``.
+ARCHIVE_SEPARATOR = '!/'
+
+# Archive extensions, mapped to the kind of archive
+_ARCHIVE_EXTENSIONS = {
+    '.zip': 'zip',
+    '.tar': 'tar',
+    '.tar.gz': 'tar',
+    '.tgz': 'tar',
+    '.tar.bz2': 'tar',
+    '.tbz2': 'tar',
+    '.tar.xz': 'tar',
+    '.txz': 'tar',
+}
+
+# Compressed file extensions, mapped to the codec
+_COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.zst': 'zstd',
+}
+
+
+def get_file_list_from_dir(
+    dir_path,
+    recursive=False,
+    include_regex=None,
+    expand_archives=False
+):
     r"""
     Returns a list of the files in a directory
 
@@ -44,6 +89,31 @@ def get_file_list_from_dir(dir_path, recursive=False, include_regex=None):
 
     :type include_regex: string, optional
 
+    :param expand_archives:
+        If set to ``True``, ``.zip`` and ``.tar`` archives (including
+        ``.tar.gz``, ``.tgz``, ``.tar.bz2``, and ``.tar.xz``) are replaced by
+        the files inside them, without extracting anything. Each file is
+        listed as a virtual path made of the archive path,
+        :data:`ARCHIVE_SEPARATOR`, and the file's name in the archive, so
+        ``include_regex`` is matched against the file names inside the
+        archive too. Virtual paths can be passed to :func:`open_file()` and
+        to every reader in :mod:`etl_toolbox.ingest_functions`. Default is
+        ``False``.
+
+        Opening each file of a compressed ``.tar`` archive separately
+        decompresses the archive up to that file every time (see
+        :func:`open_file()`). :func:`iter_archive_members()` reads all of
+        an archive's files in one pass.
+
+        Example:
+          >>> get_file_list_from_dir('drops', expand_archives=True,
+          ...                        include_regex=r'.*\.csv$') # doctest:+SKIP
+          ['drops/2020.zip!/customers.csv',
+           'drops/2020.zip!/orders/1.csv',
+           'drops/2021.tar.gz!/customers.csv']
+
+    :type expand_archives: boolean, optional
+
     :return:
         Returns list of file paths.
     """
@@ -53,7 +123,15 @@ def get_file_list_from_dir(dir_path, recursive=False, include_regex=None):
     # Collect file paths
     for root, dirs, files in os.walk(dir_path):
         for f in files:
-            file_list.append(os.path.normpath(os.path.join(root, f)))
+            path = os.path.normpath(os.path.join(root, f))
+
+            if expand_archives and _archive_kind(path) is not None:
+                file_list.extend(
+                    path + ARCHIVE_SEPARATOR + member
+                    for member in _archive_members(path)
+                )
+            else:
+                file_list.append(path)
 
         if not recursive:
             break
@@ -63,3 +141,737 @@ def get_file_list_from_dir(dir_path, recursive=False, include_regex=None):
         file_list = [f for f in file_list if re.match(include_regex, f)]
 
     return file_list
+
+
+def shard_file_list(
+    file_list,
+    shard_count,
+    shard_index=None,
+    sizes=None,
+    load_factor=1.1
+):
+    """
+    Splits a list of files into ``shard_count`` shards of about the same
+    total size
+
+    The assignment only depends on the file paths and sizes, so every
+    worker can compute its own shard from the same file list without
+    coordinating with the others.
+
+    Files are assigned from largest to smallest (longest processing time
+    first). Each file has its own order of preferred shards, from
+    rendezvous hashing of its path, and goes to the first of them that has
+    room for it under ``load_factor`` times the average shard size (or to
+    the least loaded shard, if none does). Since a file's preferences don't
+    depend on the other files, most files stay on the same shard when files
+    are added or removed.
+
+    Usage:
+      >>> from etl_toolbox.file_functions import shard_file_list
+      >>> file_list = ['a.csv', 'b.csv', 'c.csv', 'd.csv', 'e.csv']
+      >>> shard_file_list(file_list, 2, sizes=[900, 500, 400, 100, 50])
+      [['b.csv', 'c.csv', 'd.csv'], ['a.csv', 'e.csv']]
+
+      Each worker can compute just its own shard:
+      >>> shard_file_list(file_list, 2, shard_index=1,
+      ...                 sizes=[900, 500, 400, 100, 50])
+      ['a.csv', 'e.csv']
+
+    :param file_list:
+        A list of file paths, such as from :func:`get_file_list_from_dir()`.
+        Paths are hashed as strings, so every worker must list the files
+        with the same paths (for example, relative to the same directory).
+
+    :param shard_count:
+        The number of shards.
+
+    :type shard_count: int
+
+    :param shard_index:
+        If given, only the shard with this index (from ``0`` to
+        ``shard_count - 1``) is returned. Default is ``None``.
+
+    :type shard_index: int, optional
+
+    :param sizes:
+        The size of each file, as a list in the order of ``file_list`` or a
+        dictionary keyed by path. If ``None``, the sizes are read from the
+        file system, using the uncompressed size of files inside archives.
+        Default is ``None``.
+
+    :param load_factor:
+        How far above the average size a shard may grow before files move
+        past their preferred shard. Higher values keep more files on their
+        preferred shard as the list changes, and lower values balance the
+        shards more closely. Default is ``1.1``.
+
+    :type load_factor: float, optional
+
+    :raises ValueError:
+        Raised if ``shard_count`` is less than ``1``, ``shard_index`` is out
+        of range, or ``sizes`` is a list of a different length than
+        ``file_list``.
+
+    :return:
+        Returns a list of ``shard_count`` lists of file paths, or just the
+        list for ``shard_index`` if it is given. Files keep their order from
+        ``file_list`` within each shard.
+    """
+    if shard_count < 1:
+        raise ValueError('shard_count must be at least 1.')
+    if shard_index is not None and not 0 <= shard_index < shard_count:
+        raise ValueError(
+            'shard_index must be from 0 to {}.'.format(shard_count - 1)
+        )
+
+    file_list = list(file_list)
+    if sizes is None:
+        sizes = _file_sizes(file_list)
+    elif isinstance(sizes, dict):
+        sizes = [sizes[f] for f in file_list]
+    else:
+        sizes = list(sizes)
+        if len(sizes) != len(file_list):
+            raise ValueError('sizes must have one size for each file.')
+
+    capacity = load_factor * sum(sizes) / shard_count
+    loads = [0] * shard_count
+    assignments = [None] * len(file_list)
+
+    # Ties are broken by path, so the order doesn't depend on the order of
+    # file_list
+    order = sorted(
+        range(len(file_list)), key=lambda i: (-sizes[i], file_list[i], i)
+    )
+
+    for i in order:
+        preferences = _shard_preferences(file_list[i], shard_count)
+
+        for shard in preferences:
+            if loads[shard] + sizes[i] <= capacity:
+                break
+        else:
+            # The file doesn't fit anywhere, so it goes where it overflows
+            # the least
+            rank = {shard: r for r, shard in enumerate(preferences)}
+            shard = min(preferences, key=lambda s: (loads[s], rank[s]))
+
+        loads[shard] += sizes[i]
+        assignments[i] = shard
+
+    if shard_index is not None:
+        return [
+            f for f, shard in zip(file_list, assignments)
+            if shard == shard_index
+        ]
+
+    shards = [[] for _ in range(shard_count)]
+    for f, shard in zip(file_list, assignments):
+        shards[shard].append(f)
+    return shards
+
+
+def _shard_preferences(file_path, shard_count):
+    """
+    Returns the shards in the order that ``file_path`` prefers them, by
+    rendezvous (highest random weight) hashing. The hash is the same in
+    every process.
+    """
+    key = file_path.encode('utf-8', 'surrogateescape')
+
+    def weight(shard):
+        digest = hashlib.sha256(key + b'\0' + str(shard).encode('ascii'))
+        return digest.digest()[:8]
+
+    return sorted(range(shard_count), key=weight, reverse=True)
+
+
+def _file_sizes(file_list):
+    """
+    Returns the size of each file in ``file_list``. Each archive is only
+    listed once, however many of its files are in ``file_list``.
+    """
+    archives = {}
+    sizes = []
+
+    for file_path in file_list:
+        archive_path, member = split_archive_path(file_path)
+        if member is None:
+            sizes.append(os.path.getsize(file_path))
+            continue
+
+        if archive_path not in archives:
+            archives[archive_path] = _archive_members(archive_path)
+        sizes.append(archives[archive_path][member])
+
+    return sizes
+
+
+def open_file(file_path):
+    r"""
+    Opens a file for reading bytes, decompressing it as it is read
+
+    Files ending in ``.gz``, ``.bz2``, ``.xz``, or ``.zst`` are decompressed
+    as a stream, and virtual paths from :func:`get_file_list_from_dir()`
+    are read straight out of their archive (and decompressed too, if the
+    file inside the archive is compressed). Nothing is written to disk.
+
+    Gzip files are decompressed on a background thread with `python-isal
+    <https://github.com/pycompression/python-isal>`_ if it is installed.
+    Zstandard files require `zstandard
+    <https://github.com/indygreg/python-zstandard>`_.
+
+    Usage:
+      >>> from etl_toolbox.file_functions import open_file
+      >>> with open_file('test_data/animals.tsv') as f:
+      ...     f.readline()
+      b'common_name\tscientific_name\tEIN\tshirt_size\n'
+
+    Files in ``.zip`` archives and uncompressed ``.tar`` archives are found
+    without reading the files before them. A compressed ``.tar`` archive
+    (like ``.tar.gz``) can't be searched, so it is decompressed from the
+    start up to the file each time one of its files is opened. Opening
+    every file of such an archive this way decompresses it about once per
+    file, so use :func:`iter_archive_members()` to read them all in one
+    pass instead.
+
+    :param file_path:
+        The path of a file, or a virtual path of a file inside an archive.
+
+    :raises KeyError:
+        Raised if an archive doesn't contain the file named in a virtual
+        path.
+
+    :return:
+        Returns a binary file object, which should be closed after use.
+    """
+    archive_path, member = split_archive_path(file_path)
+
+    if member is None:
+        f = open(file_path, 'rb')
+    elif _archive_kind(archive_path) == 'zip':
+        with zipfile.ZipFile(archive_path) as archive:
+            # The member keeps the archive's file open until it is closed
+            f = archive.open(member)
+    else:
+        archive = tarfile.open(archive_path, 'r:*')
+        try:
+            stream = archive.extractfile(member)
+            if stream is None:
+                raise KeyError(
+                    '{!r} is not a file in {!r}.'.format(member, archive_path)
+                )
+        except BaseException:
+            archive.close()
+            raise
+        f = io.BufferedReader(_Stream(stream, [archive]))
+
+    return _open_member(f, member if member is not None else file_path)
+
+
+def iter_archive_members(archive_path):
+    """
+    Yields the virtual path and contents of each file in an archive, reading
+    the archive once from start to end
+
+    Files are yielded in archive order, with the same virtual paths as
+    :func:`get_file_list_from_dir()`, and compressed files inside the
+    archive are decompressed as they are read. Unlike calling
+    :func:`open_file()` for each file, this decompresses a compressed
+    ``.tar`` archive only once.
+
+    Usage:
+      >>> from etl_toolbox.file_functions import iter_archive_members
+      >>> for file_path, f in iter_archive_members(
+      ...         'drops/2021.tar.gz'):  # doctest: +SKIP
+      ...     print(file_path, len(f.read()))
+      drops/2021.tar.gz!/customers.csv 1024
+      drops/2021.tar.gz!/orders.csv.gz 4096
+
+    :param archive_path:
+        The path of a ``.zip`` or ``.tar`` archive.
+
+    :return:
+        Returns an iterator of ``(virtual_path, f)`` tuples, where ``f`` is
+        a binary file object. Each file object is closed when the next file
+        is yielded, so it must be read before the loop moves on.
+    """
+    if _archive_kind(archive_path) == 'zip':
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+
+                with _open_member(archive.open(info), info.filename) as f:
+                    yield archive_path + ARCHIVE_SEPARATOR + info.filename, f
+        return
+
+    # Opened as a stream, so the archive is never searched
+    with tarfile.open(archive_path, 'r|*') as archive:
+        for info in archive:
+            if not info.isfile():
+                continue
+
+            # Wrapped because the file objects of streamed archives don't
+            # have all of the io methods that readers use
+            stream = io.BufferedReader(
+                _Stream(archive.extractfile(info), [])
+            )
+            with _open_member(stream, info.name) as f:
+                yield archive_path + ARCHIVE_SEPARATOR + info.name, f
+
+
+def _open_member(f, name):
+    """
+    Returns ``f``, the binary file object of the file ``name`` (on disk or
+    in an archive), decompressed if ``name`` is a compressed file. ``f`` is
+    closed if that fails.
+    """
+    codec = _compression(name)
+    if codec is None:
+        return f
+
+    try:
+        return _decompress(f, codec)
+    except BaseException:
+        f.close()
+        raise
+
+
+def split_archive_path(file_path):
+    """
+    Splits a virtual path from :func:`get_file_list_from_dir()` into the
+    archive path and the name of the file inside it
+
+    Usage:
+      >>> from etl_toolbox.file_functions import split_archive_path
+      >>> split_archive_path('drops/2020.zip!/orders/1.csv')
+      ('drops/2020.zip', 'orders/1.csv')
+      >>> split_archive_path('drops/1.csv')
+      ('drops/1.csv', None)
+
+    :param file_path:
+        A file path, or a virtual path.
+
+    :return:
+        Returns a tuple of the archive path and the file name inside it, or
+        of ``file_path`` and ``None`` if it isn't a virtual path.
+    """
+    start = 0
+    while True:
+        i = file_path.find(ARCHIVE_SEPARATOR, start)
+        if i == -1:
+            return (file_path, None)
+
+        if _archive_kind(file_path[:i]) is not None:
+            return (file_path[:i], file_path[i + len(ARCHIVE_SEPARATOR):])
+
+        start = i + 1
+
+
+def uncompressed_name(file_path):
+    """
+    Returns the name that a file is read as by :func:`open_file()`: the
+    name inside its archive for virtual paths, without any compression
+    extension
+
+    Usage:
+      >>> from etl_toolbox.file_functions import uncompressed_name
+      >>> uncompressed_name('drops/2020.zip!/orders/1.csv.gz')
+      'orders/1.csv'
+      >>> uncompressed_name('drops/animals.tsv.zst')
+      'drops/animals.tsv'
+    """
+    name = split_archive_path(file_path)[1] or file_path
+    if _compression(name) is not None:
+        name = os.path.splitext(name)[0]
+    return name
+
+
+def _archive_kind(file_path):
+    """
+    Returns ``'zip'`` or ``'tar'`` if ``file_path`` has an archive
+    extension, or ``None`` otherwise.
+    """
+    lower = file_path.lower()
+    for extension, kind in _ARCHIVE_EXTENSIONS.items():
+        if lower.endswith(extension):
+            return kind
+    return None
+
+
+def _compression(file_path):
+    """
+    Returns the codec of a compressed (but not archived) file, or ``None``.
+    """
+    if _archive_kind(file_path) is not None:
+        return None
+    extension = os.path.splitext(file_path)[1].lower()
+    return _COMPRESSION_EXTENSIONS.get(extension)
+
+
+def _archive_members(archive_path):
+    """
+    Returns an :class:`~collections.OrderedDict` of the names of the files
+    in an archive, in archive order, mapped to their uncompressed sizes.
+    """
+    if _archive_kind(archive_path) == 'zip':
+        with zipfile.ZipFile(archive_path) as archive:
+            return collections.OrderedDict(
+                (info.filename, info.file_size)
+                for info in archive.infolist() if not info.is_dir()
+            )
+
+    with tarfile.open(archive_path, 'r:*') as archive:
+        return collections.OrderedDict(
+            (info.name, info.size) for info in archive if info.isfile()
+        )
+
+
+def _decompress(f, codec):
+    """
+    Returns a binary file object that decompresses ``f`` as it is read.
+    Closing it closes ``f``.
+    """
+    if codec == 'gzip':
+        try:
+            from isal import igzip_threaded
+        except ImportError:
+            stream = gzip.GzipFile(fileobj=f, mode='rb')
+        else:
+            # Reading and decompressing run on a separate thread, so they
+            # overlap with parsing
+            stream = igzip_threaded.open(f, 'rb', threads=1)
+    elif codec == 'bz2':
+        stream = bz2.BZ2File(f, 'rb')
+    elif codec == 'xz':
+        stream = lzma.LZMAFile(f, 'rb')
+    else:
+        import zstandard
+        stream = zstandard.ZstdDecompressor().stream_reader(
+            f, closefd=False
+        )
+
+    return io.BufferedReader(_Stream(stream, [f]))
+
+
+class _Stream(io.RawIOBase):
+    """
+    A raw binary stream that reads from ``stream`` and closes it along with
+    the ``parents`` it reads from.
+    """
+
+    def __init__(self, stream, parents):
+        self._stream = stream
+        self._parents = parents
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._stream.read(len(b))
+        n = len(data)
+        b[:n] = data
+        return n
+
+    def close(self):
+        if not self.closed:
+            try:
+                self._stream.close()
+            finally:
+                for parent in reversed(self._parents):
+                    parent.close()
+        super().close()
+
+
+def _mmap_lines(file_path, encoding='utf-8'):
+    """
+    Yields the decoded lines of a file, reading it through a memory map
+
+    Only one line is decoded at a time, so memory use doesn't depend on the
+    size of the file. ``encoding`` must be ASCII-compatible, since line
+    boundaries are found on the raw bytes.
+    """
+    with open(file_path, 'rb') as f:
+        # Empty files can't be memory-mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+
+        with contextlib.closing(
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        ) as m:
+            view = memoryview(m)
+            try:
+                size = len(m)
+                start = 0
+                while start < size:
+                    end = m.find(b'\n', start)
+                    end = size if end == -1 else end + 1
+
+                    line = str(view[start:end], encoding)
+                    if start == 0:
+                        line = line.lstrip('\ufeff')
+
+                    yield line
+                    start = end
+            finally:
+                # The memory map can't be closed while a view of it exists
+                view.release()
+
+
+def _scan_rows(file_path, delimiter=None, encoding='utf-8'):
+    """
+    Yields the rows of a delimited file as lists of strings, skipping blank
+    lines like :func:`pandas.read_csv` does
+    """
+    name = uncompressed_name(file_path)
+    if delimiter is None:
+        delimiter = '\t' if name.lower().endswith('.tsv') else ','
+
+    if name == file_path:
+        lines = _mmap_lines(file_path, encoding=encoding)
+    else:
+        # Compressed and archived files can't be memory-mapped, so they are
+        # decompressed as a stream instead
+        lines = _stream_lines(file_path, encoding=encoding)
+
+    # csv.reader pulls extra lines itself when a quoted field contains a
+    # line break, so rows are found correctly even though the lines are
+    # split on every newline.
+    for row in csv.reader(lines, delimiter=delimiter):
+        if row:
+            yield row
+
+
+def _stream_lines(file_path, encoding='utf-8'):
+    """
+    Yields the decoded lines of a file opened with :func:`open_file()`. A
+    leading byte order mark is removed, as in :func:`_mmap_lines()`.
+    """
+    with open_file(file_path) as f:
+        for i, line in enumerate(f):
+            line = str(line, encoding)
+            if i == 0:
+                line = line.lstrip('\ufeff')
+            yield line
+
+
+def _find_label_row(rows, label_fingerprints, label_match_thresh=3,
+                    special_characters=''):
+    """
+    Consumes ``rows`` up to and including the label row, and returns a tuple
+    of its position and the row
+    """
+    if label_match_thresh == 0:
+        raise ValueError("label_match_thresh can not be 0.")
+
+    for i, row in enumerate(rows):
+        label_count = 0
+
+        for cell in row:
+            cell_fingerprint = fingerprint(
+                cell, special_characters=special_characters
+            )
+
+            if cell_fingerprint in label_fingerprints:
+                label_count += 1
+
+                if label_count >= label_match_thresh:
+                    return (i, row)
+
+    raise IndexError(
+        'Label row could not be identified. Make sure '
+        'label_fingerprints contains the expected label names.'
+    )
+
+
+def scan_column_labels(
+    file_path,
+    label_fingerprints,
+    label_match_thresh=3,
+    special_characters='',
+    delimiter=None,
+    encoding='utf-8'
+):
+    """
+    Finds the column labels row of a delimited file without loading it
+
+    This works like :func:`dataframe_functions.find_column_labels()
+    <etl_toolbox.dataframe_functions.find_column_labels>`, but reads the file
+    through a memory map and stops at the label row, so only the rows before
+    it are ever decoded and fingerprinted.
+
+    Usage:
+      >>> from etl_toolbox.file_functions import scan_column_labels
+      >>> scan_column_labels('test_data/bad-data.csv', {'cust', 'emladdr'},
+      ...                    label_match_thresh=2)
+      (4, ['Cust.', 'EML-addr', '    On    ', 'phn-nmbr', 'col5'])
+
+    :param file_path:
+        The path of a delimited file, such as a ``.csv`` or ``.tsv``.
+
+    :param label_fingerprints:
+        A list/set of the fingerprinted labels to look for. See
+        :func:`dataframe_functions.find_column_labels()
+        <etl_toolbox.dataframe_functions.find_column_labels>`.
+
+    :param label_match_thresh:
+        The number of labels that must be found in a row for it to be the
+        label row. Default is ``3``.
+
+    :type label_match_thresh: int, optional
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprints. See :func:`cleaning_functions.fingerprint()
+        <etl_toolbox.cleaning_functions.fingerprint>` for more details.
+
+    :type special_characters: string, optional
+
+    :param delimiter:
+        The field delimiter. If ``None``, it is ``'\\t'`` for ``.tsv`` files
+        and ``','`` otherwise.
+
+    :type delimiter: string, optional
+
+    :param encoding:
+        The encoding of the file, which must be ASCII-compatible. Default is
+        ``'utf-8'``. A leading byte order mark is ignored.
+
+    :type encoding: string, optional
+
+    :raises IndexError:
+        Raised if no row matches ``label_match_thresh`` labels.
+
+    :return:
+        Returns a tuple of the label row's position, counting rows that
+        aren't blank from ``0``, and a list of its labels.
+    """
+    return _find_label_row(
+        _scan_rows(file_path, delimiter=delimiter, encoding=encoding),
+        label_fingerprints,
+        label_match_thresh=label_match_thresh,
+        special_characters=special_characters
+    )
+
+
+def scan_null_ratios(
+    file_path,
+    label_fingerprints=None,
+    label_match_thresh=3,
+    falsey_is_null=False,
+    special_characters='',
+    delimiter=None,
+    encoding='utf-8'
+):
+    """
+    Returns the ratio of *null-indicating* values in each column of a
+    delimited file, without loading it
+
+    The file is read in one sequential pass through a memory map, one row at
+    a time, and each field is checked with
+    :func:`cleaning_functions.clean_null()
+    <etl_toolbox.cleaning_functions.clean_null>`. Only a count per column is
+    kept, so memory use stays constant no matter how large the file is.
+
+    Usage:
+      >>> from etl_toolbox.file_functions import scan_null_ratios
+      >>> ratios = scan_null_ratios('test_data/bad-data.csv',
+      ...                           {'cust', 'emladdr'}, label_match_thresh=2)
+      >>> for label, ratio in ratios.items():
+      ...     print(repr(label), round(ratio, 2))
+      'Cust.' 0.0
+      'EML-addr' 0.33
+      '    On    ' 0.5
+      'phn-nmbr' 0.5
+      'col5' 1.0
+
+    :param file_path:
+        The path of a delimited file, such as a ``.csv`` or ``.tsv``.
+
+    :param label_fingerprints:
+        If given, the label row is found as in :func:`scan_column_labels()`,
+        and only the rows after it are profiled. If ``None``, every row is
+        profiled and the columns are keyed by their position. Default is
+        ``None``.
+
+    :param label_match_thresh:
+        See :func:`scan_column_labels()`. Default is ``3``.
+
+    :type label_match_thresh: int, optional
+
+    :param falsey_is_null:
+        Controls whether falsey values are considered *null-indicating*. See
+        :func:`cleaning_functions.clean_null()
+        <etl_toolbox.cleaning_functions.clean_null>`. Default is ``False``.
+
+    :type falsey_is_null: boolean, optional
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprints. Default is ``''``.
+
+    :type special_characters: string, optional
+
+    :param delimiter:
+        See :func:`scan_column_labels()`.
+
+    :param encoding:
+        See :func:`scan_column_labels()`.
+
+    :raises IndexError:
+        Raised if ``label_fingerprints`` is given and no row matches
+        ``label_match_thresh`` labels.
+
+    :return:
+        Returns an :class:`~collections.OrderedDict` mapping each column label
+        to its ratio of *null-indicating* values, from ``0.0`` to ``1.0``.
+        Duplicate labels are renamed with
+        :func:`mapping_functions.rename_duplicate_labels()
+        <etl_toolbox.mapping_functions.rename_duplicate_labels>`. Fields
+        missing from short rows count as *null-indicating*, and any columns
+        past the end of the label row are keyed by their position.
+    """
+    rows = _scan_rows(file_path, delimiter=delimiter, encoding=encoding)
+
+    labels = []
+    if label_fingerprints is not None:
+        labels = _find_label_row(
+            rows,
+            label_fingerprints,
+            label_match_thresh=label_match_thresh,
+            special_characters=special_characters
+        )[1]
+
+    # Null-indicating values tend to repeat, so remember recent results
+    @functools.lru_cache(maxsize=4096)
+    def is_null(x):
+        return clean_null(
+            x,
+            falsey_is_null=falsey_is_null,
+            special_characters=special_characters
+        ) is None
+
+    # Count values that are present and not null-indicating. Anything
+    # uncounted, including fields missing from short rows, is null.
+    populated_counts = [0] * len(labels)
+    row_count = 0
+
+    for row in rows:
+        row_count += 1
+
+        if len(row) > len(populated_counts):
+            populated_counts.extend([0] * (len(row) - len(populated_counts)))
+
+        for j, x in enumerate(row):
+            if not is_null(x):
+                populated_counts[j] += 1
+
+    labels = labels + list(range(len(labels), len(populated_counts)))
+
+    return collections.OrderedDict(
+        (label, 1 - count / row_count if row_count else 1.0)
+        for label, count in zip(
+            rename_duplicate_labels(labels), populated_counts
+        )
+    )
@@ -0,0 +1,1028 @@
+'''
+.. epigraph:: Functions for loading and cleaning many files at once
+'''
+
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import io
+import itertools
+import json
+import mmap
+import os
+
+import numpy as np
+import pandas as pd
+
+from .dataframe_functions import dataframe_clean_null, find_column_labels
+from .file_functions import iter_archive_members, open_file
+from .file_functions import split_archive_path, uncompressed_name
+from .mapping_functions import map_labels, rename_duplicate_labels
+from .record_functions import clean_records
+
+
+def read_file(path, fileobj=None, **kwargs):
+    """
+    Reads a delimited, JSON, or Excel file into a :class:`pandas.DataFrame`
+
+    The reader is chosen by file extension:
+
+    - ``.csv`` and ``.txt`` are read with :func:`pandas.read_csv`
+    - ``.tsv`` is read with :func:`pandas.read_csv` using ``sep='\\t'``
+    - ``.json``, ``.jsonl``, and ``.ndjson`` are read with
+      :func:`pandas.read_json` (newline-delimited JSON is detected
+      automatically for ``.json``)
+    - ``.xls`` and ``.xlsx`` are read with :func:`pandas.read_excel`
+
+    Delimited and Excel files are read with ``header=None``, so that the
+    column labels row can be found afterwards with
+    :func:`dataframe_functions.find_column_labels()
+    <etl_toolbox.dataframe_functions.find_column_labels>`.
+
+    Compressed files (like ``.csv.gz`` or ``.json.zst``) and virtual paths
+    of files inside archives (from :func:`file_functions.get_file_list_from_dir()
+    <etl_toolbox.file_functions.get_file_list_from_dir>`) are decompressed
+    as they are read, with :func:`file_functions.open_file()
+    <etl_toolbox.file_functions.open_file>`. The reader is chosen by the
+    extension of the file name without its compression extension.
+
+    Usage:
+      >>> from etl_toolbox.ingest_functions import read_file
+      >>> read_file('test_data/animals.tsv').head(2)
+                     0                1           2           3
+      0    common_name  scientific_name         EIN  shirt_size
+      1  Golden jackal     Canis aureus  71-0005605           L
+
+    :param path:
+        The path of the file to read, or a virtual path of a file inside an
+        archive.
+
+    :param fileobj:
+        An open binary file object with the (decompressed) contents of
+        ``path``, such as one from
+        :func:`file_functions.iter_archive_members()
+        <etl_toolbox.file_functions.iter_archive_members>`. If given, it is
+        read instead of opening ``path``, and it isn't closed. Default is
+        ``None``.
+
+    :param kwargs:
+        Any other keyword arguments are passed to the pandas reader, and
+        override the defaults above.
+
+    :raises ValueError:
+        Raised if the file extension isn't recognized.
+
+    :return:
+        Returns a :class:`pandas.DataFrame`.
+    """
+    name = uncompressed_name(path)
+    extension = os.path.splitext(name)[1].lower()
+
+    if fileobj is not None:
+        if extension == '.json':
+            # It may be read a second time, as newline-delimited JSON
+            fileobj = io.BytesIO(fileobj.read())
+        read = functools.partial(_read_file_object, fileobj)
+    elif name == path:
+        read = functools.partial(_read_path, path)
+    else:
+        read = functools.partial(_read_stream, path)
+
+    if extension in ('.csv', '.txt', '.tsv'):
+        options = {'header': None}
+        if extension == '.tsv':
+            options['sep'] = '\t'
+        options.update(kwargs)
+        return read(pd.read_csv, options)
+
+    if extension in ('.jsonl', '.ndjson'):
+        options = {'lines': True}
+        options.update(kwargs)
+        return read(pd.read_json, options)
+
+    if extension == '.json':
+        try:
+            return read(pd.read_json, kwargs)
+        except ValueError:
+            # Newline-delimited JSON can't be read as a single document
+            if fileobj is not None:
+                fileobj.seek(0)
+            options = {'lines': True}
+            options.update(kwargs)
+            return read(pd.read_json, options)
+
+    if extension in ('.xls', '.xlsx'):
+        options = {'header': None}
+        options.update(kwargs)
+        return read(pd.read_excel, options)
+
+    raise ValueError(
+        'Unrecognized file extension {!r} for {!r}.'.format(extension, path)
+    )
+
+
+def _read_path(path, reader, options):
+    """
+    Returns ``reader(path, **options)``.
+    """
+    return reader(path, **options)
+
+
+def _read_stream(path, reader, options):
+    """
+    Returns ``reader(f, **options)``, where ``f`` is ``path`` opened with
+    :func:`file_functions.open_file()
+    <etl_toolbox.file_functions.open_file>`.
+    """
+    with open_file(path) as f:
+        return _read_file_object(f, reader, options)
+
+
+def _read_file_object(f, reader, options):
+    """
+    Returns ``reader(f, **options)`` for a binary file object ``f``, without
+    closing it.
+    """
+    if reader is pd.read_excel:
+        # Excel readers need to seek, which decompressed streams can't do
+        # cheaply
+        return reader(io.BytesIO(f.read()), **options)
+
+    if reader is pd.read_json:
+        text = io.TextIOWrapper(f, encoding=options.pop('encoding', 'utf-8'))
+        try:
+            return reader(text, **options)
+        finally:
+            # Otherwise closing the wrapper would close f
+            text.detach()
+
+    return reader(f, **options)
+
+
+def _read_files(file_paths, reader):
+    """
+    Yields ``(path, reader(path))`` for each path in ``file_paths``.
+
+    If ``reader`` is :func:`read_file()`, files inside an archive are read
+    with :func:`file_functions.iter_archive_members()
+    <etl_toolbox.file_functions.iter_archive_members>`, so each run of an
+    archive's files in archive order (as listed by
+    :func:`file_functions.get_file_list_from_dir()
+    <etl_toolbox.file_functions.get_file_list_from_dir>`) is read in one
+    pass through the archive, instead of one pass per file.
+    """
+    archive_path = members = None
+
+    try:
+        for path in file_paths:
+            path_archive, member = split_archive_path(path)
+            if reader is not read_file or member is None:
+                yield path, reader(path)
+                continue
+
+            f = None
+            if path_archive == archive_path:
+                f = _find_member(members, path)
+
+            if f is None:
+                # The file is in another archive, or before the last file
+                # read from this one
+                if members is not None:
+                    members.close()
+                archive_path = path_archive
+                members = iter_archive_members(archive_path)
+                f = _find_member(members, path)
+                if f is None:
+                    raise KeyError(
+                        '{!r} is not a file in {!r}.'.format(
+                            member, archive_path
+                        )
+                    )
+
+            yield path, read_file(path, fileobj=f)
+    finally:
+        if members is not None:
+            members.close()
+
+
+def _find_member(members, path):
+    """
+    Advances the ``members`` iterator of
+    :func:`file_functions.iter_archive_members()
+    <etl_toolbox.file_functions.iter_archive_members>` to ``path``, and
+    returns its file object, or ``None`` if ``path`` isn't found.
+    """
+    for member_path, f in members:
+        if member_path == path:
+            return f
+    return None
+
+
+def _read_groups(file_paths, reader):
+    """
+    Yields lists of consecutive paths from ``file_paths`` that
+    :func:`_read_files()` reads together: the files of the same archive if
+    ``reader`` is :func:`read_file()`, and otherwise single paths.
+    """
+    if reader is not read_file:
+        for path in file_paths:
+            yield [path]
+        return
+
+    def archive(path):
+        archive_path, member = split_archive_path(path)
+        return path if member is None else archive_path
+
+    for _, group in itertools.groupby(file_paths, archive):
+        yield list(group)
+
+
+def read_json_batches(
+    path,
+    batch_size=10000,
+    sep='.',
+    clean=True,
+    falsey_is_null=False,
+    special_characters='',
+    empty_record_thresh=1,
+    columns=None,
+    encoding='utf-8',
+    max_value_bytes=None,
+):
+    """
+    Reads a JSON or newline-delimited JSON file incrementally, yielding
+    :class:`pandas.DataFrame` batches of flattened records
+
+    The file is parsed one record at a time, so only the current batch is
+    in memory. A file can be a JSON array of records, newline-delimited
+    JSON, or a single JSON value. Nested objects are flattened into columns
+    as they are parsed, with their keys joined by ``sep`` (like
+    :func:`pandas.json_normalize`). Lists are kept as values.
+
+    If ``clean`` is set, the flattened records are cleaned with
+    :func:`record_functions.clean_records()
+    <etl_toolbox.record_functions.clean_records>` before each batch is
+    built, so *null-indicating* values (including containers like
+    ``[None, "n/a"]``) are ``None`` and empty records are dropped.
+
+    Usage:
+      >>> from etl_toolbox.ingest_functions import read_json_batches
+      >>> batches = read_json_batches('test_data/random_pii_4.json',
+      ...                             batch_size=20)
+      >>> [batch.shape for batch in batches]
+      [(20, 5), (20, 5), (5, 5)]
+
+    :param path:
+        The path of the file to read, or a text file object. Compressed
+        files and files inside archives are read as in :func:`read_file()`.
+
+    :param batch_size:
+        The number of records in each batch (the last may be smaller).
+        Default is ``10000``.
+
+    :type batch_size: int, optional
+
+    :param sep:
+        The separator used to join nested keys. Default is ``'.'``.
+
+    :type sep: string, optional
+
+    :param clean:
+        If ``True``, records are cleaned with
+        :func:`record_functions.clean_records()
+        <etl_toolbox.record_functions.clean_records>`, using
+        ``falsey_is_null``, ``special_characters``, and
+        ``empty_record_thresh``. Default is ``True``.
+
+    :type clean: boolean, optional
+
+    :param columns:
+        If given, every batch has exactly these columns, in this order.
+        Otherwise each batch has the columns of its own records.
+
+    :param encoding:
+        The encoding of the file, if ``path`` is a path. Default is
+        ``'utf-8'``.
+
+    :param max_value_bytes:
+        The maximum size, in characters, of a single record (or of the
+        whole file if it is a single JSON value). A record that grows past it
+        raises ``ValueError`` instead of being read into memory. Default is
+        ``None`` (no limit).
+
+    :type max_value_bytes: int, optional
+
+    :raises ValueError:
+        Raised if the file isn't valid JSON. Malformed records are reported
+        as soon as they are read, without reading the rest of the file.
+
+    :return:
+        Returns a generator of :class:`pandas.DataFrame`\\ s.
+    """
+    with contextlib.ExitStack() as stack:
+        if hasattr(path, 'read'):
+            f = path
+        else:
+            f = stack.enter_context(
+                io.TextIOWrapper(open_file(path), encoding=encoding)
+            )
+
+        records = (
+            _flatten_json(value, sep)
+            for value in _iter_json_values(
+                f, max_value_bytes=max_value_bytes
+            )
+        )
+        if clean:
+            records = clean_records(
+                records,
+                falsey_is_null=falsey_is_null,
+                special_characters=special_characters,
+                whitespace=False,
+                empty_record_thresh=empty_record_thresh,
+                batch_size=min(batch_size, 1024),
+            )
+
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                return
+            yield pd.DataFrame(batch, columns=columns)
+
+
+def clean_file_frame(
+    df,
+    label_fingerprints=None,
+    label_match_thresh=3,
+    empty_row_thresh=1,
+    empty_column_thresh=1,
+    falsey_is_null=False,
+    special_characters='',
+):
+    """
+    Runs :func:`dataframe_functions.find_column_labels()
+    <etl_toolbox.dataframe_functions.find_column_labels>` (if
+    ``label_fingerprints`` is given) and then
+    :func:`dataframe_functions.dataframe_clean_null()
+    <etl_toolbox.dataframe_functions.dataframe_clean_null>` on ``df``.
+
+    This is the default processing step of :func:`ingest_files()`. See those
+    functions for a description of the arguments.
+
+    :return:
+        Returns ``df``, which is mutated.
+    """
+    if label_fingerprints is not None:
+        find_column_labels(
+            df,
+            label_fingerprints,
+            label_match_thresh=label_match_thresh,
+            special_characters=special_characters,
+        )
+
+    dataframe_clean_null(
+        df,
+        empty_row_thresh=empty_row_thresh,
+        empty_column_thresh=empty_column_thresh,
+        falsey_is_null=falsey_is_null,
+        special_characters=special_characters,
+    )
+
+    return df
+
+
+async def ingest_files_async(
+    file_paths,
+    on_result,
+    reader=read_file,
+    processor=clean_file_frame,
+    max_concurrent_reads=8,
+    max_queued=4,
+    max_processing=None,
+    executor=None,
+):
+    """
+    Coroutine version of :func:`ingest_files()`. ``executor`` must be given,
+    and ``on_result`` is required.
+    """
+    loop = asyncio.get_event_loop()
+
+    if max_processing is None:
+        max_processing = os.cpu_count() or 1
+
+    queue = asyncio.Queue(maxsize=max_queued)
+
+    # A read holds its slot until its frame is in the queue, so frames that
+    # are waiting for space in the queue also count towards the limit.
+    read_slots = asyncio.Semaphore(max_concurrent_reads)
+
+    async def read(paths):
+        # The files of an archive are read one at a time, in one pass
+        # through the archive
+        frames = _read_files(paths, reader)
+        try:
+            while True:
+                item = await loop.run_in_executor(None, next, frames, None)
+                if item is None:
+                    return
+                await queue.put(item)
+        finally:
+            read_slots.release()
+
+    async def produce():
+        reads = set()
+        try:
+            for paths in _read_groups(file_paths, reader):
+                await read_slots.acquire()
+                task = asyncio.ensure_future(read(paths))
+                reads.add(task)
+                task.add_done_callback(reads.discard)
+
+            if reads:
+                await asyncio.gather(*reads)
+        finally:
+            for task in reads:
+                task.cancel()
+            if reads:
+                await asyncio.gather(*reads, return_exceptions=True)
+
+        # Tell each consumer there is nothing left to process
+        for _ in range(max_processing):
+            await queue.put(None)
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+
+            path, df = item
+            result = await loop.run_in_executor(executor, processor, df)
+            on_result(path, result)
+
+    tasks = [asyncio.ensure_future(produce())] + [
+        asyncio.ensure_future(consume()) for _ in range(max_processing)
+    ]
+
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def ingest_files(
+    file_paths,
+    reader=read_file,
+    processor=clean_file_frame,
+    on_result=None,
+    max_concurrent_reads=8,
+    max_queued=4,
+    max_processing=None,
+    executor=None,
+    **kwargs
+):
+    """
+    Reads and cleans many files, overlapping file I/O with CPU work
+
+    Files are read concurrently on threads, and each frame that is read is
+    put in a bounded queue. Workers take frames off the queue and process
+    them on ``executor`` (by default, with :func:`clean_file_frame()` on a
+    :class:`~concurrent.futures.ProcessPoolExecutor`). When the queue is full,
+    reading pauses until a worker is free, so at most
+    ``max_concurrent_reads + max_queued + max_processing`` frames are in
+    memory at once, no matter how many files there are.
+
+    Consecutive files of the same archive are read one after another, as a
+    single read.
+
+    Usage:
+      >>> from etl_toolbox.file_functions import get_file_list_from_dir
+      >>> from etl_toolbox.ingest_functions import ingest_files
+      >>> file_paths = get_file_list_from_dir(
+      ...     'landing_zone/', recursive=True)  # doctest: +SKIP
+      >>> def write_result(path, df):
+      ...     df.to_parquet(path + '.parquet')
+      >>> ingest_files(file_paths,
+      ...              on_result=write_result,
+      ...              label_fingerprints=fingerprint_map)  # doctest: +SKIP
+
+    :param file_paths:
+        An iterable of file paths, such as the list returned by
+        :func:`file_functions.get_file_list_from_dir()
+        <etl_toolbox.file_functions.get_file_list_from_dir>`. It is consumed
+        lazily, so it can be a generator.
+
+    :param reader:
+        A function that takes a file path and returns a
+        :class:`pandas.DataFrame`. Default is :func:`read_file()`, which
+        reads consecutive files of the same archive in one pass through the
+        archive (with :func:`file_functions.iter_archive_members()
+        <etl_toolbox.file_functions.iter_archive_members>`).
+
+    :param processor:
+        A function that takes a :class:`pandas.DataFrame` and returns the
+        processed result. It must be picklable if ``executor`` is a
+        :class:`~concurrent.futures.ProcessPoolExecutor`. Default is
+        :func:`clean_file_frame()`.
+
+    :param on_result:
+        A function that is called with the file path and the processed
+        result for each file, in the order they finish. If ``None``, the
+        results are collected and returned, which keeps them all in memory.
+
+    :param max_concurrent_reads:
+        The maximum number of files being read at once. Default is ``8``.
+
+    :type max_concurrent_reads: int, optional
+
+    :param max_queued:
+        The maximum number of frames waiting to be processed. Default is
+        ``4``.
+
+    :type max_queued: int, optional
+
+    :param max_processing:
+        The maximum number of frames being processed at once. Default is the
+        number of CPUs.
+
+    :type max_processing: int, optional
+
+    :param executor:
+        A :class:`concurrent.futures.Executor` to run ``processor`` on. If
+        ``None``, a :class:`~concurrent.futures.ProcessPoolExecutor` with
+        ``max_processing`` workers is created and shut down afterwards.
+
+    :param kwargs:
+        Any other keyword arguments are passed to ``processor``, such as the
+        ``label_fingerprints`` and ``empty_row_thresh`` arguments of
+        :func:`clean_file_frame()`.
+
+    :return:
+        Returns ``None`` if ``on_result`` is given. Otherwise returns a list
+        of ``(path, result)`` tuples.
+    """
+    results = None
+    if on_result is None:
+        results = []
+
+        def on_result(path, result):
+            results.append((path, result))
+
+    if kwargs:
+        processor = functools.partial(processor, **kwargs)
+
+    if max_processing is None:
+        max_processing = os.cpu_count() or 1
+
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ProcessPoolExecutor(max_processing)
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        loop.run_until_complete(ingest_files_async(
+            file_paths,
+            on_result,
+            reader=reader,
+            processor=processor,
+            max_concurrent_reads=max_concurrent_reads,
+            max_queued=max_queued,
+            max_processing=max_processing,
+            executor=executor,
+        ))
+    finally:
+        loop.close()
+        if own_executor:
+            executor.shutdown()
+
+    return results
+
+
+def normalize_files(
+    file_paths,
+    fingerprint_map,
+    target_schema,
+    reader=read_file,
+    output_path=None,
+    label_match_thresh=3,
+    empty_row_thresh=1,
+    empty_column_thresh=1,
+    falsey_is_null=False,
+    special_characters='',
+):
+    """
+    Loads many files with different column labels into one
+    :class:`pandas.DataFrame` (or Parquet file) with the columns of
+    ``target_schema``
+
+    Each file is read with ``reader`` and cleaned with
+    :func:`clean_file_frame()`, using the keys of ``fingerprint_map`` to find
+    its label row (unless ``reader`` already gave it column labels, as it
+    does for JSON records). Its labels are then mapped with
+    :func:`mapping_functions.map_labels()
+    <etl_toolbox.mapping_functions.map_labels>` and
+    :func:`mapping_functions.rename_duplicate_labels()
+    <etl_toolbox.mapping_functions.rename_duplicate_labels>`, and the columns
+    whose mapped labels are in ``target_schema`` are copied into the output.
+    Other columns are dropped, and columns of ``target_schema`` that a file
+    doesn't have are filled with missing values.
+
+    The output columns are allocated once, sized from the line counts of the
+    delimited files (and grown if that isn't enough), and each file's values
+    are written directly into them. This avoids the intermediate copies and
+    column realignment of :func:`pandas.concat`.
+
+    Usage:
+      >>> from etl_toolbox.ingest_functions import normalize_files
+      >>> fingerprint_map = {
+      ...     'firstname': 'first_name', 'lastname': 'last_name',
+      ...     'email': 'email', 'age': 'age'
+      ... }
+      >>> df = normalize_files(
+      ...     ['test_data/random_pii_2.csv', 'test_data/random_pii_5.csv'],
+      ...     fingerprint_map,
+      ...     {'first_name': object, 'email': object, 'age': float}
+      ... )
+      >>> df.iloc[[0, 1, 15, 16]]
+         first_name                                email   age
+      0     Chester             c.barrett@randatmail.com  19.0
+      1      Wilson              w.howard@randatmail.com  21.0
+      15    Olympie                                  NaN   NaN
+      16     Talyah  tkarlolczak1@scientificamerican.com   NaN
+
+    :param file_paths:
+        An iterable of file paths, such as the list returned by
+        :func:`file_functions.get_file_list_from_dir()
+        <etl_toolbox.file_functions.get_file_list_from_dir>`.
+
+    :param fingerprint_map:
+        A dictionary of label fingerprints mapped to output labels, as used
+        by :func:`mapping_functions.map_labels()
+        <etl_toolbox.mapping_functions.map_labels>`.
+
+    :param target_schema:
+        A dictionary of output labels mapped to numpy dtypes (or anything
+        :class:`numpy.dtype` accepts, like ``float`` or ``'datetime64[ns]'``),
+        or a list of output labels to keep as ``object`` columns. The output
+        columns are in this order.
+
+    :param reader:
+        A function that takes a file path and returns a
+        :class:`pandas.DataFrame`. Default is :func:`read_file()`, which
+        reads consecutive files of the same archive in one pass through the
+        archive (with :func:`file_functions.iter_archive_members()
+        <etl_toolbox.file_functions.iter_archive_members>`).
+
+    :param output_path:
+        If given, the output is written to a Parquet file at this path, with
+        one row group per source file, instead of being returned. This
+        requires `pyarrow <https://arrow.apache.org/docs/python/>`_.
+        ``object`` columns are stored as strings.
+
+    :param label_match_thresh:
+        Passed to :func:`clean_file_frame()`, along with
+        ``empty_row_thresh``, ``empty_column_thresh``, ``falsey_is_null``,
+        and ``special_characters``.
+
+    :raises ValueError:
+        Raised if a file doesn't have a column of ``target_schema`` whose
+        dtype can't hold missing values (like ``int`` or ``bool``), or if a
+        column's values can't be converted to its dtype.
+
+    :return:
+        Returns a :class:`pandas.DataFrame` with a default index, or ``None``
+        if ``output_path`` is given.
+    """
+    if isinstance(target_schema, dict):
+        dtypes = collections.OrderedDict(
+            (label, np.dtype(dtype)) for label, dtype in target_schema.items()
+        )
+    else:
+        dtypes = collections.OrderedDict(
+            (label, np.dtype(object)) for label in target_schema
+        )
+
+    file_paths = list(file_paths)
+
+    if output_path is not None:
+        sink = _ParquetSink(output_path, dtypes)
+    else:
+        sink = _ColumnBuffers(
+            dtypes, sum(_estimate_rows(path) for path in file_paths)
+        )
+
+    try:
+        for path, df in _read_files(file_paths, reader):
+            # Frames read with a header (like JSON records) already have
+            # their labels
+            df = clean_file_frame(
+                df,
+                label_fingerprints=(
+                    fingerprint_map
+                    if df.columns.equals(pd.RangeIndex(df.shape[1])) else None
+                ),
+                label_match_thresh=label_match_thresh,
+                empty_row_thresh=empty_row_thresh,
+                empty_column_thresh=empty_column_thresh,
+                falsey_is_null=falsey_is_null,
+                special_characters=special_characters,
+            )
+
+            labels = rename_duplicate_labels(
+                map_labels(
+                    df.columns, fingerprint_map,
+                    special_characters=special_characters
+                )
+            )
+
+            columns = {}
+            for i, label in enumerate(labels):
+                if label in dtypes:
+                    column = df.iloc[:, i]
+                    dtype = dtypes[label]
+                    if dtype.kind == 'O':
+                        columns[label] = column.to_numpy(dtype=object)
+                    else:
+                        columns[label] = column.astype(dtype).to_numpy()
+
+            for label, dtype in dtypes.items():
+                if label not in columns and _missing_value(dtype) is None:
+                    raise ValueError(
+                        'Column {!r} is missing from {!r}, and its dtype {} '
+                        "can't hold missing values.".format(label, path, dtype)
+                    )
+
+            sink.append(columns, df.shape[0])
+    finally:
+        sink.close()
+
+    return sink.result()
+
+
+def _estimate_rows(path):
+    """
+    Returns the number of lines in ``path`` if it is a delimited file, which
+    is at least the number of rows it has. Returns ``0`` for other files.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if (
+        extension not in ('.csv', '.txt', '.tsv')
+        or uncompressed_name(path) != path
+        or not os.path.getsize(path)
+    ):
+        return 0
+
+    lines = 0
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        # Counted a block at a time, so the file is never copied whole
+        for start in range(0, len(m), 1 << 24):
+            lines += m[start:start + (1 << 24)].count(b'\n')
+
+    return lines + 1
+
+
+def _missing_value(dtype):
+    """
+    Returns the missing value for ``dtype``, or ``None`` if it doesn't have
+    one.
+    """
+    if dtype.kind in 'Ofc':
+        return np.nan
+    if dtype.kind in 'mM':
+        return dtype.type('NaT')
+    return None
+
+
+class _ColumnBuffers:
+    """
+    Output columns for :func:`normalize_files()`, which are preallocated with
+    ``capacity`` rows and doubled when more are needed.
+    """
+
+    def __init__(self, dtypes, capacity):
+        self.dtypes = dtypes
+        self.capacity = capacity
+        self.n = 0
+        self.buffers = collections.OrderedDict(
+            (label, self._empty(dtype, capacity))
+            for label, dtype in dtypes.items()
+        )
+
+    @staticmethod
+    def _empty(dtype, n):
+        buffer = np.empty(n, dtype=dtype)
+        if _missing_value(dtype) is not None:
+            buffer.fill(_missing_value(dtype))
+        return buffer
+
+    def _resize(self, capacity):
+        # Each column is copied into a new buffer, one at a time, so the
+        # extra memory is at most one column
+        for label, buffer in self.buffers.items():
+            new_buffer = self._empty(self.dtypes[label], capacity)
+            new_buffer[:self.n] = buffer[:self.n]
+            self.buffers[label] = new_buffer
+        self.capacity = capacity
+
+    def append(self, columns, n_rows):
+        if self.n + n_rows > self.capacity:
+            self._resize(max(2 * self.capacity, self.n + n_rows))
+
+        for label, values in columns.items():
+            self.buffers[label][self.n:self.n + n_rows] = values
+        self.n += n_rows
+
+    def close(self):
+        if self.capacity != self.n:
+            self._resize(self.n)
+
+    def result(self):
+        return pd.DataFrame(self.buffers, copy=False)
+
+
+class _ParquetSink:
+    """
+    Writes the output of :func:`normalize_files()` to a Parquet file, with
+    one row group per call to :meth:`append`.
+    """
+
+    def __init__(self, output_path, dtypes):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.dtypes = dtypes
+        self.schema = pa.schema([
+            (str(label),
+             pa.string() if dtype.kind == 'O' else pa.from_numpy_dtype(dtype))
+            for label, dtype in dtypes.items()
+        ])
+        self.writer = pq.ParquetWriter(output_path, self.schema)
+
+    def append(self, columns, n_rows):
+        arrays = []
+        for (label, dtype), field in zip(self.dtypes.items(), self.schema):
+            values = columns.get(label)
+            if values is None:
+                arrays.append(self.pa.nulls(n_rows, type=field.type))
+                continue
+
+            if dtype.kind == 'O':
+                # Converted one value at a time, rather than to a fixed-width
+                # string array as wide as the longest value
+                values = pd.Series(values, dtype=object, copy=False).map(
+                    str, na_action='ignore'
+                )
+            arrays.append(
+                self.pa.array(values, type=field.type, from_pandas=True)
+            )
+
+        self.writer.write_table(
+            self.pa.Table.from_arrays(arrays, schema=self.schema)
+        )
+
+    def close(self):
+        self.writer.close()
+
+    def result(self):
+        return None
+
+
+def _iter_json_values(f, chunk_size=1 << 16, max_value_bytes=None):
+    """
+    Yields the records of a JSON array, or the top-level values of a
+    newline-delimited (or concatenated) JSON file, parsing ``f`` a chunk at
+    a time.
+    """
+    decoder = json.JSONDecoder()
+    whitespace = ' \t\r\n'
+
+    buffer = ''
+    pos = 0
+    eof = False
+    in_array = None
+    # In an array, whether the next token is a value rather than a comma
+    # (or the closing bracket), and whether any values have been read
+    need_value = True
+    empty = True
+    read_size = chunk_size
+    decoded = False
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in whitespace:
+            pos += 1
+
+        if pos < len(buffer):
+            c = buffer[pos]
+            if in_array is None:
+                in_array = c == '['
+                if in_array:
+                    pos += 1
+                    continue
+            elif in_array:
+                if c == ']' and (empty or not need_value):
+                    return
+                if not need_value:
+                    if c != ',':
+                        raise ValueError(
+                            "Expecting ',' delimiter between array values."
+                        )
+                    pos += 1
+                    need_value = True
+                    continue
+                if c in ',]':
+                    raise ValueError('Expecting an array value.')
+
+        end = None
+        if pos < len(buffer):
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except ValueError as e:
+                if eof or not _json_may_be_incomplete(e, buffer):
+                    raise
+
+            # A number at the end of the buffer may continue in the next
+            # chunk
+            if end == len(buffer) and not eof:
+                end = None
+
+        if end is None:
+            if eof:
+                if pos < len(buffer) or in_array:
+                    raise ValueError('Unexpected end of JSON input.')
+                return
+
+            if (
+                max_value_bytes is not None
+                and len(buffer) - pos > max_value_bytes
+            ):
+                raise ValueError(
+                    'A JSON value is larger than max_value_bytes ({}).'
+                    .format(max_value_bytes)
+                )
+
+            # A value that didn't fit in the last read is read in growing
+            # chunks, so that it isn't re-parsed once per chunk
+            if not decoded and pos < len(buffer):
+                read_size *= 2
+
+            chunk = f.read(read_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            decoded = False
+            continue
+
+        yield value
+        pos = end
+
+        decoded = True
+        read_size = chunk_size
+        need_value = False
+        empty = False
+
+
+def _json_may_be_incomplete(error, buffer):
+    """
+    Returns ``True`` if a JSON decoding ``error`` could be caused by the
+    value continuing past the end of ``buffer``, rather than being malformed.
+    """
+    # Strings can't contain raw newlines, so an unterminated string is at
+    # most a line long. Other errors in a truncated value are found within a
+    # few characters of the end (like a partial 'true' or unicode escape).
+    pos = getattr(error, 'pos', len(buffer))
+    return (
+        getattr(error, 'msg', '').startswith('Unterminated string')
+        or len(buffer) - pos <= 10
+    )
+
+
+def _flatten_json(value, sep, prefix=None, record=None):
+    """
+    Returns a JSON ``value`` as a flat dict. Nested objects are flattened
+    into keys joined by ``sep``, and values that aren't objects are labeled
+    ``'value'``.
+    """
+    if record is None:
+        record = {}
+        if not isinstance(value, dict):
+            record['value'] = value
+            return record
+
+    for key, x in value.items():
+        if prefix is not None:
+            key = prefix + sep + key
+
+        if isinstance(x, dict) and x:
+            _flatten_json(x, sep, key, record)
+        else:
+            record[key] = x
+
+    return record
@@ -2,11 +2,17 @@
 .. epigraph:: Functions for mapping collections of values
 '''
 
-from .cleaning_functions import fingerprint
+import collections
+
+from .cleaning_functions import _is_ascii, _transliterate, fingerprint
 
 
 def map_labels(
-    labels, fingerprint_map, special_characters='', return_unmapped=False
+    labels,
+    fingerprint_map,
+    special_characters='',
+    return_unmapped=False,
+    transliterate=False,
 ):
     """
     Maps a list of ``labels`` to new values based on provided
@@ -32,7 +38,8 @@ def map_labels(
 
     :param fingerprint_map:
         A dictionary of all expected label fingerprints mapped to formatted
-        outputs.
+        outputs, or a :class:`HashedFingerprintMap` made from one by
+        :func:`hash_fingerprint_map()`.
 
     :param special_characters:
         A string of special characters to preserve while fingerprinting the
@@ -57,6 +64,15 @@ def map_labels(
 
     :type return_unmapped: boolean, optional
 
+    :param transliterate:
+        If ``True``, accented and other non-ASCII letters in ``labels`` are
+        converted to ASCII before they are fingerprinted, so ``'Dirección'``
+        matches the fingerprint ``'direccion'``. See
+        :func:`cleaning_functions.fingerprint()
+        <etl_toolbox.cleaning_functions.fingerprint>`. Default is ``False``.
+
+    :type transliterate: boolean, optional
+
     :return:
         Returns a list or, if the ``return_unmapped`` option is ``True``,
         returns a tuple, with the first element being a list and the second
@@ -65,15 +81,45 @@ def map_labels(
     mapped_labels = []
     unmapped_labels = set()
 
-    for x in labels:
-        x_fingerprint = fingerprint(x, special_characters=special_characters)
-
-        if x_fingerprint in fingerprint_map:
-            x_mapped = fingerprint_map[x_fingerprint]
-            mapped_labels.append(x_mapped)
-        else:
-            mapped_labels.append('-')
-            unmapped_labels.add(x)
+    if isinstance(fingerprint_map, HashedFingerprintMap):
+        # Imported here so that the module can be used without numpy
+        from . import _kernel
+
+        # Look up all of the label hashes at once
+        labels = list(labels)
+        values = labels
+        if transliterate:
+            values = [
+                _transliterate(x, special_characters)
+                if type(x) is str and not _is_ascii(x) else x
+                for x in labels
+            ]
+        positions = _kernel.lookup_sorted(
+            _kernel.classify_values(values, special_characters)[0],
+            fingerprint_map.hashes
+        )
+
+        for x, position in zip(labels, positions):
+            if position >= 0:
+                mapped_labels.append(fingerprint_map.values[position])
+            else:
+                mapped_labels.append('-')
+                unmapped_labels.add(x)
+
+    else:
+        for x in labels:
+            x_fingerprint = fingerprint(
+                x,
+                special_characters=special_characters,
+                transliterate=transliterate,
+            )
+
+            if x_fingerprint in fingerprint_map:
+                x_mapped = fingerprint_map[x_fingerprint]
+                mapped_labels.append(x_mapped)
+            else:
+                mapped_labels.append('-')
+                unmapped_labels.add(x)
 
     if return_unmapped:
         return (mapped_labels, unmapped_labels)
@@ -81,6 +127,108 @@ def map_labels(
     return mapped_labels
 
 
+#: A ``fingerprint_map`` stored as hashes. ``hashes`` is a sorted ``uint64``
+#: :class:`numpy.ndarray` of the hashed fingerprints, and ``values`` is an
+#: object array of the mapped values in the same order. Returned by
+#: :func:`hash_fingerprint_map()`.
+HashedFingerprintMap = collections.namedtuple(
+    'HashedFingerprintMap', ['hashes', 'values']
+)
+
+
+def hash_fingerprints(fingerprints):
+    """
+    Returns the hashes of a collection of fingerprints as a sorted ``uint64``
+    :class:`numpy.ndarray`
+
+    The result can be passed as ``label_fingerprints`` to
+    :func:`dataframe_functions.find_column_labels()
+    <etl_toolbox.dataframe_functions.find_column_labels>`. Each fingerprint
+    takes 8 bytes instead of a Python string, and lookups use
+    :func:`numpy.searchsorted` instead of a set.
+
+    Usage:
+      >>> from etl_toolbox.mapping_functions import hash_fingerprints
+      >>> hashes = hash_fingerprints({'email', 'emailaddr', 'phone'})
+      >>> hashes.dtype, len(hashes)
+      (dtype('uint64'), 3)
+
+    :param fingerprints:
+        A set, list, or dict of fingerprints (if a dict, the keys are used).
+        The fingerprints are hashed as they are, with
+        :func:`cleaning_functions.fingerprint_hash()
+        <etl_toolbox.cleaning_functions.fingerprint_hash>`.
+
+    :raises ValueError:
+        Raised if two different fingerprints have the same hash.
+
+    :return:
+        Returns a :class:`numpy.ndarray`.
+
+    .. note::
+        A collision between two of ``fingerprints`` is detected here, but a
+        value being looked up can still collide with one of ``fingerprints``
+        and be falsely matched. See
+        :func:`cleaning_functions.fingerprint_hash()
+        <etl_toolbox.cleaning_functions.fingerprint_hash>` for the odds.
+    """
+    return hash_fingerprint_map(
+        dict.fromkeys(fingerprints, None)
+    ).hashes
+
+
+def hash_fingerprint_map(fingerprint_map):
+    """
+    Returns a :class:`HashedFingerprintMap` of a ``fingerprint_map``
+    dictionary, for use with :func:`map_labels()`
+
+    Usage:
+      >>> from etl_toolbox.mapping_functions import hash_fingerprint_map
+      >>> fingerprint_map = {'1': 'one', '2a': 'two_a'}
+      >>> map_labels([1, '2_A', '2b'], hash_fingerprint_map(fingerprint_map))
+      ['one', 'two_a', '-']
+
+    :param fingerprint_map:
+        A dictionary of fingerprints mapped to formatted outputs.
+
+    :raises ValueError:
+        Raised if two different fingerprints have the same hash.
+
+    :return:
+        Returns a :class:`HashedFingerprintMap`.
+    """
+    import numpy as np
+
+    from . import _kernel
+
+    keys = [str(k) for k in fingerprint_map]
+    # Filled one element at a time, since numpy would broadcast values that
+    # are sequences of the same length into a 2-D array
+    values = np.empty(len(keys), dtype=object)
+    for i, value in enumerate(fingerprint_map.values()):
+        values[i] = value
+
+    # The keys are already fingerprints, so they are hashed without being
+    # fingerprinted again
+    hashes = _kernel.fnv1a_hashes(keys)
+
+    order = np.argsort(hashes, kind='stable')
+    hashes = hashes[order]
+    values = values[order]
+
+    collisions = np.flatnonzero(hashes[1:] == hashes[:-1])
+    if len(collisions):
+        colliding = sorted(
+            {keys[order[i]] for i in collisions}
+            | {keys[order[i + 1]] for i in collisions}
+        )
+        raise ValueError(
+            'Fingerprints have the same hash: {}'.format(colliding)
+        )
+
+    return HashedFingerprintMap(hashes, values)
+
+
 def append_count(x):
     """
     A generator function that yields ``x`` with a numbered suffix.
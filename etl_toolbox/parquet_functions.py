@@ -0,0 +1,442 @@
+'''
+.. epigraph:: Functions for writing cleaned :class:`pandas.DataFrame`\\ s to
+   partitioned Parquet datasets
+
+Frames are written as they are produced, so a dataset can be built from
+more data than fits in memory at once.
+
+.. note::
+   This module requires `pyarrow <https://arrow.apache.org/docs/python/>`_,
+   which is an optional dependency of etl-toolbox.
+'''
+
+import collections
+import os
+import threading
+import urllib.parse
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .dataframe_functions import infer_column_type
+
+# The directory name used by Hive (and pyarrow) for null partition values
+_NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+class PartitionedParquetWriter:
+    """
+    Writes a stream of frames to a Hive-partitioned Parquet dataset
+
+    Each frame passed to :meth:`write` is split by the values of
+    ``partition_cols``, and the rows for each partition are buffered as
+    Arrow tables until they reach about ``row_group_bytes``. Then they are
+    written as one row group to that partition's file, under a directory
+    like ``root_path/state=NY/``. Only the buffered rows are held in memory,
+    so peak memory depends on ``row_group_bytes`` and ``max_buffered_bytes``
+    rather than the size of the dataset.
+
+    The schema of the dataset is found from the first frame:
+
+    - Categorical columns, and string columns that
+      :func:`dataframe_functions.infer_column_type()
+      <etl_toolbox.dataframe_functions.infer_column_type>` finds to be
+      ``'category'`` or ``'boolean'`` columns (with ``dictionary_thresh`` as
+      its ``category_thresh``), are dictionary encoded. Other columns use
+      plain encoding, which is smaller for columns of mostly distinct
+      values.
+    - Columns of lists or sets, such as the merged columns from
+      :func:`dataframe_functions.merge_columns_by_label()
+      <etl_toolbox.dataframe_functions.merge_columns_by_label>`, are written
+      as Parquet lists. Sets are sorted where possible.
+    - Columns of mixed types are written as strings, and columns that are
+      entirely null are written as strings.
+
+    Later frames are converted to the same schema. Columns missing from a
+    frame are written as nulls.
+
+    Usage:
+      >>> import os, tempfile
+      >>> import pandas as pd
+      >>> import pyarrow.dataset as ds
+      >>> from etl_toolbox.parquet_functions import PartitionedParquetWriter
+      >>> root_path = os.path.join(tempfile.mkdtemp(), 'customers')
+      >>> with PartitionedParquetWriter(root_path, ['state']) as writer:
+      ...     writer.write(pd.DataFrame({'state': ['NY', 'CA', 'NY'],
+      ...                                'emails': [['a@a.com'], [], None]}))
+      ...     writer.write(pd.DataFrame({'state': ['CA'],
+      ...                                'emails': [{'b@b.com', 'c@c.com'}]}))
+      >>> sorted(os.listdir(root_path))
+      ['state=CA', 'state=NY']
+      >>> dataset = ds.dataset(root_path, partitioning='hive')
+      >>> dataset.to_table().sort_by('state').to_pydict()
+      {'emails': [[], ['b@b.com', 'c@c.com'], ['a@a.com'], None], 'state': ['CA', 'CA', 'NY', 'NY']}
+
+    :param root_path:
+        The directory of the dataset. It is created if it doesn't exist.
+        Each writer writes new files with a unique name, so several writers
+        (such as one per worker) can write to the same dataset.
+
+    :param partition_cols:
+        A list of the column labels to partition by. Default is ``()`` (no
+        partitions).
+
+    :param row_group_bytes:
+        The target size of each row group, measured as Arrow data before
+        encoding and compression. Default is ``64 * 2**20``.
+
+    :type row_group_bytes: int, optional
+
+    :param max_buffered_bytes:
+        The maximum size of the rows buffered for all partitions together.
+        When it is reached, the largest buffer is written as a smaller row
+        group. Default is ``4 * row_group_bytes``.
+
+    :type max_buffered_bytes: int, optional
+
+    :param max_open_files:
+        The maximum number of files open at once. When it is reached, the
+        least recently written file is finished, and any later rows for its
+        partition start a new file. Default is ``64``.
+
+    :type max_open_files: int, optional
+
+    :param dictionary_thresh:
+        The maximum ratio of distinct values to values for a string column
+        to be dictionary encoded. Default is ``0.5``.
+
+    :type dictionary_thresh: float, optional
+
+    :param compression:
+        The Parquet compression codec. Default is ``'snappy'``.
+
+    :type compression: string, optional
+
+    :ivar files:
+        A list of the paths of the files written so far.
+    """
+
+    def __init__(
+        self,
+        root_path,
+        partition_cols=(),
+        row_group_bytes=64 * 2**20,
+        max_buffered_bytes=None,
+        max_open_files=64,
+        dictionary_thresh=0.5,
+        compression='snappy',
+    ):
+        if max_buffered_bytes is None:
+            max_buffered_bytes = 4 * row_group_bytes
+
+        self.root_path = root_path
+        self.partition_cols = list(partition_cols)
+        self.row_group_bytes = row_group_bytes
+        self.max_buffered_bytes = max_buffered_bytes
+        self.max_open_files = max_open_files
+        self.dictionary_thresh = dictionary_thresh
+        self.compression = compression
+        self.files = []
+
+        self.schema = None
+        self._dictionary_columns = None
+        self._buffers = collections.OrderedDict()
+        self._buffered_bytes = 0
+        # Open writers, from least to most recently written
+        self._writers = collections.OrderedDict()
+        self._prefix = 'part-{}'.format(uuid.uuid4().hex)
+        self._lock = threading.Lock()
+
+    def write(self, df):
+        """
+        Buffers the rows of ``df``, writing any row groups that are full.
+
+        :raises ValueError:
+            Raised if ``df`` has duplicate column labels, is missing a
+            partition column, or has columns that the first frame didn't.
+        """
+        if df.columns.duplicated().any():
+            raise ValueError('Column labels must be unique to be written.')
+
+        missing = [c for c in self.partition_cols if c not in df.columns]
+        if missing:
+            raise ValueError('Missing partition columns {}.'.format(missing))
+
+        data = df.drop(columns=self.partition_cols)
+
+        with self._lock:
+            if self.schema is None:
+                self._start(data)
+
+            table = self._to_schema(data)
+
+            if self.partition_cols and df.shape[0]:
+                groups = df.groupby(
+                    self.partition_cols, sort=False, dropna=False
+                ).indices
+            else:
+                groups = {(): np.arange(df.shape[0])}
+
+            for key, positions in groups.items():
+                if not isinstance(key, tuple):
+                    key = (key,)
+                self._append(key, table.take(pa.array(positions)))
+
+    def close(self):
+        """
+        Writes the buffered rows and finishes every file.
+        """
+        with self._lock:
+            for key in list(self._buffers):
+                self._flush(key)
+            for key in list(self._writers):
+                self._writers.pop(key).close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _start(self, data):
+        """
+        Sets the schema and dictionary encoded columns from the first frame.
+        """
+        fields = []
+        self._dictionary_columns = []
+
+        for label in data.columns:
+            column = data[label]
+            array = _arrow_array(column)
+            if pa.types.is_null(array.type):
+                array = array.cast(pa.string())
+            fields.append(pa.field(str(label), array.type))
+
+            if _use_dictionary(column, array, self.dictionary_thresh):
+                self._dictionary_columns.append(str(label))
+
+        self.schema = pa.schema(fields)
+
+    def _to_schema(self, data):
+        """
+        Returns ``data`` as a :class:`pyarrow.Table` with :attr:`schema`.
+        """
+        labels = {str(label): label for label in data.columns}
+        extra = set(labels) - set(self.schema.names)
+        if extra:
+            raise ValueError(
+                'Columns {} are not in the schema of the first frame.'.format(
+                    sorted(extra)
+                )
+            )
+
+        arrays = []
+        for field in self.schema:
+            if field.name not in labels:
+                arrays.append(pa.nulls(data.shape[0], type=field.type))
+                continue
+
+            array = _arrow_array(data[labels[field.name]])
+            if array.type != field.type:
+                array = array.cast(field.type)
+            arrays.append(array)
+
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def _append(self, key, table):
+        """
+        Buffers ``table`` for the partition ``key``, writing full buffers.
+        """
+        tables, nbytes = self._buffers.pop(key, ([], 0))
+        tables.append(table)
+        nbytes += table.nbytes
+        self._buffers[key] = (tables, nbytes)
+        self._buffered_bytes += table.nbytes
+
+        if nbytes >= self.row_group_bytes:
+            self._flush(key)
+
+        while self._buffered_bytes > self.max_buffered_bytes:
+            largest = max(
+                self._buffers, key=lambda k: self._buffers[k][1]
+            )
+            self._flush(largest)
+
+    def _flush(self, key):
+        """
+        Writes the rows buffered for the partition ``key`` as a row group.
+        """
+        tables, nbytes = self._buffers.pop(key)
+        self._buffered_bytes -= nbytes
+
+        table = pa.concat_tables(tables)
+        if not table.num_rows:
+            return
+
+        writer = self._writers.pop(key, None)
+        if writer is None:
+            writer = self._open(key)
+        self._writers[key] = writer
+
+        writer.write_table(table, row_group_size=table.num_rows)
+
+        while len(self._writers) > self.max_open_files:
+            self._writers.popitem(last=False)[1].close()
+
+    def _open(self, key):
+        """
+        Returns a new :class:`pyarrow.parquet.ParquetWriter` for the
+        partition ``key``.
+        """
+        directory = os.path.join(self.root_path, *(
+            '{}={}'.format(column, _partition_value(value))
+            for column, value in zip(self.partition_cols, key)
+        ))
+        os.makedirs(directory, exist_ok=True)
+
+        path = os.path.join(
+            directory, '{}-{}.parquet'.format(self._prefix, len(self.files))
+        )
+        self.files.append(path)
+
+        return pq.ParquetWriter(
+            path,
+            self.schema,
+            use_dictionary=self._dictionary_columns,
+            compression=self.compression,
+        )
+
+
+def write_parquet_dataset(frames, root_path, partition_cols=(), **kwargs):
+    """
+    Writes a stream of frames to a Hive-partitioned Parquet dataset with a
+    :class:`PartitionedParquetWriter`
+
+    Usage:
+      >>> from etl_toolbox.parquet_functions import write_parquet_dataset
+      >>> frames = (clean_file_frame(read_file(path))
+      ...           for path in file_paths)  # doctest: +SKIP
+      >>> write_parquet_dataset(frames, 'output/customers',
+      ...                       ['state'])  # doctest: +SKIP
+
+    :param frames:
+        An iterable of :class:`pandas.DataFrame`\\ s. It is consumed lazily,
+        so it can be a generator.
+
+    :param root_path:
+        The directory of the dataset.
+
+    :param partition_cols:
+        A list of the column labels to partition by.
+
+    :param kwargs:
+        Any other keyword arguments are passed to
+        :class:`PartitionedParquetWriter`.
+
+    :return:
+        Returns a list of the paths of the files written.
+    """
+    with PartitionedParquetWriter(
+        root_path, partition_cols, **kwargs
+    ) as writer:
+        for df in frames:
+            writer.write(df)
+
+    return writer.files
+
+
+def _partition_value(value):
+    """
+    Returns a partition value as a directory name segment.
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return _NULL_PARTITION
+    return urllib.parse.quote(str(value), safe='')
+
+
+def _is_list_column(values):
+    """
+    Returns ``True`` if every non-null value in ``values`` is a list, tuple,
+    or set, and there is at least one.
+    """
+    found = False
+    for x in values:
+        if isinstance(x, (list, tuple, set, frozenset)):
+            found = True
+        elif x is not None and not (isinstance(x, float) and np.isnan(x)):
+            return False
+    return found
+
+
+def _arrow_array(column):
+    """
+    Returns a :class:`pandas.Series` as a :class:`pyarrow.Array`.
+    """
+    if isinstance(column.dtype, pd.SparseDtype):
+        column = column.sparse.to_dense()
+
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Categories can differ between frames, so the values are written
+        # instead, with Parquet's own dictionary encoding
+        return pa.Array.from_pandas(column).dictionary_decode()
+
+    if column.dtype != object:
+        return pa.Array.from_pandas(column)
+
+    values = column.to_numpy()
+    null_mask = pd.isna(values) if not _is_list_column(values) else None
+
+    if null_mask is None:
+        lists = [
+            None if not isinstance(x, (list, tuple, set, frozenset))
+            else _list_value(x)
+            for x in values
+        ]
+        try:
+            return pa.array(lists)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Lists of mixed types are written as lists of strings
+            return pa.array([
+                None if x is None else [str(item) for item in x]
+                for x in lists
+            ], type=pa.list_(pa.string()))
+
+    try:
+        return pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array(
+            np.where(null_mask, None, values.astype(str)), type=pa.string()
+        )
+
+
+def _list_value(x):
+    """
+    Returns a list, tuple, or set as a list. Sets are sorted if their
+    values can be compared.
+    """
+    if isinstance(x, (set, frozenset)):
+        try:
+            return sorted(x)
+        except TypeError:
+            return list(x)
+    return list(x)
+
+
+def _use_dictionary(column, array, dictionary_thresh):
+    """
+    Returns ``True`` if the column should be dictionary encoded.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return True
+
+    if not (
+        pa.types.is_string(array.type) or pa.types.is_large_string(array.type)
+    ):
+        return False
+
+    return infer_column_type(
+        column.astype(object), category_thresh=dictionary_thresh
+    ) in ('category', 'boolean')
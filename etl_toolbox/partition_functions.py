@@ -0,0 +1,431 @@
+'''
+.. epigraph:: Functions for cleaning datasets that are split into partitions
+
+A partitioned dataset can be a :class:`dask.dataframe.DataFrame`, or a
+sequence of partitions where each partition is a :class:`pandas.DataFrame`
+or a function that loads one (for example,
+``functools.partial(pd.read_csv, path)``). Loading functions let datasets
+that don't fit in memory be processed one partition at a time.
+
+Partitions are processed in this process by default. Any
+:class:`concurrent.futures.Executor` can be passed as ``executor`` to process
+them in parallel.
+
+.. note::
+   Every partition should have the same columns.
+'''
+
+import collections
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+from .cleaning_functions import clean_whitespace
+from .dataframe_functions import _apply_null_mask, _null_mask, _populated_masks
+from .mapping_functions import map_labels
+
+
+def is_dask_frame(df):
+    """
+    Returns ``True`` if ``df`` is a :class:`dask.dataframe.DataFrame`.
+
+    Else returns ``False``. Dask is not imported to check.
+    """
+
+    return type(df).__module__.split('.')[0] in ('dask', 'dask_expr')
+
+
+def _load_partition(partition):
+    """
+    Returns the :class:`pandas.DataFrame` for ``partition``, calling it
+    first if it is a loading function.
+    """
+    if callable(partition):
+        return partition()
+
+    return partition
+
+
+def _map_ordered(func, partitions, executor=None, max_pending=None):
+    """
+    Yields ``func(partition)`` for each of ``partitions``, in order.
+
+    If an ``executor`` is given, at most ``max_pending`` partitions are
+    submitted to it at once, so that results don't pile up in memory faster
+    than they are consumed.
+    """
+    if executor is None:
+        for partition in partitions:
+            yield func(partition)
+        return
+
+    if max_pending is None:
+        max_pending = 2 * (os.cpu_count() or 1)
+
+    pending = collections.deque()
+
+    for partition in partitions:
+        pending.append(executor.submit(func, partition))
+
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def _apply_to_partition(partition, func, kwargs):
+    """
+    Returns the result of ``func`` applied to ``partition``. If ``func``
+    mutates its argument and returns ``None``, the mutated
+    :class:`pandas.DataFrame` is returned.
+    """
+    df = _load_partition(partition)
+
+    # Partitions that were passed in as frames belong to the caller, so
+    # they are copied before being mutated
+    if not callable(partition):
+        df = df.copy()
+
+    result = func(df, **kwargs)
+
+    return df if result is None else result
+
+
+def map_partitions(
+    partitions, func, executor=None, max_pending=None, **kwargs
+):
+    """
+    Applies ``func`` to every partition of a partitioned dataset.
+
+    This is for row-wise operations, where each partition can be processed
+    without knowing anything about the others.
+
+    Usage:
+      >>> import pandas as pd
+      >>> from etl_toolbox.partition_functions import map_partitions
+      >>> partitions = [
+      ...     pd.DataFrame({'a': [' x ', 'y']}),
+      ...     pd.DataFrame({'a': ['z\\t']})
+      ... ]
+      >>> for df in map_partitions(partitions, lambda df: df['a'].str.strip()):
+      ...     print(df.tolist())
+      ['x', 'y']
+      ['z']
+
+    :param partitions:
+        A :class:`dask.dataframe.DataFrame`, or a sequence of
+        :class:`pandas.DataFrame`\\ s and/or functions that return one.
+
+    :param func:
+        A function that takes a :class:`pandas.DataFrame` as its first
+        argument. If it mutates the frame and returns ``None`` (like
+        :func:`dataframe_functions.dataframe_clean_null()
+        <etl_toolbox.dataframe_functions.dataframe_clean_null>`), the mutated
+        frame is used as the result. Frames passed in ``partitions`` are
+        copied first, so they are never changed.
+
+    :param executor:
+        A :class:`concurrent.futures.Executor` to process the partitions
+        with. ``func`` and the partitions must be picklable if it is a
+        :class:`~concurrent.futures.ProcessPoolExecutor`. Default is ``None``
+        (partitions are processed one at a time in this process). Ignored for
+        Dask frames, which use the Dask scheduler.
+
+    :param max_pending:
+        The maximum number of partitions submitted to ``executor`` at once.
+        Default is twice the number of CPUs.
+
+    :type max_pending: int, optional
+
+    :param kwargs:
+        Any other keyword arguments are passed to ``func``.
+
+    :return:
+        Returns a :class:`dask.dataframe.DataFrame` if ``partitions`` is a
+        Dask frame. Otherwise returns a generator of the results for each
+        partition, in order.
+    """
+    mapper = functools.partial(_apply_to_partition, func=func, kwargs=kwargs)
+
+    if is_dask_frame(partitions):
+        return partitions.map_partitions(mapper)
+
+    return _map_ordered(mapper, partitions, executor, max_pending)
+
+
+def _clean_whitespace_partition(df):
+    """
+    Applies :func:`cleaning_functions.clean_whitespace()
+    <etl_toolbox.cleaning_functions.clean_whitespace>` to every object column
+    of ``df``, in place.
+    """
+    for j in range(df.shape[1]):
+        if df.iloc[:, j].dtype == object:
+            df.iloc[:, j] = df.iloc[:, j].map(clean_whitespace)
+
+
+def partitioned_clean_whitespace(partitions, executor=None, max_pending=None):
+    """
+    Applies :func:`cleaning_functions.clean_whitespace()
+    <etl_toolbox.cleaning_functions.clean_whitespace>` to every value in the
+    object columns of a partitioned dataset.
+
+    See :func:`map_partitions()` for a description of the arguments.
+
+    :return:
+        Returns a :class:`dask.dataframe.DataFrame` if ``partitions`` is a
+        Dask frame. Otherwise returns a generator of
+        :class:`pandas.DataFrame`\\ s.
+    """
+    return map_partitions(
+        partitions,
+        _clean_whitespace_partition,
+        executor=executor,
+        max_pending=max_pending,
+    )
+
+
+def _map_partition_labels(df, fingerprint_map, special_characters):
+    """
+    Maps the column labels of ``df`` with
+    :func:`mapping_functions.map_labels()
+    <etl_toolbox.mapping_functions.map_labels>`, in place.
+    """
+    df.columns = map_labels(
+        df.columns, fingerprint_map, special_characters=special_characters
+    )
+
+
+def partitioned_map_labels(
+    partitions,
+    fingerprint_map,
+    special_characters='',
+    executor=None,
+    max_pending=None,
+):
+    """
+    Maps the column labels of every partition of a partitioned dataset with
+    :func:`mapping_functions.map_labels()
+    <etl_toolbox.mapping_functions.map_labels>`.
+
+    See :func:`mapping_functions.map_labels()
+    <etl_toolbox.mapping_functions.map_labels>` for a description of
+    ``fingerprint_map`` and ``special_characters``, and
+    :func:`map_partitions()` for the other arguments.
+
+    :return:
+        Returns a :class:`dask.dataframe.DataFrame` if ``partitions`` is a
+        Dask frame. Otherwise returns a generator of
+        :class:`pandas.DataFrame`\\ s.
+    """
+    return map_partitions(
+        partitions,
+        _map_partition_labels,
+        executor=executor,
+        max_pending=max_pending,
+        fingerprint_map=fingerprint_map,
+        special_characters=special_characters,
+    )
+
+
+def _partition_column_counts(
+    partition, empty_row_thresh, falsey_is_null, special_characters
+):
+    """
+    Returns the number of populated cells in each column of ``partition``,
+    counting only the rows that are kept by ``empty_row_thresh``.
+    """
+    df = _load_partition(partition)
+
+    null_mask = _null_mask(
+        df,
+        falsey_is_null=falsey_is_null,
+        special_characters=special_characters,
+    )
+    keep_rows, _ = _populated_masks(null_mask, empty_row_thresh, 0)
+
+    return (~null_mask[keep_rows]).sum(axis=0)
+
+
+def _partition_column_counts_frame(df, **kwargs):
+    """
+    Returns the result of :func:`_partition_column_counts()` as a one-row
+    :class:`pandas.DataFrame`, for use with Dask.
+    """
+    counts = _partition_column_counts(df, **kwargs)
+
+    return pd.DataFrame([counts], columns=range(df.shape[1]))
+
+
+def _clean_null_partition(
+    partition,
+    empty_row_thresh,
+    empty_column_thresh,
+    falsey_is_null,
+    special_characters,
+    column_counts,
+):
+    """
+    Returns ``partition`` cleaned by the rules of
+    :func:`dataframe_functions.dataframe_clean_null()
+    <etl_toolbox.dataframe_functions.dataframe_clean_null>`, with
+    ``empty_column_thresh`` applied to the dataset-wide ``column_counts``.
+    """
+    df = _load_partition(partition)
+
+    null_mask = _null_mask(
+        df,
+        falsey_is_null=falsey_is_null,
+        special_characters=special_characters,
+    )
+    keep_rows, keep_columns = _populated_masks(
+        null_mask,
+        empty_row_thresh,
+        empty_column_thresh,
+        column_counts=column_counts,
+    )
+
+    # Frames that were loaded here can be cleaned in place
+    if callable(partition):
+        _apply_null_mask(df, null_mask, keep_rows, keep_columns)
+        return df
+
+    return _apply_null_mask(
+        df, null_mask, keep_rows, keep_columns, return_new=True
+    )
+
+
+def partitioned_clean_null(
+    partitions,
+    empty_row_thresh=1,
+    empty_column_thresh=1,
+    falsey_is_null=False,
+    special_characters='',
+    executor=None,
+    max_pending=None,
+):
+    """
+    Cleans null values of a partitioned dataset and removes empty
+    rows/columns.
+
+    This follows the same rules as
+    :func:`dataframe_functions.dataframe_clean_null()
+    <etl_toolbox.dataframe_functions.dataframe_clean_null>`, applied to the
+    dataset as a whole:
+
+    - Null values are cleaned and ``empty_row_thresh`` is applied to each
+      partition independently.
+    - ``empty_column_thresh`` is applied to the number of populated cells in
+      each column across **all** partitions. These counts are made in a first
+      pass over the partitions, before any columns are removed.
+
+    .. note::
+       If ``empty_column_thresh`` is not ``0``, every partition is loaded (or
+       computed, for Dask frames) twice: once to count the populated cells,
+       and once to clean it.
+
+    Usage:
+      >>> import pandas as pd
+      >>> from etl_toolbox.partition_functions import partitioned_clean_null
+      >>> partitions = [
+      ...     pd.DataFrame({'id': ['AAA', 'BAA'], 'email': ['none', '-']}),
+      ...     pd.DataFrame({'id': ['CAA', 'null'], 'email': ['c@c.com', '']})
+      ... ]
+      >>> for df in partitioned_clean_null(partitions):
+      ...     print(df)
+          id email
+      0  AAA   NaN
+      1  BAA   NaN
+          id    email
+      0  CAA  c@c.com
+
+    :param partitions:
+        A :class:`dask.dataframe.DataFrame`, or a sequence of
+        :class:`pandas.DataFrame`\\ s and/or functions that return one. A
+        sequence is iterated twice if ``empty_column_thresh`` is not ``0``,
+        so it can't be a generator.
+
+    :param empty_row_thresh:
+        The number of non-null values required for a row to be considered
+        populated/non-empty. Default is ``1``.
+
+    :type empty_row_thresh: int, optional
+
+    :param empty_column_thresh:
+        The number of non-null values in the whole dataset required for a
+        column to be considered populated/non-empty. Default is ``1``.
+
+    :type empty_column_thresh: int, optional
+
+    :param falsey_is_null:
+        Controls whether falsey objects are considered *null-indicating*.
+        Default is ``False``.
+
+    :type falsey_is_null: boolean, optional
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprints. See :func:`cleaning_functions.fingerprint()
+        <etl_toolbox.cleaning_functions.fingerprint>` for details.
+
+    :type special_characters: string, optional
+
+    :param executor:
+        See :func:`map_partitions()`.
+
+    :param max_pending:
+        See :func:`map_partitions()`.
+
+    :return:
+        Returns a :class:`dask.dataframe.DataFrame` if ``partitions`` is a
+        Dask frame. Otherwise returns a generator of cleaned
+        :class:`pandas.DataFrame`\\ s, in order. Frames passed in
+        ``partitions`` are not changed.
+    """
+    count_kwargs = {
+        'empty_row_thresh': empty_row_thresh,
+        'falsey_is_null': falsey_is_null,
+        'special_characters': special_characters,
+    }
+
+    # Count the populated cells in each column across all partitions
+    column_counts = None
+
+    if empty_column_thresh > 0:
+        if is_dask_frame(partitions):
+            column_counts = partitions.map_partitions(
+                _partition_column_counts_frame,
+                meta=pd.DataFrame(
+                    {j: pd.Series(dtype=np.int64)
+                     for j in range(len(partitions.columns))}
+                ),
+                **count_kwargs
+            ).sum().compute().to_numpy()
+        else:
+            column_counts = sum(
+                _map_ordered(
+                    functools.partial(
+                        _partition_column_counts, **count_kwargs
+                    ),
+                    partitions,
+                    executor,
+                    max_pending,
+                )
+            )
+
+    cleaner = functools.partial(
+        _clean_null_partition,
+        empty_row_thresh=empty_row_thresh,
+        empty_column_thresh=empty_column_thresh,
+        falsey_is_null=falsey_is_null,
+        special_characters=special_characters,
+        column_counts=column_counts,
+    )
+
+    if is_dask_frame(partitions):
+        return partitions.map_partitions(cleaner)
+
+    return _map_ordered(cleaner, partitions, executor, max_pending)
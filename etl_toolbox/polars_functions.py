@@ -0,0 +1,405 @@
+'''
+.. epigraph:: Functions for working with :class:`polars.DataFrame`\\ s and
+   :class:`polars.LazyFrame`\\ s
+
+Null cleaning and fingerprinting are built from native Polars expressions, so
+they run multithreaded and can be included in lazy query plans.
+
+.. note::
+   This module requires `polars <https://pola.rs>`_, which is an optional
+   dependency of etl-toolbox. The functions in
+   :mod:`~etl_toolbox.dataframe_functions` use this module automatically when
+   they are passed a Polars frame.
+'''
+
+import polars as pl
+
+from . import _kernel
+from .cleaning_functions import FALSEY_INDICATORS, NULL_INDICATORS, fingerprint
+from .mapping_functions import rename_duplicate_labels
+
+
+def fingerprint_expr(expr, special_characters=''):
+    """
+    Returns a Polars expression for the fingerprints of ``expr``
+
+    This is the expression equivalent of :func:`cleaning_functions.fingerprint()
+    <etl_toolbox.cleaning_functions.fingerprint>`. Null values stay null.
+
+    Usage:
+      >>> import polars as pl
+      >>> from etl_toolbox.polars_functions import fingerprint_expr
+      >>> df = pl.DataFrame({'label': ['(Aa_Bb_Cc)', 'Phone #']})
+      >>> df.select(fingerprint_expr(pl.col('label')))['label'].to_list()
+      ['aabbcc', 'phone']
+
+    :param expr:
+        A Polars expression, such as ``pl.col('label')``. Non-string values
+        are cast to strings.
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprints. See :func:`cleaning_functions.fingerprint()
+        <etl_toolbox.cleaning_functions.fingerprint>` for details.
+
+    :type special_characters: string, optional
+
+    :return:
+        Returns a Polars expression.
+    """
+    # Special characters are written as hex escapes, which mean the same
+    # thing in every position of a Rust regex character class.
+    remove_regex = r'[^0-9a-z{}]'.format(
+        ''.join(r'\x{{{:x}}}'.format(ord(c)) for c in special_characters)
+    )
+
+    return (
+        expr.cast(pl.Utf8)
+        .str.to_lowercase()
+        .str.replace_all(remove_regex, '')
+    )
+
+
+def null_indicating_expr(
+    name, dtype, falsey_is_null=False, special_characters=''
+):
+    """
+    Returns a boolean Polars expression that is ``true`` where the values of
+    column ``name`` are *null-indicating*
+
+    The rules of :func:`cleaning_functions.clean_null()
+    <etl_toolbox.cleaning_functions.clean_null>` are applied according to
+    ``dtype``:
+
+    - String and categorical values are *null-indicating* if their
+      fingerprint is in :const:`~etl_toolbox.cleaning_functions.NULL_INDICATORS`
+      (or :const:`~etl_toolbox.cleaning_functions.FALSEY_INDICATORS` if
+      ``falsey_is_null``)
+    - Numeric and boolean values are *null-indicating* if they are zero or
+      ``false`` and ``falsey_is_null`` is set
+    - Float ``NaN`` values are always *null-indicating*
+    - List values are *null-indicating* if they are empty or all of their
+      elements are *null-indicating*
+    - Null values are always *null-indicating*
+
+    .. note::
+       Strings that contain Python literals (such as ``'[None, None]'``) are
+       not evaluated, since that can't be done with a native expression.
+
+    :param name:
+        The name of the column.
+
+    :param dtype:
+        The Polars data type of the column.
+
+    :param falsey_is_null:
+        Controls whether falsey values are considered *null-indicating*.
+        Default is ``False``.
+
+    :type falsey_is_null: boolean, optional
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprints. See :func:`cleaning_functions.fingerprint()
+        <etl_toolbox.cleaning_functions.fingerprint>` for details.
+
+    :type special_characters: string, optional
+
+    :return:
+        Returns a Polars expression.
+    """
+    return _null_indicating(
+        pl.col(name), dtype, falsey_is_null, special_characters
+    )
+
+
+def _null_indicating(expr, dtype, falsey_is_null, special_characters):
+    """
+    Returns the expression for :func:`null_indicating_expr()` applied to
+    ``expr``.
+    """
+    null_indicating = expr.is_null()
+
+    if dtype in (pl.Utf8, pl.Categorical):
+        indicators = list(NULL_INDICATORS)
+        if falsey_is_null:
+            indicators += FALSEY_INDICATORS
+
+        null_indicating = null_indicating | fingerprint_expr(
+            expr, special_characters
+        ).is_in(indicators)
+
+    elif dtype == pl.Boolean:
+        if falsey_is_null:
+            null_indicating = null_indicating | ~expr
+
+    elif dtype.is_numeric():
+        if dtype in (pl.Float32, pl.Float64):
+            null_indicating = null_indicating | expr.is_nan()
+        if falsey_is_null:
+            null_indicating = null_indicating | (expr == 0)
+
+    elif dtype == pl.List:
+        null_indicating = null_indicating | expr.list.eval(
+            _null_indicating(
+                pl.element(), dtype.inner, falsey_is_null, special_characters
+            )
+        ).list.all()
+
+    return null_indicating.fill_null(True)
+
+
+def dataframe_clean_null(
+    df,
+    empty_row_thresh=1,
+    empty_column_thresh=1,
+    falsey_is_null=False,
+    special_characters='',
+):
+    """
+    Cleans null values of a :class:`polars.DataFrame` or
+    :class:`polars.LazyFrame` and removes empty rows/columns.
+
+    This follows the same rules as :func:`dataframe_functions.dataframe_clean_null()
+    <etl_toolbox.dataframe_functions.dataframe_clean_null>`, using
+    :func:`null_indicating_expr()` to find the null cells.
+
+    Usage:
+      >>> import polars as pl
+      >>> from etl_toolbox.polars_functions import dataframe_clean_null
+      >>> df = pl.DataFrame(
+      ...     [
+      ...         ["AAA",          None, "111-111-1111", "empty"],
+      ...         ["BAA", "baa@baa.com",            "-",     "-"],
+      ...         ["CAA", "caa@caa.com", "notavailable",   "..."],
+      ...         ["DAA",     "blocked", "444-444-4444",  "null"]
+      ...     ],
+      ...     schema=["id", "email", "phone", "col4"],
+      ...     orient="row"
+      ... )
+      >>> dataframe_clean_null(df).rows()
+      [('AAA', None, '111-111-1111'), ('BAA', 'baa@baa.com', None), ('CAA', 'caa@caa.com', None), ('DAA', None, '444-444-4444')]
+
+    :param df:
+        A :class:`polars.DataFrame` or :class:`polars.LazyFrame`.
+
+        .. note::
+           If ``df`` is a :class:`~polars.LazyFrame` and
+           ``empty_column_thresh`` is not ``0``, the plan is executed once to
+           count the populated cells in each column. The result is still a
+           :class:`~polars.LazyFrame`.
+
+    :param empty_row_thresh:
+        The number of non-null values required for a row to be considered
+        populated/non-empty. Default is ``1``.
+
+    :type empty_row_thresh: int, optional
+
+    :param empty_column_thresh:
+        The number of non-null values required for a column to be considered
+        populated/non-empty. Default is ``1``.
+
+    :type empty_column_thresh: int, optional
+
+    :param falsey_is_null:
+        Controls whether falsey objects are considered *null-indicating*.
+        Default is ``False``.
+
+    :type falsey_is_null: boolean, optional
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprints. See :func:`cleaning_functions.fingerprint()
+        <etl_toolbox.cleaning_functions.fingerprint>` for details.
+
+    :type special_characters: string, optional
+
+    :return:
+        Returns a new frame of the same type as ``df``.
+    """
+    schema = df.schema
+
+    cleaned = df.with_columns([
+        pl.when(
+            null_indicating_expr(
+                name,
+                dtype,
+                falsey_is_null=falsey_is_null,
+                special_characters=special_characters,
+            )
+        ).then(None).otherwise(pl.col(name)).alias(name)
+        for name, dtype in schema.items()
+    ])
+
+    # Drop rows with fewer populated cells than empty_row_thresh
+    if empty_row_thresh > 0 and schema:
+        cleaned = cleaned.filter(
+            _populated_count(schema) >= empty_row_thresh
+        )
+
+    # Drop columns with fewer populated cells than empty_column_thresh
+    if empty_column_thresh > 0 and schema:
+        counts = cleaned.select(
+            [pl.col(name).is_not_null().sum() for name in schema]
+        )
+        if isinstance(counts, pl.LazyFrame):
+            counts = counts.collect()
+
+        keep_columns = [
+            name for name in schema
+            if counts[name][0] >= empty_column_thresh
+        ]
+        cleaned = cleaned.select(keep_columns)
+
+        # Make sure there are no empty rows in the final df
+        # (unless empty_row_thresh is 0)
+        if empty_column_thresh > 1 and empty_row_thresh != 0:
+            cleaned = cleaned.filter(_populated_count(keep_columns) > 0)
+
+    return cleaned
+
+
+def _populated_count(names):
+    """
+    Returns an expression counting the non-null values in columns ``names``
+    for each row.
+    """
+    if not names:
+        return pl.lit(0)
+
+    return pl.sum_horizontal(
+        [pl.col(name).is_not_null().cast(pl.UInt32) for name in names]
+    )
+
+
+def find_column_labels(
+    df, label_fingerprints, label_match_thresh=3, special_characters=''
+):
+    """
+    Finds a row of column labels within a :class:`polars.DataFrame` or
+    :class:`polars.LazyFrame` based on a collection of expected
+    ``label_fingerprints``.
+
+    This follows the same rules as :func:`dataframe_functions.find_column_labels()
+    <etl_toolbox.dataframe_functions.find_column_labels>`. The rows are
+    searched with :func:`fingerprint_expr()`, so only the label row itself is
+    brought into Python.
+
+    .. note::
+       Polars requires column names to be unique strings. Label values are
+       converted with ``str()`` (``None`` becomes ``''``) and duplicates are
+       renamed with :func:`mapping_functions.rename_duplicate_labels()
+       <etl_toolbox.mapping_functions.rename_duplicate_labels>`.
+
+    Usage:
+      >>> import polars as pl
+      >>> from etl_toolbox.polars_functions import find_column_labels
+      >>> df = pl.DataFrame(
+      ...     [
+      ...         ["created by:", "etl-toolbox",             "",         "-"],
+      ...         [      "email",        "date",        "phone",        "id"],
+      ...         ["aaa@aaa.com",     "04mar14", "999-333-4444",       "AAA"]
+      ...     ],
+      ...     orient="row"
+      ... )
+      >>> find_column_labels(df, {'email', 'date', 'phone'}).columns
+      ['email', 'date', 'phone', 'id']
+
+    :param df:
+        A :class:`polars.DataFrame` or :class:`polars.LazyFrame`.
+
+    :param label_fingerprints:
+        Fingerprinted label names that are expected in the column labels row.
+
+    :type label_fingerprints: set, list, or dict
+
+    :param label_match_thresh:
+        The number of fingerprints that must be found in
+        ``label_fingerprints`` for a row to be identified as the label row.
+        Default is ``3``.
+
+    :type label_match_thresh: int, optional
+
+    :param special_characters:
+        A string of special characters to preserve while creating the
+        fingerprints for lookup in ``label_fingerprints``.
+
+    :type special_characters: string, optional
+
+    :raises IndexError:
+        Raised if a label row can not be identified in ``df``.
+
+    :raises ValueError:
+        Raised if the ``label_match_thresh`` is set to `0`.
+
+    :raises TypeError:
+        Raised if ``label_fingerprints`` is an array of hashes, which is only
+        supported for pandas frames.
+
+    :return:
+        Returns a new frame of the same type as ``df``.
+    """
+    if label_match_thresh == 0:
+        raise ValueError("label_match_thresh can not be 0.")
+
+    if _kernel.is_hashed(label_fingerprints):
+        raise TypeError(
+            'Hashed label_fingerprints are not supported for Polars frames.'
+        )
+
+    # First, check if the initial labels are already correct
+    label_count = sum(
+        fingerprint(x, special_characters=special_characters)
+        in label_fingerprints
+        for x in df.columns
+    )
+
+    if label_count >= label_match_thresh:
+        return df
+
+    label_fingerprints = list(label_fingerprints)
+    row_index = '**7c1b0ff2-2f5e-4ad6-a3b7-5a0a2e7c5d41**-row'
+
+    label_count = pl.sum_horizontal([
+        fingerprint_expr(pl.col(name), special_characters).is_in(
+            label_fingerprints
+        ).fill_null(False).cast(pl.UInt32)
+        for name in df.columns
+    ])
+
+    label_row = (
+        df.with_row_index(row_index)
+        .filter(label_count >= label_match_thresh)
+        .head(1)
+    )
+    if isinstance(label_row, pl.LazyFrame):
+        label_row = label_row.collect()
+
+    if label_row.height == 0:
+        raise IndexError(
+            'Label row could not be identified. Make sure '
+            'label_fingerprints contains the expected label names.'
+        )
+
+    label_index = label_row[row_index][0]
+    labels = rename_duplicate_labels([
+        '' if x is None else str(x) for x in label_row.row(0)[1:]
+    ])
+
+    return df.slice(label_index + 1).select([
+        pl.col(name).alias(label) for name, label in zip(df.columns, labels)
+    ])
+
+
+def merge_columns_by_label(df, deduplicate_values=False):
+    """
+    Polars equivalent of :func:`dataframe_functions.merge_columns_by_label()
+    <etl_toolbox.dataframe_functions.merge_columns_by_label>`.
+
+    Polars frames can't contain duplicate column labels, so there is never
+    anything to merge and ``df`` is returned unchanged.
+
+    :return:
+        Returns ``df``.
+    """
+    return df
@@ -0,0 +1,231 @@
+'''
+.. epigraph:: Functions for cleaning streams of records
+
+Records are cleaned as they are read from any iterable, such as a
+:class:`csv.DictReader`, an API client, or a queue consumer, without building
+a :class:`pandas.DataFrame`.
+'''
+
+import itertools
+
+from . import _kernel
+from .cleaning_functions import clean_whitespace
+from .mapping_functions import map_labels, rename_duplicate_labels
+
+
+def clean_records(
+    records,
+    fingerprint_map=None,
+    labels=None,
+    rest_label=None,
+    falsey_is_null=False,
+    special_characters='',
+    whitespace=True,
+    empty_record_thresh=1,
+    batch_size=1024,
+):
+    """
+    Cleans the values and labels of a stream of records, yielding each
+    cleaned record as soon as its batch is done
+
+    Each value is cleaned with :func:`cleaning_functions.clean_whitespace()
+    <etl_toolbox.cleaning_functions.clean_whitespace>` (if ``whitespace``
+    is set) and :func:`cleaning_functions.clean_null()
+    <etl_toolbox.cleaning_functions.clean_null>`, so *null-indicating*
+    values become ``None``. If ``fingerprint_map`` is given, the labels are
+    mapped with :func:`mapping_functions.map_labels()
+    <etl_toolbox.mapping_functions.map_labels>` and
+    :func:`mapping_functions.rename_duplicate_labels()
+    <etl_toolbox.mapping_functions.rename_duplicate_labels>`, and values
+    with unmapped labels are dropped.
+
+    Records are read ``batch_size`` at a time, and the values of a batch
+    are classified together with the same vectorized kernel as
+    :func:`dataframe_functions.dataframe_clean_null()
+    <etl_toolbox.dataframe_functions.dataframe_clean_null>`. Label mappings
+    are computed once for each distinct set of labels. Only one batch is
+    held in memory, so ``records`` can be an unbounded generator.
+
+    Usage:
+      >>> from etl_toolbox.record_functions import clean_records
+      >>> records = [
+      ...     {'EML-addr': ' aaa@aaa.com ', 'Phone #': 'n/a', 'x': 1},
+      ...     {'EML-addr': 'null', 'Phone #': '  --  ', 'x': 2},
+      ...     {'EML-addr': 'baa@baa.com', 'Phone #': '111  1111', 'x': 3},
+      ... ]
+      >>> fingerprint_map = {'emladdr': 'email', 'phone': 'phone'}
+      >>> for record in clean_records(records, fingerprint_map):
+      ...     print(record)
+      {'email': 'aaa@aaa.com', 'phone': None}
+      {'email': 'baa@baa.com', 'phone': '111 1111'}
+
+      Sequences are cleaned by position, or turned into dicts with
+      ``labels``:
+      >>> list(clean_records([(' a ', 'None'), ('', '[]')]))
+      [('a', None)]
+      >>> list(clean_records([(' a ', 'None')], labels=['x', 'y']))
+      [{'x': 'a', 'y': None}]
+
+    :param records:
+        An iterable of dicts, or of sequences (like tuples or the lists
+        from :func:`csv.reader`).
+
+    :param fingerprint_map:
+        A dictionary of label fingerprints mapped to output labels (see
+        :func:`mapping_functions.map_labels()
+        <etl_toolbox.mapping_functions.map_labels>`). If ``None``, labels
+        are left unchanged.
+
+    :param labels:
+        The labels of the values in sequence records. If given, sequence
+        records are yielded as dicts. Records that are shorter than
+        ``labels`` (like ragged :func:`csv.reader` rows) are padded with
+        ``None``.
+
+    :param rest_label:
+        Like the ``restkey`` of :class:`csv.DictReader`: if given, the
+        cleaned values of sequence records that are longer than ``labels``
+        are yielded as a list under this label. If ``None``, the extra
+        values are dropped. Default is ``None``.
+
+    :param falsey_is_null:
+        Passed to :func:`cleaning_functions.clean_null()
+        <etl_toolbox.cleaning_functions.clean_null>`. Default is ``False``.
+
+    :type falsey_is_null: boolean, optional
+
+    :param special_characters:
+        Passed to :func:`cleaning_functions.clean_null()
+        <etl_toolbox.cleaning_functions.clean_null>` and
+        :func:`mapping_functions.map_labels()
+        <etl_toolbox.mapping_functions.map_labels>`.
+
+    :type special_characters: string, optional
+
+    :param whitespace:
+        If ``True``, string values are cleaned with
+        :func:`cleaning_functions.clean_whitespace()
+        <etl_toolbox.cleaning_functions.clean_whitespace>`. Default is
+        ``True``.
+
+    :type whitespace: boolean, optional
+
+    :param empty_record_thresh:
+        Records with fewer than this many populated values (after label
+        mapping) are dropped. Set it to ``0`` to keep every record. Default
+        is ``1``.
+
+    :type empty_record_thresh: int, optional
+
+    :param batch_size:
+        The number of records cleaned together. Default is ``1024``.
+
+    :type batch_size: int, optional
+
+    :return:
+        Returns a generator of cleaned records. Dicts are yielded as dicts,
+        and sequences as tuples (or dicts if ``labels`` is given).
+    """
+    null_limit = (
+        len(_kernel.null_classes()) if falsey_is_null
+        else _kernel.falsey_code()
+    )
+
+    # Label layouts repeat from record to record, so each distinct layout is
+    # only mapped once
+    layouts = {}
+
+    def layout(keys):
+        try:
+            return layouts[keys]
+        except KeyError:
+            pass
+
+        if fingerprint_map is None:
+            result = (keys, None)
+        else:
+            mapped = map_labels(
+                keys, fingerprint_map, special_characters=special_characters
+            )
+            positions = [
+                i for i, label in enumerate(mapped) if label != '-'
+            ]
+            result = (
+                tuple(rename_duplicate_labels([mapped[i] for i in positions])),
+                positions,
+            )
+
+        if len(layouts) >= 4096:
+            layouts.clear()
+        layouts[keys] = result
+        return result
+
+    records = iter(records)
+
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return
+
+        # Each record is reduced to its labels (or None for unlabeled
+        # sequences) and a list of its values
+        rows = []
+        values = []
+        for record in batch:
+            extra = []
+            if isinstance(record, dict):
+                keys = tuple(record)
+                row_values = list(record.values())
+                as_dict = True
+            else:
+                keys = tuple(labels) if labels is not None else None
+                row_values = list(record)
+                as_dict = labels is not None
+
+                # Ragged rows are matched to the labels
+                if keys is not None and len(row_values) != len(keys):
+                    if rest_label is not None:
+                        extra = row_values[len(keys):]
+                    row_values = row_values[:len(keys)] + (
+                        [None] * (len(keys) - len(row_values))
+                    )
+
+            if keys is not None:
+                keys, positions = layout(keys)
+                if positions is not None:
+                    row_values = [row_values[i] for i in positions]
+
+            rows.append((keys, as_dict, len(row_values), len(extra)))
+            values.extend(row_values)
+            values.extend(extra)
+
+        if whitespace:
+            values = [
+                clean_whitespace(x) if type(x) is str else x for x in values
+            ]
+
+        codes = _kernel.classify_values(
+            values, special_characters, hashes=False
+        )[1]
+        is_null = (codes < null_limit).tolist()
+
+        start = 0
+        for keys, as_dict, n, n_extra in rows:
+            stop = start + n + n_extra
+            row_values = [
+                None if null else x
+                for x, null in zip(values[start:stop], is_null[start:stop])
+            ]
+            populated = n + n_extra - sum(is_null[start:stop])
+            start = stop
+
+            if populated < empty_record_thresh:
+                continue
+
+            if as_dict:
+                record = dict(zip(keys, row_values[:n]))
+                if n_extra:
+                    record[rest_label] = row_values[n:]
+                yield record
+            else:
+                yield tuple(row_values)
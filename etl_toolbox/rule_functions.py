@@ -0,0 +1,324 @@
+'''
+.. epigraph:: Functions for applying declarative cleaning rules to
+   :class:`pandas.DataFrame`\\ s
+
+A rule spec is a dictionary of column labels (or :mod:`fnmatch` patterns)
+mapped to a list of cleaning steps. The spec is compiled once into a plan,
+and each column's steps run as vectorized stages wherever possible instead of
+calling a function on every cell with :meth:`pandas.DataFrame.applymap`.
+'''
+
+import collections
+import fnmatch
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+from .dataframe_functions import _column_null_mask
+
+
+def _clean_whitespace(s, special_characters):
+    return s.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def _fingerprint(s, special_characters):
+    remove_regex = r'[^0-9a-z{}]'.format(re.escape(special_characters))
+    return s.str.lower().str.replace(remove_regex, '', regex=True)
+
+
+#: The steps that can be named in a rule spec. Each one is the vectorized
+#: equivalent of calling the function of the same name on every value.
+#: ``'clean_null'`` has no string function, since it runs as a null mask.
+RULE_STEPS = {
+    'clean_whitespace': _clean_whitespace,
+    'clean_null': None,
+    'fingerprint': _fingerprint,
+    'lower': lambda s, special_characters: s.str.lower(),
+    'strip': lambda s, special_characters: s.str.strip(),
+    'upper': lambda s, special_characters: s.str.upper(),
+}
+
+#: A compiled rule spec, returned by :func:`compile_rules()`. ``rules`` is a
+#: tuple of ``(selector, stages)`` pairs in the order of the spec.
+RulePlan = collections.namedtuple('RulePlan', ['rules'])
+
+
+def compile_rules(rules):
+    """
+    Compiles a rule spec into a :class:`RulePlan` for :func:`apply_rules()`
+
+    Compiled plans are cached by the contents of the spec, so compiling the
+    same spec again (for example, once for each file in a batch) returns the
+    cached plan.
+
+    Usage:
+      >>> from etl_toolbox.rule_functions import compile_rules
+      >>> plan = compile_rules({'email*': ['clean_whitespace', 'lower']})
+      >>> plan is compile_rules({'email*': ['clean_whitespace', 'lower']})
+      True
+
+    :param rules:
+        A dictionary of column selectors mapped to a list of steps.
+
+        A selector is a column label, or a string pattern (like
+        ``'email*'``) that is matched against the column labels with
+        :func:`fnmatch.fnmatchcase`. A column gets the steps of every
+        selector that matches it, in the order of ``rules``.
+
+        A step is the name of one of :data:`RULE_STEPS`, or a function that
+        takes a single value and returns the cleaned value. Named steps are
+        vectorized. Functions are called on every value of the column.
+
+    :raises ValueError:
+        Raised if a step name isn't in :data:`RULE_STEPS`.
+
+    :return:
+        Returns a :class:`RulePlan`.
+    """
+    if isinstance(rules, RulePlan):
+        return rules
+
+    try:
+        return _compile_rules(_rules_key(rules))
+    except TypeError:
+        # Unhashable steps can't be cached
+        return _compile_rules.__wrapped__(_rules_key(rules))
+
+
+def apply_rules(
+    df,
+    rules,
+    falsey_is_null=False,
+    special_characters='',
+    return_new=False,
+):
+    """
+    Applies a rule spec to the columns of a :class:`pandas.DataFrame`
+
+    Each column's steps are planned into stages:
+
+    - Consecutive string steps (like ``'clean_whitespace'`` and
+      ``'lower'``) are fused into one stage. The column's distinct strings
+      are pulled out once, run through all of the steps with pandas string
+      methods, and written back once. Other values are left unchanged, as
+      the scalar functions would leave them.
+    - ``'fingerprint'`` converts every value to a string first, like
+      :func:`cleaning_functions.fingerprint()
+      <etl_toolbox.cleaning_functions.fingerprint>`, and then fuses with the
+      string steps around it.
+    - ``'clean_null'`` finds *null-indicating* values with the same
+      vectorized mask as :func:`dataframe_functions.dataframe_clean_null()
+      <etl_toolbox.dataframe_functions.dataframe_clean_null>` and sets them
+      to ``np.nan``.
+    - Functions are called on each value with :meth:`pandas.Series.map`,
+      including null values, just as with
+      :meth:`~pandas.DataFrame.applymap`.
+
+    The plan for a set of column labels is cached with the compiled spec, so
+    applying the same spec to many files with the same columns is only
+    planned once.
+
+    Usage:
+      >>> import pandas as pd
+      >>> from etl_toolbox.rule_functions import apply_rules
+      >>> df = pd.DataFrame({
+      ...     'email_1': ['  AAA@aaa.COM ', 'n/a', None],
+      ...     'email_2': ['BAA@baa.com', ' -- ', 5],
+      ...     'name': ['  Jane\\t Doe', 'null', 'John  Roe'],
+      ... })
+      >>> def title(x):
+      ...     return x.title() if isinstance(x, str) else x
+      >>> apply_rules(df, {
+      ...     'email*': ['clean_whitespace', 'lower', 'clean_null'],
+      ...     'name': ['clean_whitespace', 'clean_null', title],
+      ... })
+      >>> print(df)
+             email_1      email_2      name
+      0  aaa@aaa.com  baa@baa.com  Jane Doe
+      1          NaN          NaN       NaN
+      2          NaN            5  John Roe
+
+    :param df:
+        A :class:`pandas.DataFrame`.
+
+    :param rules:
+        A rule spec (see :func:`compile_rules()`) or a :class:`RulePlan`.
+
+    :param falsey_is_null:
+        Passed to the ``'clean_null'`` step. See
+        :func:`cleaning_functions.clean_null()
+        <etl_toolbox.cleaning_functions.clean_null>`.
+
+    :type falsey_is_null: boolean, optional
+
+    :param special_characters:
+        Passed to the ``'clean_null'`` and ``'fingerprint'`` steps.
+
+    :type special_characters: string, optional
+
+    :param return_new:
+        If ``True``, ``df`` is left unchanged and a new
+        :class:`~pandas.DataFrame` is returned instead. Default is ``False``.
+
+    :type return_new: boolean, optional
+
+    :return:
+        Returns ``None``, or a new :class:`~pandas.DataFrame` if
+        ``return_new`` is ``True``.
+    """
+    plan = compile_rules(rules)
+
+    try:
+        column_stages = _column_plan(plan, tuple(df.columns))
+    except TypeError:
+        column_stages = _column_plan.__wrapped__(plan, tuple(df.columns))
+
+    new_df = df.copy(deep=False) if return_new else df
+
+    # Columns are replaced by position, so that duplicate labels are
+    # cleaned separately
+    labels = new_df.columns
+    new_df.columns = pd.RangeIndex(new_df.shape[1])
+
+    try:
+        for j, stages in enumerate(column_stages):
+            if stages:
+                new_df[j] = _run_stages(
+                    new_df[j], stages, falsey_is_null, special_characters
+                )
+    finally:
+        new_df.columns = labels
+
+    if return_new:
+        return new_df
+
+
+def _rules_key(rules):
+    """
+    Returns a tuple of the contents of a rule spec, for use as a cache key.
+    """
+    return tuple((selector, tuple(steps)) for selector, steps in rules.items())
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_rules(rules_key):
+    """
+    Returns the :class:`RulePlan` for a rule spec key from
+    :func:`_rules_key()`.
+    """
+    compiled = []
+
+    for selector, steps in rules_key:
+        stages = []
+        for step in steps:
+            if callable(step):
+                stages.append(('python', step))
+            elif step not in RULE_STEPS:
+                raise ValueError(
+                    'Unknown rule step {!r}. Steps must be functions or one '
+                    'of {}.'.format(step, sorted(RULE_STEPS))
+                )
+            elif step == 'clean_null':
+                stages.append(('null', None))
+            else:
+                if step == 'fingerprint':
+                    stages.append(('str', None))
+                stages.append(('strings', (RULE_STEPS[step],)))
+
+        compiled.append((selector, tuple(stages)))
+
+    return RulePlan(tuple(compiled))
+
+
+@functools.lru_cache(maxsize=1024)
+def _column_plan(plan, labels):
+    """
+    Returns a tuple of the fused stages for each of ``labels`` under
+    ``plan``.
+    """
+    column_stages = []
+
+    for label in labels:
+        stages = []
+        for selector, selector_stages in plan.rules:
+            if not _selector_matches(selector, label):
+                continue
+
+            for stage in selector_stages:
+                # Consecutive string steps become one stage
+                if (
+                    stage[0] == 'strings'
+                    and stages and stages[-1][0] == 'strings'
+                ):
+                    stages[-1] = ('strings', stages[-1][1] + stage[1])
+                else:
+                    stages.append(stage)
+
+        column_stages.append(tuple(stages))
+
+    return tuple(column_stages)
+
+
+def _selector_matches(selector, label):
+    """
+    Returns ``True`` if a rule ``selector`` matches the column ``label``.
+    """
+    if selector == label:
+        return True
+    return isinstance(selector, str) and fnmatch.fnmatchcase(
+        str(label), selector
+    )
+
+
+def _run_stages(column, stages, falsey_is_null, special_characters):
+    """
+    Returns ``column`` after running ``stages`` from :func:`_column_plan()`.
+    """
+    for kind, steps in stages:
+        if kind == 'strings':
+            column = _run_string_steps(column, steps, special_characters)
+        elif kind == 'str':
+            column = column.astype(str)
+        elif kind == 'null':
+            null_mask = _column_null_mask(
+                column,
+                falsey_is_null=falsey_is_null,
+                special_characters=special_characters,
+            )
+            if null_mask.any():
+                column = column.astype(object).where(~null_mask, np.nan)
+        else:
+            column = column.map(steps)
+
+    return column
+
+
+def _run_string_steps(column, steps, special_characters):
+    """
+    Returns ``column`` with the string ``steps`` applied to its string
+    values. Each distinct string is only processed once.
+    """
+    if not (
+        column.dtype == object or isinstance(column.dtype, pd.StringDtype)
+    ):
+        return column
+
+    values = column.to_numpy(dtype=object)
+    is_str = np.fromiter(
+        (type(x) is str for x in values), dtype=bool, count=len(values)
+    )
+    if not is_str.any():
+        return column
+
+    codes, uniques = pd.factorize(values[is_str])
+
+    strings = pd.Series(uniques, dtype=object)
+    for step in steps:
+        strings = step(strings, special_characters)
+
+    values = values.copy()
+    values[is_str] = strings.to_numpy(dtype=object)[codes]
+
+    return pd.Series(values, index=column.index, name=column.name)
@@ -1,6 +1,6 @@
 import sys
 
-from setuptools import setup
+from setuptools import Extension, setup
 from setuptools.command.test import test as TestCommand
 
 import etl_toolbox
@@ -40,10 +40,19 @@ setup(
     keywords='etl pandas data cleaning',
     license='Apache-2.0',
     packages=['etl_toolbox'],
+    # The compiled kernels are optional. If the extension can't be built,
+    # the package falls back to its pure-Python implementation.
+    ext_modules=[
+        Extension(
+            'etl_toolbox._speedups',
+            sources=['etl_toolbox/_speedups.c'],
+            optional=True,
+        )
+    ],
     install_requires=['numpy>=1.18.0',
-                      'pandas>=0.25.0'
+                      'pandas>=1.1.0'
                       ],
-    python_requires='>=3.5',
+    python_requires='>=3.6.1',
     tests_require=['pytest',
                    'coverage',
                    'pytest-cov'
@@ -54,7 +63,6 @@ setup(
     classifiers=[
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
@@ -67,5 +75,10 @@ setup(
         ],
     extras_require={
         'testing': ['pytest'],
+        'arrow': ['pyarrow>=8.0.0'],
+        'dask': ['dask[dataframe]'],
+        'polars': ['polars>=0.20.4'],
+        'zstd': ['zstandard'],
+        'isal': ['isal>=1.3.0'],
     }
 )
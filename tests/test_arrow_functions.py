@@ -0,0 +1,120 @@
+import pytest
+import pandas as pd
+
+from etl_toolbox.dataframe_functions import dataframe_clean_null
+
+pa = pytest.importorskip('pyarrow')
+ds = pytest.importorskip('pyarrow.dataset')
+
+from etl_toolbox.arrow_functions import arrow_clean_null  # noqa: E402
+from etl_toolbox.arrow_functions import arrow_dataset_clean_null  # noqa: E402
+from etl_toolbox.arrow_functions import arrow_null_mask  # noqa: E402
+
+
+ROWS = [
+    ['AAA', None, '111-111-1111', 'empty', 0, 1.5, True],
+    ['BAA', 'baa@baa.com', '-', '-', 1, 0.0, False],
+    ['CAA', 'caa@caa.com', 'notavailable', '...', 2, None, None],
+    ['null', 'blocked', 'false', 'n/a', 0, float('nan'), False],
+    ['EAA', 'none', '444-444-4444', 'null', 0, 2.5, True]
+]
+COLUMNS = ['id', 'email', 'phone', 'col4', 'count', 'amount', 'flag']
+
+
+def expected_df(**kwargs):
+    df = pd.DataFrame(ROWS, columns=COLUMNS)
+    dataframe_clean_null(df, **kwargs)
+    return df
+
+
+@pytest.mark.parametrize('empty_row_thresh, empty_column_thresh', [
+    (1, 1),
+    (3, 1),
+    (0, 2),
+    (4, 2),
+    (1, 0)
+])
+@pytest.mark.parametrize('falsey_is_null', [False, True])
+@pytest.mark.parametrize('data_type', ['table', 'chunked_table', 'batch'])
+def test_arrow_clean_null(
+    empty_row_thresh, empty_column_thresh, falsey_is_null, data_type
+):
+    table = pa.Table.from_pandas(
+        pd.DataFrame(ROWS, columns=COLUMNS), preserve_index=False
+    )
+    if data_type == 'chunked_table':
+        table = pa.concat_tables([table.slice(0, 2), table.slice(2)])
+    elif data_type == 'batch':
+        table = table.to_batches()[0]
+
+    kwargs = {
+        'empty_row_thresh': empty_row_thresh,
+        'empty_column_thresh': empty_column_thresh,
+        'falsey_is_null': falsey_is_null
+    }
+
+    result = arrow_clean_null(table, **kwargs)
+    expected = expected_df(**kwargs)
+
+    assert isinstance(result, type(table))
+    assert result.schema.names == expected.columns.tolist()
+    assert result.to_pandas().isna().equals(expected.isna())
+
+
+@pytest.mark.parametrize('array, falsey_is_null, expected', [
+    (pa.array([[], ['empty', None], ['x'], None]), False,
+     [True, True, False, True]),
+    (pa.array(['a', 'Null', 'a', None]).dictionary_encode(), False,
+     [False, True, False, True]),
+    (pa.array(['False', '(0)', '[]', ' ']), True, [True, True, True, True]),
+    (pa.array([0, 1, 10], pa.duration('s')), True, [True, False, False])
+])
+def test_arrow_null_mask(array, falsey_is_null, expected):
+    result = arrow_null_mask(array, falsey_is_null=falsey_is_null)
+
+    assert result.to_pylist() == expected
+
+
+def test_arrow_clean_null_zero_copy():
+    batch = pa.record_batch([
+        pa.array(['a', 'none', 'b', 'c']),
+        pa.array([1.5, float('nan'), 2.0, 3.0])
+    ], names=['x', 'y'])
+
+    result = arrow_clean_null(batch, empty_row_thresh=0)
+
+    for j in range(2):
+        # The value buffers are reused, only the validity bitmap is new
+        assert (
+            result.column(j).buffers()[-1].address
+            == batch.column(j).buffers()[-1].address
+        )
+    assert result.column(0).to_pylist() == ['a', None, 'b', 'c']
+    assert result.column(1).to_pylist() == [1.5, None, 2.0, 3.0]
+
+
+def test_arrow_dataset_clean_null(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    # 'phone' is only populated in the second file, so it is kept. 'col4' is
+    # empty in every file, so it is removed from every batch.
+    pq.write_table(pa.table({
+        'id': ['AAA', 'none', 'CAA'],
+        'phone': ['null', 'n/a', None],
+        'col4': ['empty', None, '-']
+    }), str(tmp_path / '1.parquet'))
+    pq.write_table(pa.table({
+        'id': ['DAA', None],
+        'phone': ['444-444-4444', 'unknown'],
+        'col4': [None, 'null']
+    }), str(tmp_path / '2.parquet'))
+
+    dataset = ds.dataset(str(tmp_path), format='parquet')
+
+    batches = list(arrow_dataset_clean_null(dataset))
+    result = pa.Table.from_batches(batches).sort_by('id')
+
+    assert result.to_pydict() == {
+        'id': ['AAA', 'CAA', 'DAA'],
+        'phone': [None, None, '444-444-4444']
+    }
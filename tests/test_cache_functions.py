@@ -0,0 +1,203 @@
+import concurrent.futures
+import functools
+import os
+import shutil
+
+import pytest
+import pandas as pd
+
+from etl_toolbox.ingest_functions import clean_file_frame, read_file
+
+pytest.importorskip('pyarrow')
+
+from etl_toolbox.cache_functions import cached_clean_file  # noqa: E402
+from etl_toolbox.cache_functions import clear_cache  # noqa: E402
+
+
+LABEL_FINGERPRINTS = {'cust', 'emladdr', 'firstname', 'commonname'}
+
+
+class CountingProcessor:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, df, **kwargs):
+        self.calls += 1
+        return clean_file_frame(df, **kwargs)
+
+
+def cache_entries(cache_dir):
+    return sorted(
+        name for name in os.listdir(cache_dir) if name.endswith('.feather')
+    )
+
+
+@pytest.mark.parametrize('path', [
+    'test_data/animals.tsv',
+    'test_data/bad-data.csv',
+    'test_data/random_pii_2.csv',
+])
+def test_cached_clean_file(tmp_path, path):
+    cache_dir = str(tmp_path / 'cache')
+    processor = CountingProcessor()
+
+    expected = clean_file_frame(
+        read_file(path), label_fingerprints=LABEL_FINGERPRINTS,
+        label_match_thresh=1
+    )
+
+    results = [
+        cached_clean_file(
+            path, cache_dir, processor=processor,
+            label_fingerprints=LABEL_FINGERPRINTS, label_match_thresh=1
+        )
+        for _ in range(3)
+    ]
+
+    assert processor.calls == 1
+    for result in results:
+        pd.testing.assert_frame_equal(result, expected)
+        # assert_frame_equal treats None and NaN as equal
+        assert result.applymap(type).equals(expected.applymap(type))
+
+
+def test_cached_clean_file_keys(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    processor = CountingProcessor()
+
+    path = str(tmp_path / 'a.csv')
+    shutil.copy('test_data/bad-data.csv', path)
+
+    def run(file_path, **kwargs):
+        return cached_clean_file(
+            file_path, cache_dir, processor=processor, label_match_thresh=1,
+            **kwargs
+        )
+
+    run(path, label_fingerprints={'cust', 'emladdr'})
+    # Same parameters in a different order, and the same contents under a
+    # different name
+    run(path, label_fingerprints={'emladdr', 'cust'})
+    shutil.copy(path, str(tmp_path / 'b.csv'))
+    run(str(tmp_path / 'b.csv'), label_fingerprints={'emladdr', 'cust'})
+    assert processor.calls == 1
+
+    # Different parameters, reader, or contents
+    run(path, label_fingerprints={'cust'})
+    run(path, label_fingerprints={'cust'}, falsey_is_null=True)
+    cached_clean_file(
+        path, cache_dir, processor=processor,
+        reader=functools.partial(read_file, dtype=str),
+        label_fingerprints={'cust'}, label_match_thresh=1
+    )
+    with open(path, 'a') as f:
+        f.write('one more,row\n')
+    run(path, label_fingerprints={'cust', 'emladdr'})
+    assert processor.calls == 5
+
+    assert len(cache_entries(cache_dir)) == 5
+
+    clear_cache(cache_dir)
+    assert cache_entries(cache_dir) == []
+
+
+def make_processor(suffix):
+    def processor(df):
+        return df.rename(columns=lambda label: str(label) + suffix)
+    return processor
+
+
+def test_cached_clean_file_callable_keys(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    path = 'test_data/animals.tsv'
+
+    def columns(processor):
+        return cached_clean_file(
+            path, cache_dir, processor=processor
+        ).columns.tolist()
+
+    # Lambdas all have the same name, but different code
+    first = columns(lambda df: df.iloc[:, :1])
+    second = columns(lambda df: df.iloc[:, :2])
+    assert len(first) == 1
+    assert len(second) == 2
+
+    # Local functions with the same name, but different closure values
+    a = columns(make_processor('_a'))
+    b = columns(make_processor('_b'))
+    assert all(label.endswith('_a') for label in a)
+    assert all(label.endswith('_b') for label in b)
+
+    # The same code and values still hit the cache
+    assert columns(make_processor('_a')) == a
+    assert len(cache_entries(cache_dir)) == 4
+
+
+def test_cached_clean_file_eviction(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    paths = []
+    for i in range(4):
+        path = str(tmp_path / '{}.csv'.format(i))
+        pd.DataFrame({'a': ['x'] * 100, 'b': [i] * 100}).to_csv(path)
+        paths.append(path)
+
+    cached_clean_file(paths[0], cache_dir)
+    entry_size = os.path.getsize(
+        os.path.join(cache_dir, cache_entries(cache_dir)[0])
+    )
+    max_cache_bytes = int(entry_size * 2.5)
+
+    entry_0, = cache_entries(cache_dir)
+    cached_clean_file(paths[1], cache_dir, max_cache_bytes=max_cache_bytes)
+    entry_1, = set(cache_entries(cache_dir)) - {entry_0}
+
+    os.utime(os.path.join(cache_dir, entry_0), (100, 100))
+    os.utime(os.path.join(cache_dir, entry_1), (200, 200))
+
+    # A hit makes the first entry the most recently used, so the second is
+    # evicted when the third is added
+    cached_clean_file(paths[0], cache_dir, max_cache_bytes=max_cache_bytes)
+    cached_clean_file(paths[2], cache_dir, max_cache_bytes=max_cache_bytes)
+
+    entries = cache_entries(cache_dir)
+    assert len(entries) == 2
+    assert entry_0 in entries
+    assert entry_1 not in entries
+
+
+def test_cached_clean_file_uncacheable(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    path = str(tmp_path / 'mixed.json')
+    with open(path, 'w') as f:
+        f.write('{"a": "x", "b": 1}\n{"a": 2, "b": 2}\n')
+
+    df = cached_clean_file(path, cache_dir)
+
+    assert df['a'].tolist() == ['x', 2]
+    assert cache_entries(cache_dir) == []
+
+
+def clean_in_process(path, cache_dir):
+    return cached_clean_file(
+        path, cache_dir, label_fingerprints=LABEL_FINGERPRINTS,
+        label_match_thresh=1
+    )
+
+
+def test_cached_clean_file_concurrent(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    paths = ['test_data/animals.tsv', 'test_data/bad-data.csv'] * 4
+
+    with concurrent.futures.ProcessPoolExecutor(4) as executor:
+        results = list(
+            executor.map(clean_in_process, paths, [cache_dir] * len(paths))
+        )
+
+    for path, result in zip(paths, results):
+        pd.testing.assert_frame_equal(
+            result, clean_in_process(path, cache_dir)
+        )
+
+    # Only complete entries are left behind
+    assert len(cache_entries(cache_dir)) == 2
+    assert len(os.listdir(cache_dir)) == 2
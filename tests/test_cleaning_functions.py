@@ -1,6 +1,11 @@
 import pytest
 
+from etl_toolbox import _kernel
+
 from etl_toolbox.cleaning_functions import clean_null, clean_whitespace, fingerprint
+from etl_toolbox.cleaning_functions import classify_null, fingerprint_hash
+from etl_toolbox.cleaning_functions import FALSEY_INDICATORS, NULL_INDICATORS
+from etl_toolbox.cleaning_functions import _encodes_as_ascii
 
 
 @pytest.mark.parametrize("input, expected", [
@@ -24,6 +29,39 @@ def test_fingerprint_special_characters(input, special_characters, expected):
     assert fingerprint(input, special_characters) == expected
 
 
+@pytest.mark.parametrize("input, special_characters, expected", [
+    (u'Direcci\u00f3n',           '',     'direccion'),
+    (u'STRA\u00dfE',              '',     'strasse'),
+    (u'\u00c6ble \u00d8l',        '',     'aebleol'),
+    (u'\u0141\u00f3d\u017a',        '',     'lodz'),
+    (u'\uff26\uff55\uff4c\uff4c',     '',     'full'),
+    (u'Caf\u00e9 #1',             '#',    'cafe#1'),
+    (u'Caf\u00e9 #1',             u'\u00e9', u'caf\u00e91'),
+    (u'\u0414\u0430 a\ufffd',      '',     'a'),
+    ('(Aa_Bb_Cc)',               '_',    'aa_bb_cc'),
+    (42,                         '',     '42'),
+])
+def test_fingerprint_transliterate(input, special_characters, expected):
+    assert fingerprint(
+        input, special_characters, transliterate=True
+    ) == expected
+
+    # ASCII values are fingerprinted the same either way
+    if _encodes_as_ascii(str(input)):
+        assert fingerprint(input, special_characters) == expected
+
+
+@pytest.mark.parametrize("input, expected", [
+    ('', True),
+    ('plain ASCII \x7f', True),
+    (u'Caf\u00e9', False),
+    (u'\ufffd', False),
+])
+def test_encodes_as_ascii(input, expected):
+    # The fallback for str.isascii() on Python 3.6 and older
+    assert _encodes_as_ascii(input) == expected
+
+
 @pytest.mark.parametrize("input, expected", [
     (None,                      None),
     ('',                        None),
@@ -62,6 +100,61 @@ def test_clean_null_w_falsey_is_null(input, expected):
     assert clean_null(input, falsey_is_null=True) == expected
 
 
+@pytest.mark.parametrize("input, expected", [
+    (None,                      'missing'),
+    (float('nan'),              'missing'),
+    ('',                        ''),
+    ('N/A',                     'na'),
+    ('A',                       None),
+    ('(>',                      ''),
+    (0,                         '0'),
+    (0.0,                       'falsey'),
+    ('False',                   'false'),
+    ([],                        'container'),
+    ([None],                    'container'),
+    ('{None,None}',             'container'),
+    ([False],                   'falsey'),
+    ('{0.0}',                   'falsey'),
+    ((None, 'value'),           None)
+])
+def test_classify_null(input, expected):
+    assert classify_null(input) == expected
+
+
+@pytest.mark.parametrize("input", [
+    None, '', 'None', 'A', '(>', 0, 'False', [], [None], '[None,None]',
+    {'empty'}, (None, 'value'), '{"real_python_literal"}', '[None,0]',
+    '[None,{"Null",("","")}]', [False], '{0.0}', 'unknown', '0', 1.5
+])
+def test_classify_null_matches_clean_null(input):
+    null_class = classify_null(input)
+
+    assert (clean_null(input) is None) == (
+        null_class in ['missing', 'container'] + NULL_INDICATORS
+    )
+    assert (clean_null(input, falsey_is_null=True) is None) == (
+        null_class is not None
+    )
+    if null_class in FALSEY_INDICATORS:
+        assert null_class == fingerprint(input)
+
+
+@pytest.mark.parametrize("input, special_characters", [
+    ('', ''),
+    ('Hello World', ''),
+    ('E-mail', '-'),
+    ('Ünknown', ''),
+    (None, ''),
+    (12.5, '.')
+])
+def test_fingerprint_hash(input, special_characters):
+    expected = int(_kernel.fnv1a_hashes(
+        [fingerprint(input, special_characters)]
+    )[0])
+
+    assert fingerprint_hash(input, special_characters) == expected
+
+
 @pytest.mark.parametrize("input, expected", [
     (''' 123   abc 456
             def\t\t 789\t''',   '123 abc 456 def 789'),
@@ -0,0 +1,311 @@
+import csv
+import functools
+import io
+import sqlite3
+import threading
+import time
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from etl_toolbox.database_functions import BulkWriter, ConnectionPool
+from etl_toolbox.database_functions import write_frame, write_frames
+
+
+def sqlite_pool(tmp_path, max_size=4):
+    return ConnectionPool(
+        functools.partial(
+            sqlite3.connect, str(tmp_path / 'test.db'),
+            check_same_thread=False, timeout=30
+        ),
+        max_size=max_size
+    )
+
+
+def mixed_frame():
+    return pd.DataFrame({
+        'text': ['a', '', None, 'q"uote'],
+        'int': [1, 2, 3, 4],
+        'float': [1.5, np.nan, -0.0, 1e20],
+        'bool': [True, False, True, False],
+        'date': pd.to_datetime(['2020-01-02', None, '2021-03-04 05:06', None]),
+        'nullable': pd.array([1, None, 3, None], dtype='Int64'),
+        'object': [['x'], {'y'}, np.int64(7), np.nan],
+    }, index=[10, 11, 12, 13])
+
+
+@pytest.mark.parametrize('chunksize', [1, 3, 10000])
+def test_write_frame_sqlite(chunksize):
+    connection = sqlite3.connect(':memory:')
+    df = mixed_frame()
+
+    assert write_frame(df, 'my "table"', connection, chunksize=chunksize) == 4
+    assert write_frame(df, 'my "table"', connection, chunksize=chunksize) == 4
+
+    rows = connection.execute('SELECT * FROM "my ""table"""').fetchall()
+    assert rows == [
+        ('a', 1, 1.5, 1, '2020-01-02 00:00:00', 1, "['x']"),
+        ('', 2, None, 0, None, None, "{'y'}"),
+        (None, 3, -0.0, 1, '2021-03-04 05:06:00', 3, '7'),
+        ('q"uote', 4, 1e20, 0, None, None, None),
+    ] * 2
+
+    types = [row[2] for row in connection.execute(
+        'PRAGMA table_info("my ""table""")'
+    )]
+    assert types == ['TEXT', 'INTEGER', 'REAL', 'INTEGER', 'TEXT', 'INTEGER',
+                     'TEXT']
+
+
+def test_write_frame_rollback():
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE t (a TEXT NOT NULL)')
+
+    df = pd.DataFrame({'a': ['x'] * 10 + [None]})
+    with pytest.raises(sqlite3.IntegrityError):
+        write_frame(df, 't', connection, chunksize=4)
+
+    # Nothing from the failed frame was committed
+    assert connection.execute('SELECT COUNT(*) FROM t').fetchone() == (0,)
+
+    with pytest.raises(ValueError):
+        write_frame(pd.DataFrame([[1, 2]], columns=['a', 'a']), 't',
+                    connection)
+
+    with pytest.raises(ValueError):
+        write_frame(df, 't', object())
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql):
+        self.connection.statements.append(sql)
+
+    def close(self):
+        pass
+
+
+class Psycopg2Cursor(FakeCursor):
+    def copy_expert(self, sql, f):
+        self.connection.statements.append(sql)
+        self.connection.data.append(f.read())
+
+
+class Psycopg2Connection:
+    cursor_class = Psycopg2Cursor
+
+    def __init__(self):
+        self.statements = []
+        self.data = []
+        self.commits = 0
+
+    def cursor(self):
+        return self.cursor_class(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+Psycopg2Connection.__module__ = 'psycopg2.extensions'
+
+
+class PsycopgCopy:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def write(self, data):
+        self.connection.data.append(data)
+
+
+class PsycopgCursor(FakeCursor):
+    def copy(self, sql):
+        self.connection.statements.append(sql)
+        return PsycopgCopy(self.connection)
+
+
+class PsycopgConnection(Psycopg2Connection):
+    cursor_class = PsycopgCursor
+
+
+PsycopgConnection.__module__ = 'psycopg'
+
+
+@pytest.mark.parametrize('connection_class', [
+    Psycopg2Connection, PsycopgConnection
+])
+def test_write_frame_postgres(connection_class):
+    connection = connection_class()
+    df = mixed_frame()
+
+    assert write_frame(df, 'customers', connection, chunksize=3) == 4
+
+    create, copy_1, copy_2 = connection.statements
+    assert create == (
+        'CREATE TABLE IF NOT EXISTS "customers" ("text" TEXT, "int" BIGINT, '
+        '"float" DOUBLE PRECISION, "bool" BOOLEAN, "date" TIMESTAMP, '
+        '"nullable" BIGINT, "object" TEXT)'
+    )
+    assert copy_1 == copy_2 == (
+        'COPY "customers" ("text", "int", "float", "bool", "date", '
+        '"nullable", "object") FROM STDIN WITH (FORMAT csv)'
+    )
+    assert connection.commits == 1
+
+    data = ''.join(connection.data)
+    assert data.splitlines()[:3] == [
+        '"a",1,1.5,True,"2020-01-02 00:00:00",1,"[\'x\']"',
+        # Empty strings are quoted, and nulls are empty
+        '"",2,,False,,,"{\'y\'}"',
+        ',3,-0.0,True,"2021-03-04 05:06:00",3,7',
+    ]
+
+    rows = list(csv.reader(io.StringIO(data)))
+    assert rows[3] == ['q"uote', '4', '1e+20', 'False', '', '', '']
+
+
+def test_copy_csv_column_kinds():
+    from etl_toolbox.database_functions import _copy_csv
+
+    df = pd.DataFrame({
+        'strings': ['a,b', 'line\nbreak', None, ''],
+        'bytes': [b'\x00\xff', None, b'', b'"'],
+        'float32': np.array([0.1, np.nan, 2.5, -1], dtype=np.float32),
+        'uint64': np.array([2**64 - 1, 0, 1, 2], dtype=np.uint64),
+        'ints': [1, None, 3, 4],
+        'mixed_numbers': [1, 2.5, True, None],
+        'categories': pd.Categorical(['x', None, 'y', 'x']),
+    })
+
+    assert _copy_csv(df) == (
+        '"a,b","\\x00ff",0.10000000149011612,18446744073709551615,1.0,1,'
+        '"x"\n'
+        '"line\nbreak",,,0,,2.5,\n'
+        ',"\\x",2.5,1,3.0,True,"y"\n'
+        '"","\\x22",-1.0,2,4.0,,"x"\n'
+    )
+    assert _copy_csv(df.iloc[:0]) == ''
+
+    # The CSV is read back as the same values
+    rows = list(csv.reader(io.StringIO(_copy_csv(df))))
+    assert [row[0] for row in rows] == ['a,b', 'line\nbreak', '', '']
+
+
+def test_connection_pool(tmp_path):
+    opened = []
+    active = []
+    max_active = [0]
+    lock = threading.Lock()
+
+    def connect():
+        connection = sqlite3.connect(
+            str(tmp_path / 'pool.db'), check_same_thread=False
+        )
+        opened.append(connection)
+        return connection
+
+    pool = ConnectionPool(connect, max_size=3)
+
+    def use(i):
+        with pool.connection() as connection:
+            with lock:
+                active.append(connection)
+                max_active[0] = max(max_active[0], len(set(active)))
+            time.sleep(0.01)
+            with lock:
+                active.remove(connection)
+
+    threads = [threading.Thread(target=use, args=(i,)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(opened) <= 3
+    assert max_active[0] <= 3
+
+    # A connection that raised an error is rolled back and reused
+    with pytest.raises(ZeroDivisionError):
+        with pool.connection() as connection:
+            connection.execute('CREATE TABLE t (a)')
+            connection.execute('INSERT INTO t VALUES (1)')
+            1 / 0
+    with pool.connection() as connection:
+        assert connection.execute('SELECT COUNT(*) FROM t').fetchone() == (0,)
+    assert len(opened) <= 3
+
+    pool.close()
+    with pytest.raises(ValueError):
+        with pool.connection():
+            pass
+    for connection in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute('SELECT 1')
+
+
+def test_write_frames(tmp_path):
+    pool = sqlite_pool(tmp_path)
+
+    def frames():
+        for i in range(30):
+            table = 'table_{}'.format(i % 3)
+            yield table, pd.DataFrame({'id': range(i * 10, i * 10 + 10)})
+
+    row_counts = write_frames(frames(), pool)
+    assert row_counts == {'table_0': 100, 'table_1': 100, 'table_2': 100}
+
+    with pool.connection() as connection:
+        for j in range(3):
+            ids = [row[0] for row in connection.execute(
+                'SELECT id FROM table_{} ORDER BY rowid'.format(j)
+            )]
+            # Frames for a table are written in order
+            assert ids == [
+                x for i in range(j, 30, 3) for x in range(i * 10, i * 10 + 10)
+            ]
+
+    pool.close()
+
+
+def test_write_frames_single_connection():
+    connection = sqlite3.connect(':memory:', check_same_thread=False)
+    frames = [('a', pd.DataFrame({'x': [1]})), ('b', pd.DataFrame({'y': [2]}))]
+
+    assert write_frames(frames, connection) == {'a': 1, 'b': 1}
+    assert connection.execute('SELECT * FROM b').fetchall() == [(2,)]
+
+
+def test_bulk_writer_error(tmp_path):
+    pool = sqlite_pool(tmp_path, max_size=2)
+    with pool.connection() as connection:
+        connection.execute('CREATE TABLE strict (a TEXT NOT NULL)')
+
+    with pytest.raises(sqlite3.IntegrityError):
+        with BulkWriter(pool) as writer:
+            writer.write('fine', pd.DataFrame({'a': ['x']}))
+            writer.write('strict', pd.DataFrame({'a': [None]}))
+
+    with pytest.raises(sqlite3.IntegrityError):
+        with BulkWriter(pool, max_workers=1) as writer:
+            writer.write('strict', pd.DataFrame({'a': [None]}))
+            time.sleep(0.1)
+            for _ in range(10):
+                writer.write('strict', pd.DataFrame({'a': ['x']}))
+
+    with pool.connection() as connection:
+        assert connection.execute(
+            'SELECT COUNT(*) FROM strict'
+        ).fetchone() == (0,)
+
+    pool.close()
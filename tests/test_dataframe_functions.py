@@ -1,11 +1,26 @@
+import os
+import sys
+import tracemalloc
+
 import pytest
 import pandas as pd
 import numpy as np
 
+from etl_toolbox.cleaning_functions import clean_null, fingerprint
+from etl_toolbox.dataframe_functions import coerce_column_types
 from etl_toolbox.dataframe_functions import dataframe_clean_null
 from etl_toolbox.dataframe_functions import find_column_labels
+from etl_toolbox.dataframe_functions import find_duplicate_clusters
 from etl_toolbox.dataframe_functions import index_is_default
+from etl_toolbox.dataframe_functions import infer_column_type
+from etl_toolbox.dataframe_functions import load_cleaning_mask
 from etl_toolbox.dataframe_functions import merge_columns_by_label
+from etl_toolbox.dataframe_functions import profile_nulls
+from etl_toolbox.dataframe_functions import save_cleaning_mask
+from etl_toolbox.dataframe_functions import unpack_cleaning_mask
+from etl_toolbox.dataframe_functions import _null_mask
+from etl_toolbox.dataframe_functions import _sparse_column
+from etl_toolbox.mapping_functions import hash_fingerprints
 
 
 @pytest.mark.parametrize('df, label_fingerprints, expected', [
@@ -111,6 +126,26 @@ def test_find_column_labels(df, label_fingerprints, expected):
     assert df.index.equals(expected.index)
 
 
+def test_find_column_labels_w_hashed_fingerprints():
+    df = pd.DataFrame([
+        ['', 'created by: ', None],
+        ['EML-addr', 'Dte', 'col3'],
+        ['test@test.com', '04mar14', 12045],
+        ['EML-addr', 'Dte', 'col3']
+        ])
+    label_fingerprints = {'emladdr', 'dte', 'phnnmbr'}
+
+    expected = find_column_labels(
+        df, label_fingerprints, label_match_thresh=2, return_new=True
+    )
+    find_column_labels(
+        df, hash_fingerprints(label_fingerprints), label_match_thresh=2
+    )
+
+    assert df.equals(expected)
+    assert df.columns.equals(expected.columns)
+
+
 @pytest.mark.parametrize('df, label_fingerprints, label_match_thresh, exception_type', [
     ### Test 1 - test that IndexError is raised if label row isn't found
     (
@@ -496,3 +531,641 @@ def test_dataframe_clean_null_w_cleaning_params(df, special_characters, falsey_i
     assert df.equals(expected)
     assert df.columns.equals(expected.columns)
     assert df.index.equals(expected.index)
+
+
+@pytest.mark.parametrize('df, blocking_keys, window, expected', [
+    ### Test 1 - single pass, null-indicating keys are not clustered
+    (
+        # df
+        pd.DataFrame([
+            ['Jane Doe', 'jane@aaa.com'],
+            ['JANE DOE', 'Jane@AAA.com'],
+            ['none', None],
+            ['unknown', 'N/A'],
+            ['John Roe', 'john@baa.com']
+            ],
+            columns=['name', 'email']
+            ),
+        # blocking_keys
+        ['name', 'email'],
+        # window
+        1,
+        # expected
+        [0, 0, 1, 2, 3]
+        ),
+    ### Test 2 - multiple passes are transitive
+    (
+        # df
+        pd.DataFrame([
+            ['Jane Doe', 'jane@aaa.com', '111-111-1111'],
+            ['J. Doe', 'jane@aaa.com', None],
+            ['Jane', None, '(111) 111-1111'],
+            ['John Roe', 'john@baa.com', '222-222-2222'],
+            ['Jane Doe', 'jdoe@caa.com', None]
+            ],
+            index=['a', 'b', 'c', 'd', 'e'],
+            columns=['name', 'email', 'phone']
+            ),
+        # blocking_keys
+        [['email'], ['phone'], ['name']],
+        # window
+        1,
+        # expected
+        [0, 0, 0, 1, 0]
+        ),
+    ### Test 3 - sorted-neighborhood window
+    (
+        # df
+        pd.DataFrame([
+            ['Jonathan Smith', '1 Main St'],
+            ['Alice Jones', '9 Elm St'],
+            ['Jonathon Smith', '1 Main St.'],
+            ['Jonathan Smithers', '77 Oak Ave']
+            ],
+            columns=['name', 'address']
+            ),
+        # blocking_keys
+        ['name', 'address'],
+        # window
+        3,
+        # expected
+        [0, 1, 0, 2]
+        )
+])
+def test_find_duplicate_clusters(df, blocking_keys, window, expected):
+    clusters = find_duplicate_clusters(
+        df, blocking_keys, window=window, chunksize=2
+    )
+
+    assert clusters.tolist() == expected
+    assert clusters.index.equals(df.index)
+
+
+def test_find_duplicate_clusters_hashed_keys():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame({
+        'name': rng.choice(['Jane Doe', 'JANE-DOE', 'John', 'n/a', None], 200),
+        'zip': rng.choice([12345, '12345', 'none', 99501.0, ''], 200)
+    })
+
+    # The hashed blocking keys should group rows exactly like the
+    # fingerprinted key strings would
+    keys = df.applymap(
+        lambda x: '' if clean_null(str(x)) is None else fingerprint(x)
+    ).agg('|'.join, axis=1).to_numpy()
+    populated = keys != '|'
+
+    clusters = find_duplicate_clusters(
+        df, ['name', 'zip'], chunksize=64
+    ).to_numpy()
+
+    same_key = (keys[:, None] == keys[None, :]) & populated[:, None]
+    same_cluster = clusters[:, None] == clusters[None, :]
+    assert (same_cluster == (same_key | np.eye(200, dtype=bool))).all()
+
+
+def test_find_duplicate_clusters_exceptions():
+    with pytest.raises(ValueError):
+        find_duplicate_clusters(pd.DataFrame([['a']]), [])
+
+
+def build_test_df(n=10000):
+    """
+    Returns a consolidated DataFrame with float and object columns, an empty
+    column, null-indicating values, and a label row at index 5.
+    """
+    rng = np.random.RandomState(0)
+
+    data = {}
+    for k in range(4):
+        data['f{}'.format(k)] = np.where(
+            rng.rand(n) < 0.3, np.nan, rng.rand(n)
+        )
+    for k in range(4):
+        data['s{}'.format(k)] = np.where(
+            rng.rand(n) < 0.3, 'null', 'value {}'.format(k)
+        ).astype(object)
+    data['empty'] = np.full(n, 'none', dtype=object)
+
+    df = pd.DataFrame(data)
+    df.iloc[::7, :] = 'n/a'
+    df.iloc[5, :] = list(data)
+
+    return df.copy()
+
+
+def peak_memory(func, df_columns=None, **kwargs):
+    """
+    Returns the peak memory allocated while ``func`` runs on a DataFrame from
+    build_test_df() as a ratio of the size of the DataFrame's values, along
+    with the return value of ``func``.
+
+    The DataFrame is copied after tracing starts so that memory freed by
+    in-place operations is counted. ``tracemalloc.reset_peak()`` needs
+    Python 3.9, so the peak is read from the start of tracing, which only
+    adds the small overhead of the copy.
+    """
+    df = build_test_df()
+    if df_columns is not None:
+        df.columns = df_columns
+    size = df.memory_usage(index=False, deep=False).sum()
+
+    tracemalloc.start()
+
+    df = df.copy()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    result = func(df, **kwargs)
+
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    return peak / size, result
+
+
+# Strings that are cleaned to NaN were created before tracing started, so
+# freeing them doesn't lower the measured peak
+@pytest.mark.parametrize('return_new, bound', [
+    (False, 1.4),
+    (True, 2.25)
+])
+def test_dataframe_clean_null_memory(return_new, bound):
+    peak, _ = peak_memory(dataframe_clean_null, return_new=return_new)
+
+    assert peak < bound
+
+
+@pytest.mark.parametrize('return_new, bound', [
+    (False, 1.1),
+    (True, 1.1)
+])
+def test_find_column_labels_memory(return_new, bound):
+    peak, _ = peak_memory(
+        find_column_labels,
+        label_fingerprints={'f0', 'f1', 'f2'},
+        return_new=return_new,
+    )
+
+    assert peak < bound
+
+
+def test_merge_columns_by_label_memory():
+    columns = ['a', 'a', 'b', 'b', 'c', 'c', 'd', 'd', 'e']
+    peak, df = peak_memory(
+        merge_columns_by_label, df_columns=columns, return_new=True
+    )
+
+    # The bound is the size of the original plus the size of the result,
+    # including the merged lists
+    size = build_test_df().memory_usage(index=False, deep=False).sum()
+    result_size = df.memory_usage(index=False, deep=False).sum() + sum(
+        sys.getsizeof(x) for label in 'abcd' for x in df[label]
+    )
+
+    assert peak < 1.1 + result_size / size
+
+
+@pytest.mark.parametrize('func, kwargs', [
+    (dataframe_clean_null, {}),
+    (dataframe_clean_null, {'empty_row_thresh': 3, 'empty_column_thresh': 2}),
+    (find_column_labels, {'label_fingerprints': {'f0', 's0', 'empty'}}),
+    (merge_columns_by_label, {'deduplicate_values': True})
+])
+def test_return_new(func, kwargs):
+    df = build_test_df(n=50)
+    df.index = ['i{}'.format(i % 10) for i in range(df.shape[0])]
+    df.columns = ['f0', 'f1', 'f1', 'f3', 's0', 's0', 's2', 'f1', 'empty']
+
+    original = df.copy()
+    expected = df.copy()
+    func(expected, **kwargs)
+
+    result = func(df, return_new=True, **kwargs)
+
+    assert df.equals(original)
+    assert df.columns.equals(original.columns)
+    assert result.equals(expected)
+    assert result.columns.equals(expected.columns)
+    assert result.index.equals(expected.index)
+
+
+@pytest.mark.parametrize('column', [
+    pd.Series([0.0, 1.5, np.nan, -0.0, np.inf]),
+    pd.Series([0, 1, -1, 2], dtype='int64'),
+    pd.Series([0, 1, None, 3], dtype='Int64'),
+    pd.Series([True, False, True]),
+    pd.Series(pd.to_datetime(['1970-01-01', None, '2020-06-07'])),
+    pd.Series(pd.to_datetime(['1970-01-01', None]).tz_localize('UTC')),
+    pd.Series(pd.to_timedelta([0, 1, None], unit='s')),
+    pd.Series(['a', 'null', 'false', None, 'a', '0'], dtype='category'),
+    pd.Series(['a', 'null', 'false', None, '[]', 0], dtype='object')
+])
+@pytest.mark.parametrize('falsey_is_null', [False, True])
+def test_dataframe_clean_null_dtypes(column, falsey_is_null):
+    df = pd.DataFrame({'column': column})
+
+    expected_null = [
+        pd.isnull(x) or clean_null(x, falsey_is_null=falsey_is_null) is None
+        for x in column
+    ]
+
+    dataframe_clean_null(
+        df,
+        empty_row_thresh=0,
+        empty_column_thresh=0,
+        falsey_is_null=falsey_is_null
+    )
+
+    assert df['column'].isna().tolist() == expected_null
+
+
+@pytest.mark.parametrize('return_new', [False, True])
+@pytest.mark.parametrize('falsey_is_null', [False, True])
+def test_dataframe_clean_null_sparse(return_new, falsey_is_null):
+    n = 200
+    df = pd.DataFrame({
+        'id': np.arange(n),
+        'fax': ['n/a'] * (n - 3) + ['555-1111', '-', '555-2222'],
+        'zeros': [0] * (n - 1) + [7],
+        'flag': [False] * (n - 2) + [True, True],
+        'note': ['x', 'y'] * (n // 2),
+        'date': pd.to_datetime([None] * (n - 1) + ['2020-01-01']),
+        'empty': ['null'] * n,
+    })
+    # Duplicate labels are converted separately
+    df.columns = ['id', 'fax', 'zeros', 'flag', 'fax', 'date', 'empty']
+    original = df.copy()
+
+    expected = dataframe_clean_null(
+        df, falsey_is_null=falsey_is_null, return_new=True
+    )
+    result = dataframe_clean_null(
+        df, falsey_is_null=falsey_is_null, return_new=return_new,
+        sparse_thresh=0.9
+    )
+    if return_new:
+        assert df.equals(original)
+        assert 'sparse_bytes_saved' not in df.attrs
+    else:
+        result = df
+
+    sparse = [
+        isinstance(dtype, pd.SparseDtype) for dtype in result.dtypes
+    ]
+    expected_sparse = [False, True, falsey_is_null, falsey_is_null, False,
+                       False]
+    assert sparse == expected_sparse
+
+    assert result.columns.equals(expected.columns)
+    assert result.index.equals(expected.index)
+    for j in range(result.shape[1]):
+        column = result.iloc[:, j]
+        if sparse[j]:
+            column = column.sparse.to_dense()
+        assert column.isna().tolist() == expected.iloc[:, j].isna().tolist()
+        assert column.dropna().tolist() == expected.iloc[:, j].dropna().tolist()
+
+    saved = sum(
+        expected.iloc[:, j].memory_usage(index=False)
+        - result.iloc[:, j].array.nbytes
+        for j in range(result.shape[1]) if sparse[j]
+    )
+    assert result.attrs['sparse_bytes_saved'] == saved > 0
+
+
+@pytest.mark.parametrize('values', [
+    np.arange(100000),
+    np.arange(100000).astype(object),
+])
+def test_sparse_column_memory(values):
+    column = pd.Series(values)
+    null_mask = np.ones(len(column), dtype=bool)
+    null_mask[::100] = False
+
+    tracemalloc.start()
+    result = _sparse_column(column, null_mask)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert result.sp_index.indices.tolist() == list(range(0, 100000, 100))
+    assert result.to_dense()[::100].tolist() == values[::100].tolist()
+    assert np.isnan(result.to_dense()[1])
+
+    # Only the kept values are copied, not the whole column
+    assert peak < 0.5 * len(column) * 8
+
+
+def mask_test_frame():
+    df = pd.DataFrame({
+        'id': ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i'],
+        'email': ['n/a', 'x@x.com', None, '-', 'y@y.com', '', 'null', 'z',
+                  np.nan],
+        'count': [0, 1, 2, np.nan, 0, 5, 6, 7, 8],
+        'empty': ['null', None, '--', 'none', '', 'n/a', '[]', '-', 'nan'],
+    }, index=[10, 11, 12, 13, 14, 15, 16, 17, 18])
+    df.columns = ['id', 'email', 'count', 'id']
+    df.iloc[4, :] = [None, 'none', np.nan, 'null']
+    return df
+
+
+@pytest.mark.parametrize('return_new', [False, True])
+@pytest.mark.parametrize('falsey_is_null', [False, True])
+def test_dataframe_clean_null_return_mask(return_new, falsey_is_null):
+    df = mask_test_frame()
+    original = df.copy()
+
+    dry_run_mask = dataframe_clean_null(
+        df, falsey_is_null=falsey_is_null, dry_run=True, return_new=return_new
+    )
+    assert df.equals(original)
+
+    result = dataframe_clean_null(
+        df, falsey_is_null=falsey_is_null, return_new=return_new,
+        return_mask=True
+    )
+    if return_new:
+        cleaned, mask = result
+        assert df.equals(original)
+    else:
+        cleaned, mask = df, result
+
+    expected_null = original.applymap(
+        lambda x: clean_null(x, falsey_is_null=falsey_is_null) is None
+    ).to_numpy()
+    expected = expected_null & original.notna().to_numpy()
+
+    for m in (mask, dry_run_mask):
+        assert m.shape == original.shape
+        assert m.bits.dtype == np.uint8
+        assert m.bits.shape == (4, 2)
+        assert np.array_equal(unpack_cleaning_mask(m), expected)
+
+    assert mask.dropped_rows.tolist() == [14]
+    assert mask.dropped_columns.equals(pd.Index(['id']))
+    # Only the second 'id' column is removed
+    assert mask.dropped_row_positions.tolist() == [4]
+    assert mask.dropped_column_positions.tolist() == [3]
+    assert cleaned.index.equals(
+        original.index.drop(mask.dropped_rows)
+    )
+    assert cleaned.shape == (8, 3)
+
+
+def test_save_cleaning_mask(tmp_path):
+    df = mask_test_frame()
+    mask = dataframe_clean_null(df, dry_run=True)
+
+    path = str(tmp_path / 'mask.npz')
+    save_cleaning_mask(mask, path)
+    loaded = load_cleaning_mask(path)
+
+    assert np.array_equal(loaded.bits, mask.bits)
+    assert loaded.shape == mask.shape
+    assert loaded.dropped_rows.tolist() == mask.dropped_rows.tolist()
+    assert loaded.dropped_columns.tolist() == mask.dropped_columns.tolist()
+    assert np.array_equal(
+        loaded.dropped_row_positions, mask.dropped_row_positions
+    )
+    assert np.array_equal(
+        loaded.dropped_column_positions, mask.dropped_column_positions
+    )
+    assert np.array_equal(
+        unpack_cleaning_mask(loaded), unpack_cleaning_mask(mask)
+    )
+
+    # One bit per cell, compressed
+    big = pd.DataFrame({'a': ['n/a', 'x'] * 50000, 'b': ['y'] * 100000})
+    path = str(tmp_path / 'big.npz')
+    save_cleaning_mask(dataframe_clean_null(big, dry_run=True), path)
+    assert os.path.getsize(path) < 100000 / 8
+
+
+def test_cleaning_mask_duplicate_labels(tmp_path):
+    df = pd.DataFrame(
+        [['x', None, 'y'], [None, 'n/a', None], ['z', None, 'w']],
+        index=['r', 'r', 's'],
+        columns=['a', 'a', 'b'],
+    )
+    mask = dataframe_clean_null(df, dry_run=True)
+
+    # The labels of the removed rows and columns are ambiguous, but their
+    # positions aren't
+    assert mask.dropped_rows.tolist() == ['r']
+    assert mask.dropped_columns.tolist() == ['a']
+    assert mask.dropped_row_positions.tolist() == [1]
+    assert mask.dropped_column_positions.tolist() == [1]
+
+    path = str(tmp_path / 'mask.npz')
+    save_cleaning_mask(mask, path)
+    loaded = load_cleaning_mask(path)
+    assert loaded.dropped_row_positions.tolist() == [1]
+    assert loaded.dropped_column_positions.tolist() == [1]
+
+    cleaned = dataframe_clean_null(df, return_new=True)
+    assert cleaned.equals(df.iloc[[0, 2], [0, 2]])
+
+
+def test_cleaning_mask_empty():
+    mask = dataframe_clean_null(pd.DataFrame(), dry_run=True)
+    assert unpack_cleaning_mask(mask).shape == (0, 0)
+
+    mask = dataframe_clean_null(pd.DataFrame({'a': []}), return_mask=True)
+    assert unpack_cleaning_mask(mask).shape == (0, 1)
+    assert mask.dropped_columns.tolist() == ['a']
+    assert mask.dropped_column_positions.tolist() == [0]
+
+
+@pytest.mark.parametrize('falsey_is_null', [False, True])
+def test_profile_nulls(falsey_is_null):
+    df = pd.DataFrame({
+        'float': [0.0, 1.5, np.nan, -0.0, np.inf],
+        'int': pd.Series([0, 1, -1, 2, 0], dtype='int64'),
+        'nullable': pd.Series([0, 1, None, 3, 0], dtype='Int64'),
+        'bool': [True, False, True, False, False],
+        'date': pd.to_datetime(['1970-01-01', None, '2020-06-07', None, None]),
+        'delta': pd.to_timedelta([0, 1, None, 0, 2], unit='s'),
+        'category': pd.Series(
+            ['a', 'null', 'false', None, '0'], dtype='category'
+        ),
+        'object': ['a', 'null', '[]', [None], 0],
+        'dup': ['n/a', 'x', 'FALSE', None, ''],
+    })
+    # Duplicate labels are profiled separately
+    df.columns = list(df.columns[:-1]) + ['object']
+
+    profile = profile_nulls(df, falsey_is_null=falsey_is_null)
+
+    populated = ~_null_mask(df, falsey_is_null=falsey_is_null)
+
+    assert profile.columns.index.equals(df.columns)
+    assert profile.columns['populated'].tolist() == populated.sum(axis=0).tolist()
+    null_classes = profile.columns.loc[
+        :, :'falsey' if falsey_is_null else 'container'
+    ]
+    assert null_classes.sum(axis=1).tolist() == (~populated).sum(axis=0).tolist()
+    assert profile.rows.tolist() == np.bincount(
+        populated.sum(axis=1), minlength=df.shape[1] + 1
+    ).tolist()
+
+    # Falsey classes are counted whether or not they are null-indicating
+    assert profile.columns.loc['bool', 'false'] == 3
+    assert profile.columns.loc['int', '0'] == 2
+    assert profile.columns.loc['float', 'falsey'] == 2
+    assert profile.columns.loc['float', 'missing'] == 1
+    assert profile.columns['container'].tolist()[-2] == 1
+
+
+@pytest.mark.parametrize('file_path', [
+    'test_data/bad-data.csv',
+    'test_data/random_pii_2.csv'
+])
+def test_profile_nulls_file(file_path):
+    label_fingerprints = {'cust', 'emladdr', 'firstname', 'lastname'}
+
+    df = pd.read_csv(file_path, header=None, dtype=str, keep_default_na=False)
+    find_column_labels(df, label_fingerprints, label_match_thresh=2)
+
+    result = profile_nulls(
+        file_path, label_fingerprints=label_fingerprints, label_match_thresh=2
+    )
+    expected = profile_nulls(df)
+
+    assert result.columns.equals(expected.columns)
+    assert result.rows.equals(expected.rows)
+
+
+@pytest.mark.parametrize('values, expected', [
+    (['1', ' 2', None, '30'], 'integer'),
+    ([1, 2.0, np.nan], 'integer'),
+    (np.array([1.0, np.nan, 3.0]), 'integer'),
+    (np.array([1.5, np.nan]), 'float'),
+    (['1.5', '2', '-3e2'], 'float'),
+    ([True, False, None], 'boolean'),
+    (['Yes', 'no', 'T', 'false'], 'boolean'),
+    (['2020-06-07', '07jun2020', '2020-06-07 10:00'], 'datetime'),
+    (['red', 'blue', 'red', 'red'], 'category'),
+    (['a', 'b', 'c', 'd'], 'string'),
+    (['01234', '00501', '12345', '0'], 'string'),
+    ([None, np.nan], None),
+    (pd.to_timedelta([1, 2], unit='s'), None),
+    (np.arange(3, dtype=np.uint16), 'integer'),
+    (pd.Categorical(['a', 'b']), 'category'),
+])
+def test_infer_column_type(values, expected):
+    assert infer_column_type(pd.Series(values)) == expected
+
+
+def test_infer_column_type_thresholds():
+    column = pd.Series(['1', '2', '3', 'x'] * 25)
+
+    assert infer_column_type(column) == 'category'
+    assert infer_column_type(column, type_match_thresh=0.75) == 'integer'
+    assert infer_column_type(column, category_thresh=0.01) == 'string'
+
+
+def test_coerce_column_types():
+    df = pd.DataFrame(
+        [
+            ['1', '1.5', 'yes', '2020-06-07', 'red', 'a', 'x'],
+            ['300', 'n/a', 'no', 'June 8 2020', 'red', 'b', '1'],
+            [None, '2', 'maybe', None, 'blue', 'c', 'x'],
+            ['40000', '4.25', 'Y', '2020-06-09', 'red', 'd', 'x'],
+        ],
+        index=[10, 11, 12, 13],
+        columns=['id', 'score', 'flag', 'date', 'color', 'name', 'id'],
+    )
+    original = df.copy()
+
+    new_df, failures = coerce_column_types(
+        df,
+        column_types={'flag': 'boolean', 'score': 'float', 'name': None},
+        return_new=True,
+    )
+
+    assert df.equals(original)
+    assert new_df.columns.equals(df.columns)
+    assert new_df.index.equals(df.index)
+
+    assert new_df.iloc[:, 0].dtype == 'Int32'
+    assert new_df.iloc[:, 0].tolist() == [1, 300, pd.NA, 40000]
+    assert new_df['score'].dtype == np.float64
+    assert new_df['flag'].dtype == 'boolean'
+    assert new_df['date'].dtype == 'datetime64[ns]'
+    assert new_df['color'].dtype == 'category'
+    assert new_df['name'].dtype == object
+    # Duplicate labels are converted separately
+    assert new_df.iloc[:, 6].dtype == 'category'
+
+    assert sorted(failures) == [1, 2]
+    assert failures[1].to_dict() == {11: 'n/a'}
+    assert failures[1].name == 'score'
+    assert failures[2].to_dict() == {12: 'maybe'}
+
+    failures = coerce_column_types(df, column_types={'flag': 'boolean'})
+    assert list(failures) == [2]
+    assert df.iloc[:, 0].dtype == 'Int32'
+
+
+def test_coerce_column_types_exact_integers():
+    df = pd.DataFrame({
+        'big': ['9007199254740993', None, '-9007199254740993'],
+        'huge': ['99999999999999999999', '1', '2'],
+        'zip': ['01234', '00501', '12345'],
+        'rounded': ['9007199254740993.0', '2.0', '1e3'],
+    })
+
+    failures = coerce_column_types(
+        df, column_types={'zip': 'integer', 'rounded': 'integer'}
+    )
+
+    # Integer strings don't go through float64
+    assert df['big'].dtype == 'Int64'
+    assert df['big'].tolist() == [
+        9007199254740993, pd.NA, -9007199254740993
+    ]
+    assert df['huge'].dtype == object
+    assert df['huge'].tolist() == [99999999999999999999, 1, 2]
+
+    # Leading zeros and inexact floats aren't converted, and are reported
+    assert df['zip'].tolist() == [pd.NA, pd.NA, 12345]
+    assert failures[2].to_dict() == {0: '01234', 1: '00501'}
+    assert df['rounded'].tolist() == [pd.NA, 2, 1000]
+    assert failures[3].to_dict() == {0: '9007199254740993.0'}
+    assert sorted(failures) == [2, 3]
+
+
+def test_coerce_column_types_duplicate_label_failures():
+    df = pd.DataFrame(
+        [['1', 'x'], ['y', '2']], columns=['id', 'id']
+    )
+
+    failures = coerce_column_types(df, column_types={'id': 'integer'})
+
+    # Each column with the label is reported separately
+    assert sorted(failures) == [0, 1]
+    assert failures[0].to_dict() == {1: 'y'}
+    assert failures[1].to_dict() == {0: 'x'}
+    assert failures[0].name == failures[1].name == 'id'
+
+
+def test_coerce_column_types_leading_zeros():
+    df = pd.DataFrame({'zip': ['01234', '00501', '12345', '00501']})
+
+    assert coerce_column_types(df) == {}
+    assert df['zip'].tolist() == ['01234', '00501', '12345', '00501']
+
+
+def test_coerce_column_types_memory():
+    df = pd.read_csv(
+        'test_data/random_pii_5.csv', header=None, dtype=str,
+        keep_default_na=False
+    )
+    find_column_labels(df, {'id', 'firstname', 'email'})
+    dataframe_clean_null(df)
+
+    before = df.memory_usage(deep=True).sum()
+    assert coerce_column_types(df) == {}
+    after = df.memory_usage(deep=True).sum()
+
+    assert df['id'].dtype == np.int8
+    assert after < before / 2
@@ -1,7 +1,23 @@
+import bz2
+import gzip
+import io
+import lzma
 import os
+import random
+import tarfile
+import zipfile
+
 import pytest
+import pandas as pd
 
+from etl_toolbox.cleaning_functions import clean_null
+from etl_toolbox.dataframe_functions import find_column_labels
 from etl_toolbox.file_functions import get_file_list_from_dir
+from etl_toolbox.file_functions import iter_archive_members
+from etl_toolbox.file_functions import open_file
+from etl_toolbox.file_functions import shard_file_list
+from etl_toolbox.file_functions import scan_column_labels
+from etl_toolbox.file_functions import scan_null_ratios
 
 
 @pytest.mark.parametrize("dir, recursive, include_regex, expected", [
@@ -42,3 +58,314 @@ def test_get_file_list_from_dir(dir, recursive, include_regex, expected):
     assert sorted(
         get_file_list_from_dir(dir, recursive=recursive, include_regex=include_regex)
     ) == sorted(expected)
+
+
+LABEL_FINGERPRINTS = {'cust', 'emladdr', 'firstname', 'lastname', 'email'}
+
+
+@pytest.mark.parametrize('file_path', [
+    os.path.join('test_data', 'bad-data.csv'),
+    os.path.join('test_data', 'random_pii_2.csv'),
+    os.path.join('test_data', 'random_pii_5.csv'),
+    os.path.join('test_data', 'animals.tsv')
+])
+@pytest.mark.parametrize('falsey_is_null', [False, True])
+def test_scan_null_ratios(file_path, falsey_is_null):
+    sep = '\t' if file_path.endswith('.tsv') else ','
+    df = pd.read_csv(
+        file_path, sep=sep, header=None, dtype=str, keep_default_na=False
+    )
+
+    label_fingerprints = None
+    if not file_path.endswith('.tsv'):
+        label_fingerprints = LABEL_FINGERPRINTS
+        find_column_labels(df, LABEL_FINGERPRINTS, label_match_thresh=2)
+
+    expected = df.applymap(
+        lambda x: clean_null(x, falsey_is_null=falsey_is_null) is None
+    ).mean()
+
+    result = scan_null_ratios(
+        file_path,
+        label_fingerprints=label_fingerprints,
+        label_match_thresh=2,
+        falsey_is_null=falsey_is_null
+    )
+
+    assert list(result) == df.columns.tolist()
+    assert list(result.values()) == pytest.approx(expected.tolist())
+
+
+def test_scan_null_ratios_ragged(tmp_path):
+    file_path = str(tmp_path / 'ragged.csv')
+    with open(file_path, 'w', newline='') as f:
+        f.write(
+            'junk\n'
+            'a,b,a\n'
+            '"1\nnull",x\n'
+            '\n'
+            'none,y,z,w\n'
+        )
+
+    result = scan_null_ratios(file_path, {'a', 'b'}, label_match_thresh=2)
+
+    # The quoted line break doesn't start a new row, and the blank line is
+    # skipped
+    assert result == {'a_1': 0.5, 'b': 0.0, 'a_2': 0.5, 3: 0.5}
+
+    assert scan_column_labels(file_path, {'a', 'b'}, 2) == (1, ['a', 'b', 'a'])
+
+    with pytest.raises(IndexError):
+        scan_column_labels(file_path, {'c'}, 1)
+
+
+def test_scan_null_ratios_empty(tmp_path):
+    file_path = str(tmp_path / 'empty.csv')
+    open(file_path, 'w').close()
+
+    assert scan_null_ratios(file_path) == {}
+
+
+def make_drops(tmp_path):
+    """
+    Builds a directory of compressed files and archives from test_data.
+    """
+    with open('test_data/bad-data.csv', 'rb') as f:
+        csv_bytes = f.read()
+    with open('test_data/animals.tsv', 'rb') as f:
+        tsv_bytes = f.read()
+
+    drops = tmp_path / 'drops'
+    drops.mkdir()
+
+    (drops / 'plain.csv').write_bytes(csv_bytes)
+    (drops / 'a.csv.gz').write_bytes(gzip.compress(csv_bytes))
+    (drops / 'b.tsv.bz2').write_bytes(bz2.compress(tsv_bytes))
+    (drops / 'c.csv.xz').write_bytes(lzma.compress(csv_bytes))
+
+    with zipfile.ZipFile(str(drops / 'd.zip'), 'w',
+                         zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('d1.csv', csv_bytes)
+        archive.writestr('nested/', b'')
+        archive.writestr('nested/d2.tsv.gz', gzip.compress(tsv_bytes))
+
+    tsv_path = str(tmp_path / 'e1.tsv')
+    with open(tsv_path, 'wb') as f:
+        f.write(tsv_bytes)
+    with tarfile.open(str(drops / 'e.tar.gz'), 'w:gz') as archive:
+        archive.add(tsv_path, arcname='e/e1.tsv')
+
+    return str(drops), csv_bytes, tsv_bytes
+
+
+def test_get_file_list_from_dir_archives(tmp_path):
+    drops, csv_bytes, tsv_bytes = make_drops(tmp_path)
+
+    def path(name):
+        return os.path.join(drops, name)
+
+    assert sorted(get_file_list_from_dir(drops)) == sorted(
+        path(name) for name in os.listdir(drops)
+    )
+
+    expected = {
+        path('plain.csv'): csv_bytes,
+        path('a.csv.gz'): csv_bytes,
+        path('b.tsv.bz2'): tsv_bytes,
+        path('c.csv.xz'): csv_bytes,
+        path('d.zip') + '!/d1.csv': csv_bytes,
+        path('d.zip') + '!/nested/d2.tsv.gz': tsv_bytes,
+        path('e.tar.gz') + '!/e/e1.tsv': tsv_bytes,
+    }
+    file_list = get_file_list_from_dir(drops, expand_archives=True)
+    assert sorted(file_list) == sorted(expected)
+
+    for file_path, contents in expected.items():
+        with open_file(file_path) as f:
+            assert f.read() == contents
+
+    # The regex is matched against the names inside archives
+    assert sorted(get_file_list_from_dir(
+        drops, expand_archives=True, include_regex=r'.*\.tsv(\.[a-z0-9]+)?$'
+    )) == [
+        path('b.tsv.bz2'),
+        path('d.zip') + '!/nested/d2.tsv.gz',
+        path('e.tar.gz') + '!/e/e1.tsv',
+    ]
+
+    with pytest.raises(KeyError):
+        open_file(path('d.zip') + '!/missing.csv')
+    with pytest.raises(KeyError):
+        open_file(path('e.tar.gz') + '!/missing.csv')
+
+
+def test_iter_archive_members(tmp_path, monkeypatch):
+    drops, csv_bytes, tsv_bytes = make_drops(tmp_path)
+
+    tar_path = os.path.join(drops, 'f.tar.bz2')
+    with tarfile.open(tar_path, 'w:bz2') as archive:
+        for name, contents in [('f1.csv', csv_bytes),
+                               ('f/f2.tsv.gz', gzip.compress(tsv_bytes))]:
+            info = tarfile.TarInfo(name)
+            info.size = len(contents)
+            archive.addfile(info, io.BytesIO(contents))
+
+    file_list = get_file_list_from_dir(drops, expand_archives=True)
+    for archive_path in (os.path.join(drops, 'd.zip'), tar_path):
+        members = [
+            (file_path, f.read())
+            for file_path, f in iter_archive_members(archive_path)
+        ]
+
+        # The same virtual paths as the file list, in the same order
+        assert [file_path for file_path, _ in members] == [
+            file_path for file_path in file_list
+            if file_path.startswith(archive_path + '!/')
+        ]
+        for file_path, contents in members:
+            assert contents == (
+                csv_bytes if '.csv' in file_path else tsv_bytes
+            )
+
+    # Tar archives are read as a stream, so they are never searched
+    modes = []
+    tar_open = tarfile.open
+
+    def recording_open(name, mode='r', *args, **kwargs):
+        modes.append(mode)
+        return tar_open(name, mode, *args, **kwargs)
+
+    monkeypatch.setattr(tarfile, 'open', recording_open)
+
+    files = [f for _, f in iter_archive_members(tar_path)]
+    assert modes == ['r|*']
+    assert all(f.closed for f in files)
+
+
+def test_open_file_zstd(tmp_path):
+    zstandard = pytest.importorskip('zstandard')
+
+    with open('test_data/bad-data.csv', 'rb') as f:
+        contents = f.read()
+    file_path = str(tmp_path / 'a.csv.zst')
+    with open(file_path, 'wb') as f:
+        f.write(zstandard.ZstdCompressor().compress(contents))
+
+    with open_file(file_path) as f:
+        assert f.read() == contents
+
+
+def test_scan_compressed(tmp_path):
+    drops = make_drops(tmp_path)[0]
+
+    expected = scan_null_ratios(
+        'test_data/bad-data.csv', LABEL_FINGERPRINTS, label_match_thresh=2
+    )
+    for name in ('a.csv.gz', 'c.csv.xz', 'd.zip!/d1.csv'):
+        file_path = os.path.join(drops, name)
+        assert scan_null_ratios(
+            file_path, LABEL_FINGERPRINTS, label_match_thresh=2
+        ) == expected
+
+    expected = scan_column_labels(
+        'test_data/animals.tsv', {'commonname', 'ein'}, 2
+    )
+    for name in ('b.tsv.bz2', 'd.zip!/nested/d2.tsv.gz', 'e.tar.gz!/e/e1.tsv'):
+        file_path = os.path.join(drops, name)
+        assert scan_column_labels(
+            file_path, {'commonname', 'ein'}, 2
+        ) == expected
+
+
+def skewed_files(n, seed=0):
+    rng = random.Random(seed)
+    return {
+        'drop/{:05d}.csv'.format(i): int(rng.paretovariate(1.2) * 1000)
+        for i in range(n)
+    }
+
+
+@pytest.mark.parametrize('shard_count', [1, 3, 8])
+def test_shard_file_list(shard_count):
+    sizes = skewed_files(500)
+    file_list = list(sizes)
+
+    shards = shard_file_list(file_list, shard_count, sizes=sizes)
+
+    # Every file is in exactly one shard, in its original order
+    assert sorted(f for shard in shards for f in shard) == sorted(file_list)
+    for shard in shards:
+        assert shard == sorted(shard)
+
+    # Each worker computes the same shards, whatever the list order
+    shuffled = list(reversed(file_list))
+    for i, shard in enumerate(shards):
+        assert sorted(shard_file_list(
+            shuffled, shard_count, shard_index=i, sizes=sizes
+        )) == shard
+
+    loads = [sum(sizes[f] for f in shard) for shard in shards]
+    largest = max(sizes.values())
+    assert max(loads) <= max(
+        1.1 * sum(loads) / shard_count, largest
+    ) + largest
+
+
+def test_shard_file_list_balance():
+    sizes = skewed_files(200, seed=1)
+    file_list = list(sizes)
+    average = sum(sizes.values()) / 4
+
+    shards = shard_file_list(file_list, 4, sizes=sizes)
+    loads = [sum(sizes[f] for f in shard) for shard in shards]
+
+    # Splitting by position leaves one shard with far more than average
+    naive = [
+        sum(sizes[f] for f in file_list[i::4]) for i in range(4)
+    ]
+    assert max(loads) / average <= 1.1 + max(sizes.values()) / average
+    assert max(loads) < max(naive)
+
+
+def test_shard_file_list_stable():
+    sizes = skewed_files(1000, seed=2)
+    file_list = list(sizes)
+    before = shard_file_list(file_list, 8, sizes=sizes)
+
+    # A new small file only moves a few of the others
+    sizes['drop/new.csv'] = 500
+    after = shard_file_list(file_list + ['drop/new.csv'], 8, sizes=sizes)
+
+    shard_of = {f: i for i, shard in enumerate(before) for f in shard}
+    moved = [
+        f for i, shard in enumerate(after) for f in shard
+        if f in shard_of and shard_of[f] != i
+    ]
+    assert len(moved) < 0.05 * len(file_list)
+
+
+def test_shard_file_list_sizes(tmp_path):
+    drops = make_drops(tmp_path)[0]
+    file_list = get_file_list_from_dir(drops, expand_archives=True)
+
+    shards = shard_file_list(file_list, 2)
+    assert sorted(f for shard in shards for f in shard) == sorted(file_list)
+
+    sizes = {f: os.path.getsize(f) for f in file_list if '!/' not in f}
+    with zipfile.ZipFile(os.path.join(drops, 'd.zip')) as archive:
+        for info in archive.infolist():
+            sizes[os.path.join(drops, 'd.zip!/') + info.filename] = (
+                info.file_size
+            )
+    with tarfile.open(os.path.join(drops, 'e.tar.gz')) as archive:
+        sizes[os.path.join(drops, 'e.tar.gz!/e/e1.tsv')] = (
+            archive.getmember('e/e1.tsv').size
+        )
+    assert shard_file_list(file_list, 2, sizes=sizes) == shards
+
+    with pytest.raises(ValueError):
+        shard_file_list(file_list, 0)
+    with pytest.raises(ValueError):
+        shard_file_list(file_list, 2, shard_index=2)
+    with pytest.raises(ValueError):
+        shard_file_list(file_list, 2, sizes=[1])
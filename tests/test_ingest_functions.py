@@ -0,0 +1,479 @@
+import concurrent.futures
+import gzip
+import io
+import json
+import threading
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from etl_toolbox.dataframe_functions import dataframe_clean_null
+from etl_toolbox.dataframe_functions import find_column_labels
+from etl_toolbox.file_functions import get_file_list_from_dir
+from etl_toolbox.ingest_functions import clean_file_frame
+from etl_toolbox.ingest_functions import ingest_files
+from etl_toolbox.ingest_functions import normalize_files
+from etl_toolbox.ingest_functions import read_file
+from etl_toolbox.ingest_functions import read_json_batches
+from etl_toolbox.mapping_functions import map_labels, rename_duplicate_labels
+
+from tests.test_file_functions import make_drops
+
+
+LABEL_FINGERPRINTS = {'cust', 'emladdr', 'firstname', 'commonname'}
+
+
+@pytest.mark.parametrize('path, shape', [
+    ('test_data/animals.tsv', (38, 4)),
+    ('test_data/bad-data.csv', (11, 5)),
+    ('test_data/random_pii_4.json', (45, 5)),
+    ('test_data/test_dir/3.json', (0, 0)),
+    ('test_data/random_pii_3.xlsx', None)
+])
+def test_read_file(path, shape):
+    if path.endswith('.xlsx'):
+        pytest.importorskip('openpyxl')
+
+    df = read_file(path)
+
+    assert isinstance(df, pd.DataFrame)
+    if shape is not None:
+        assert df.shape == shape
+
+
+def test_read_file_compressed(tmp_path):
+    drops = make_drops(tmp_path)[0]
+    for file_path in get_file_list_from_dir(drops, expand_archives=True):
+        original = 'test_data/animals.tsv' if '.tsv' in file_path else (
+            'test_data/bad-data.csv'
+        )
+        pd.testing.assert_frame_equal(
+            read_file(file_path), read_file(original)
+        )
+
+    path = str(tmp_path / 'records.json.gz')
+    with open('test_data/random_pii_4.json', 'rb') as f, \
+            gzip.open(path, 'wb') as g:
+        g.write(f.read())
+
+    pd.testing.assert_frame_equal(
+        read_file(path), read_file('test_data/random_pii_4.json')
+    )
+    assert [df.shape for df in read_json_batches(path, batch_size=20)] == [
+        (20, 5), (20, 5), (5, 5)
+    ]
+
+
+def test_read_file_unrecognized():
+    with pytest.raises(ValueError):
+        read_file('test_data/test_dir/a')
+
+
+@pytest.mark.parametrize('max_concurrent_reads, max_queued, max_processing', [
+    (1, 1, 1),
+    (8, 4, 2),
+    (2, 1, 3)
+])
+def test_ingest_files(max_concurrent_reads, max_queued, max_processing):
+    file_paths = get_file_list_from_dir(
+        'test_data/', include_regex=r'.*\.(csv|tsv)$'
+    )
+
+    with concurrent.futures.ThreadPoolExecutor(max_processing) as executor:
+        results = ingest_files(
+            file_paths,
+            max_concurrent_reads=max_concurrent_reads,
+            max_queued=max_queued,
+            max_processing=max_processing,
+            executor=executor,
+            label_fingerprints=LABEL_FINGERPRINTS,
+            label_match_thresh=1
+        )
+
+    assert sorted(path for path, _ in results) == sorted(file_paths)
+
+    for path, result in results:
+        expected = read_file(path)
+        find_column_labels(expected, LABEL_FINGERPRINTS, label_match_thresh=1)
+        dataframe_clean_null(expected)
+
+        assert result.equals(expected)
+
+
+def test_ingest_files_default_executor():
+    file_paths = ['test_data/animals.tsv', 'test_data/test_dir/2.csv']
+
+    results = dict(ingest_files(file_paths, max_processing=2))
+
+    for path in file_paths:
+        assert results[path].equals(clean_file_frame(read_file(path)))
+
+
+def test_ingest_files_backpressure():
+    max_concurrent_reads = 2
+    max_queued = 1
+    max_processing = 1
+
+    lock = threading.Lock()
+    in_memory = [0]
+    peak = [0]
+    release = threading.Event()
+
+    def reader(path):
+        with lock:
+            in_memory[0] += 1
+            peak[0] = max(peak[0], in_memory[0])
+        return pd.DataFrame({'a': [path]})
+
+    def processor(df):
+        # Hold the only worker until many files could have been read
+        release.wait(1)
+        return df
+
+    def on_result(path, result):
+        with lock:
+            in_memory[0] -= 1
+        release.set()
+
+    with concurrent.futures.ThreadPoolExecutor(max_processing) as executor:
+        returned = ingest_files(
+            ('file_{}'.format(i) for i in range(20)),
+            reader=reader,
+            processor=processor,
+            on_result=on_result,
+            max_concurrent_reads=max_concurrent_reads,
+            max_queued=max_queued,
+            max_processing=max_processing,
+            executor=executor
+        )
+
+    assert returned is None
+    assert in_memory[0] == 0
+    assert peak[0] <= max_concurrent_reads + max_queued + max_processing
+
+
+def test_ingest_files_error():
+    def processor(df):
+        raise RuntimeError('bad file')
+
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        with pytest.raises(RuntimeError):
+            ingest_files(
+                ['test_data/animals.tsv', 'test_data/test_dir/1.csv'],
+                processor=processor,
+                executor=executor
+            )
+
+
+NORMALIZE_MAP = {
+    'firstname': 'first_name', 'lastname': 'last_name', 'email': 'email',
+    'email2': 'email', 'age': 'age', 'commonname': 'first_name'
+}
+NORMALIZE_SCHEMA = {
+    'first_name': object, 'last_name': object, 'email_1': object,
+    'email_2': object, 'age': float
+}
+
+
+def normalize_with_concat(paths, fingerprint_map, target_schema):
+    frames = []
+    for path in paths:
+        df = read_file(path)
+        labeled = not df.columns.equals(pd.RangeIndex(df.shape[1]))
+        df = clean_file_frame(
+            df, label_fingerprints=None if labeled else fingerprint_map,
+            label_match_thresh=1
+        )
+        df.columns = rename_duplicate_labels(
+            map_labels(df.columns, fingerprint_map)
+        )
+        df = df.loc[:, [c for c in df.columns if c in target_schema]]
+        frames.append(df.reindex(columns=list(target_schema)))
+
+    return pd.concat(frames, ignore_index=True).astype(target_schema)
+
+
+@pytest.mark.parametrize('paths', [
+    ['test_data/random_pii_2.csv', 'test_data/random_pii_5.csv'],
+    ['test_data/random_pii_5.csv', 'test_data/animals.tsv'] * 3,
+    # JSON files have no row estimate, so the buffers are grown
+    ['test_data/random_pii_4.json', 'test_data/random_pii_2.csv'] * 2
+])
+def test_normalize_files(paths):
+    expected = normalize_with_concat(paths, NORMALIZE_MAP, NORMALIZE_SCHEMA)
+
+    result = normalize_files(
+        paths, NORMALIZE_MAP, NORMALIZE_SCHEMA, label_match_thresh=1
+    )
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_column_buffers_growth():
+    from etl_toolbox.ingest_functions import _ColumnBuffers
+
+    buffers = _ColumnBuffers(
+        {'a': np.dtype(np.float64), 'b': np.dtype(object)}, 2
+    )
+    buffers.append({'a': np.array([1.0, 2.0])}, 2)
+    view = buffers.buffers['a'][:2]
+
+    buffers.append({'a': np.array([3.0]), 'b': np.array(['x'], dtype=object)},
+                   1)
+    buffers.close()
+
+    # Growing copies into new buffers, so earlier views stay valid
+    assert view.tolist() == [1.0, 2.0]
+
+    df = buffers.result()
+    assert df['a'].tolist() == [1.0, 2.0, 3.0]
+    assert df['b'].isna().tolist() == [True, True, False]
+
+
+def test_normalize_files_list_schema():
+    result = normalize_files(
+        ['test_data/random_pii_2.csv'], NORMALIZE_MAP, ['age', 'missing'],
+        label_match_thresh=1
+    )
+
+    assert result.columns.tolist() == ['age', 'missing']
+    assert result['age'].iloc[0] == '19'
+    assert result['missing'].isna().all()
+
+
+def test_normalize_files_exceptions():
+    with pytest.raises(ValueError):
+        normalize_files(
+            ['test_data/random_pii_5.csv'], NORMALIZE_MAP, {'age': int},
+            label_match_thresh=1
+        )
+
+    with pytest.raises(ValueError):
+        normalize_files(
+            ['test_data/random_pii_2.csv'], NORMALIZE_MAP,
+            {'first_name': float}, label_match_thresh=1
+        )
+
+
+def test_normalize_files_parquet(tmp_path):
+    pytest.importorskip('pyarrow')
+
+    paths = ['test_data/random_pii_2.csv', 'test_data/random_pii_5.csv']
+    output_path = str(tmp_path / 'normalized.parquet')
+
+    assert normalize_files(
+        paths, NORMALIZE_MAP, NORMALIZE_SCHEMA, output_path=output_path,
+        label_match_thresh=1
+    ) is None
+
+    expected = normalize_files(
+        paths, NORMALIZE_MAP, NORMALIZE_SCHEMA, label_match_thresh=1
+    )
+    result = pd.read_parquet(output_path)
+
+    pd.testing.assert_frame_equal(
+        result, expected.where(expected.notna(), None)
+    )
+
+
+def test_read_archive_in_one_pass(tmp_path, monkeypatch):
+    import tarfile
+
+    names = ['random_pii_2.csv', 'random_pii_5.csv', 'random_pii_4.json']
+    archive_path = str(tmp_path / 'drop.tar.gz')
+    with tarfile.open(archive_path, 'w:gz') as archive:
+        for name in names:
+            archive.add('test_data/' + name, arcname=name)
+
+    opened = []
+    tar_open = tarfile.open
+
+    def recording_open(name, *args, **kwargs):
+        opened.append(name)
+        return tar_open(name, *args, **kwargs)
+
+    monkeypatch.setattr(tarfile, 'open', recording_open)
+
+    paths = [archive_path + '!/' + name for name in names]
+    originals = ['test_data/' + name for name in names]
+
+    result = normalize_files(
+        paths, NORMALIZE_MAP, NORMALIZE_SCHEMA, label_match_thresh=1
+    )
+    pd.testing.assert_frame_equal(result, normalize_files(
+        originals, NORMALIZE_MAP, NORMALIZE_SCHEMA, label_match_thresh=1
+    ))
+    assert opened == [archive_path]
+
+    # Files before the last one read start another pass
+    del opened[:]
+    result = normalize_files(
+        paths[::-1] + ['test_data/animals.tsv'], NORMALIZE_MAP,
+        NORMALIZE_SCHEMA, label_match_thresh=1
+    )
+    pd.testing.assert_frame_equal(result, normalize_files(
+        originals[::-1] + ['test_data/animals.tsv'], NORMALIZE_MAP,
+        NORMALIZE_SCHEMA, label_match_thresh=1
+    ))
+    assert opened == [archive_path] * 3
+
+    del opened[:]
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        results = dict(ingest_files(
+            paths + originals, max_concurrent_reads=2, max_processing=1,
+            executor=executor
+        ))
+    assert opened == [archive_path]
+    for path, original in zip(paths, originals):
+        assert results[path].equals(results[original])
+
+    with pytest.raises(KeyError):
+        normalize_files(
+            [archive_path + '!/missing.csv'], NORMALIZE_MAP, NORMALIZE_SCHEMA
+        )
+
+
+NESTED_RECORDS = [
+    {'id': 1, 'name': ' n/a ', 'address': {'city': 'Oslo', 'geo': {
+        'lat': 59.91, 'lon': 10.75}}, 'tags': ['a', 'b']},
+    {'id': 2, 'name': 'Jane', 'address': {'city': 'null', 'geo': {
+        'lat': -1.5e-7, 'lon': 123456789012345}}, 'tags': []},
+    {'id': 3, 'name': 'x' * 500, 'address': {}, 'extra': None},
+    {'id': None, 'name': '--', 'address': {'city': '', 'geo': {}}},
+]
+
+
+def json_array(records):
+    return json.dumps(records, indent=2)
+
+
+def json_lines(records):
+    return '\n'.join(json.dumps(record) for record in records) + '\n'
+
+
+@pytest.mark.parametrize('dump', [json_array, json_lines])
+@pytest.mark.parametrize('chunk_size', [1, 7, 1 << 16])
+def test_read_json_batches(monkeypatch, dump, chunk_size):
+    from etl_toolbox import ingest_functions
+
+    # Small chunks split values across reads
+    iter_json_values = ingest_functions._iter_json_values
+    monkeypatch.setattr(
+        ingest_functions, '_iter_json_values',
+        lambda f, **kwargs: iter_json_values(
+            f, chunk_size=chunk_size, **kwargs
+        )
+    )
+
+    text = dump(NESTED_RECORDS)
+
+    def read(**kwargs):
+        batches = list(read_json_batches(io.StringIO(text), **kwargs))
+        assert all(len(df) <= kwargs.get('batch_size', 10000)
+                   for df in batches)
+        return pd.concat(batches, ignore_index=True)
+
+    expected = pd.json_normalize(NESTED_RECORDS)
+    raw = read(batch_size=3, clean=False)
+    pd.testing.assert_frame_equal(
+        raw[expected.columns], expected, check_dtype=False
+    )
+
+    dataframe_clean_null(expected, empty_column_thresh=0)
+    cleaned = read(batch_size=3)
+    pd.testing.assert_frame_equal(
+        cleaned[expected.columns], expected.reset_index(drop=True),
+        check_dtype=False
+    )
+
+
+class RecordingReader(io.StringIO):
+    def __init__(self, text):
+        super().__init__(text)
+        self.read_sizes = []
+
+    def read(self, size=-1):
+        self.read_sizes.append(size)
+        return super().read(size)
+
+
+def test_read_json_batches_read_size():
+    from etl_toolbox import ingest_functions
+
+    # Many records, but none larger than a chunk
+    records = [{'id': i, 'text': 'x' * (i % 100)} for i in range(50000)]
+    f = RecordingReader(json_lines(records))
+    values = list(ingest_functions._iter_json_values(f, chunk_size=1000))
+
+    assert len(values) == 50000
+    assert max(f.read_sizes) == 1000
+
+    # A record larger than a chunk grows the reads until it is decoded, and
+    # then they go back to the chunk size
+    records = [{'a': 1}, {'big': 'x' * 10000}, {'b': 2}] + [{'c': 3}] * 1000
+    f = RecordingReader(json_lines(records))
+    values = list(ingest_functions._iter_json_values(f, chunk_size=1000))
+
+    assert values == records
+    assert 8000 <= max(f.read_sizes) <= 16000
+    assert f.read_sizes[-3:] == [1000] * 3
+
+
+def test_read_json_batches_batches():
+    batches = list(
+        read_json_batches('test_data/random_pii_4.json', batch_size=20)
+    )
+    assert [df.shape for df in batches] == [(20, 5), (20, 5), (5, 5)]
+
+    assert list(read_json_batches('test_data/test_dir/3.json')) == []
+
+    df, = read_json_batches(
+        io.StringIO('1\n"a"\n{"a": {"b": 2}}\n'), columns=['value', 'a.b']
+    )
+    assert df['value'].tolist()[:2] == [1, 'a']
+    assert df['a.b'].tolist()[2] == 2
+
+
+@pytest.mark.parametrize('text', [
+    '[{"a": 1}, {"a": 2}',
+    '{"a": 1}\n{"a": ',
+    '{"a": 1} oops',
+    '[1 2, 3]',
+    '[1,, 2]',
+    '[1, 2,]',
+    '[, 1]',
+])
+def test_read_json_batches_invalid(text):
+    with pytest.raises(ValueError):
+        list(read_json_batches(io.StringIO(text)))
+
+
+def test_read_json_batches_array_separators():
+    df, = read_json_batches(io.StringIO(' [ 1 ,\n2 , 3 ] '), clean=False)
+    assert df['value'].tolist() == [1, 2, 3]
+
+    assert list(read_json_batches(io.StringIO('[ ]'))) == []
+
+
+def test_read_json_values_malformed_is_bounded():
+    from etl_toolbox import ingest_functions
+
+    # A malformed record near the start is reported without reading the
+    # rest of the file
+    lines = ['{"a": 1}', '{"a": tru}', '{"a": "x'] + ['{"a": 2}'] * 100000
+    f = RecordingReader('\n'.join(lines))
+    with pytest.raises(ValueError):
+        list(ingest_functions._iter_json_values(f, chunk_size=1000))
+    assert sum(f.read_sizes) <= 4000
+
+    # Values split across reads are still decoded
+    text = '{"a": true, "b": "' + 'x' * 5000 + '\\u00e9"}\n'
+    f = RecordingReader(text * 3)
+    values = list(ingest_functions._iter_json_values(f, chunk_size=7))
+    assert values == [{'a': True, 'b': 'x' * 5000 + u'\u00e9'}] * 3
+
+    with pytest.raises(ValueError):
+        list(ingest_functions._iter_json_values(
+            RecordingReader(text), chunk_size=100, max_value_bytes=1000
+        ))
@@ -0,0 +1,81 @@
+import importlib
+import subprocess
+import sys
+
+import pytest
+
+import etl_toolbox
+
+
+STARTUP_SCRIPT = '''
+import sys
+import time
+
+start = time.perf_counter()
+from etl_toolbox import clean_null, clean_whitespace, fingerprint, map_labels
+from etl_toolbox import get_file_list_from_dir
+light = time.perf_counter() - start
+
+heavy_modules = sorted({'numpy', 'pandas'} & set(sys.modules))
+
+start = time.perf_counter()
+import pandas
+heavy = time.perf_counter() - start
+
+print(heavy_modules, light, heavy)
+'''
+
+
+@pytest.mark.parametrize('name', etl_toolbox.__all__)
+def test_lazy_names(name):
+    module_name = etl_toolbox._MODULES[name]
+    try:
+        module = importlib.import_module('etl_toolbox.' + module_name)
+    except ImportError:
+        pytest.skip('optional dependency of {} is missing'.format(module_name))
+
+    assert getattr(etl_toolbox, name) is getattr(module, name)
+    assert name in dir(etl_toolbox)
+
+
+def test_lazy_modules():
+    assert etl_toolbox.dataframe_functions is importlib.import_module(
+        'etl_toolbox.dataframe_functions'
+    )
+
+    with pytest.raises(AttributeError):
+        etl_toolbox.not_a_function
+
+    with pytest.raises(ImportError):
+        from etl_toolbox import not_a_function  # noqa: F401
+
+
+def test_import_all():
+    names = dict(vars(etl_toolbox))
+    try:
+        etl_toolbox._import_all()
+
+        assert etl_toolbox.clean_null is importlib.import_module(
+            'etl_toolbox.cleaning_functions'
+        ).clean_null
+        assert 'dataframe_clean_null' in vars(etl_toolbox)
+        assert 'dataframe_functions' in vars(etl_toolbox)
+    finally:
+        for name in set(vars(etl_toolbox)) - set(names):
+            delattr(etl_toolbox, name)
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7),
+    reason='modules are imported eagerly without module __getattr__'
+)
+def test_startup_time():
+    output = subprocess.check_output(
+        [sys.executable, '-c', STARTUP_SCRIPT], universal_newlines=True
+    )
+    heavy_modules, light, heavy = output.rsplit(' ', 2)
+
+    # The scalar functions must not import pandas or numpy, and should take a
+    # small fraction of the time that importing pandas does
+    assert heavy_modules == '[]'
+    assert float(light) < float(heavy) / 4
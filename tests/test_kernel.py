@@ -0,0 +1,97 @@
+import random
+import re
+
+import pytest
+import numpy as np
+
+from etl_toolbox import _kernel
+from etl_toolbox.cleaning_functions import classify_null, fingerprint
+
+
+VALUES = [
+    None, float('nan'), '', ' ', 'A', 'None', 'N/A', '(>', '  null  ', 'x',
+    'False', '0', 'FALSE!', '00', 0, 0.0, 1, 1.5, True, False, [], [None],
+    ['x'], {'empty'}, (None, 'value'), '[None,None]', '{0.0}', '[None,0]',
+    '{"real_python_literal"}', '"quoted"', "'", 'Ünknown', 'naïve', 'nİ',
+    'K', 'e-mail', 'E_MAIL', 'a' * 1000, '-' * 1000
+]
+
+
+def python_fingerprint(x, special_characters=''):
+    remove_regex = r'[^0-9a-z{}]'.format(re.escape(special_characters))
+    return re.sub(remove_regex, '', str(x).lower())
+
+
+@pytest.mark.parametrize('special_characters', ['', '_', '#$', '-]^\\', 'ü'])
+def test_fingerprint_matches_python(special_characters):
+    rng = random.Random(0)
+    alphabet = 'aZ09 _-#$]^\\\tüK'
+    strings = VALUES[2:] + [
+        ''.join(rng.choice(alphabet) for _ in range(rng.randrange(20)))
+        for _ in range(500)
+    ]
+
+    for x in strings:
+        assert fingerprint(x, special_characters) == python_fingerprint(
+            x, special_characters
+        )
+
+
+def test_fnv1a_hashes():
+    # Reference values of the 64-bit FNV-1a hash
+    assert _kernel.fnv1a_hashes(['', 'a', 'foobar']).tolist() == [
+        0xcbf29ce484222325, 0xaf63dc4c8601ec8c, 0x85944171f73967e8
+    ]
+    assert _kernel.fnv1a_hashes([]).tolist() == []
+
+
+@pytest.mark.parametrize('special_characters', ['', '-'])
+def test_classify_values(special_characters):
+    values = VALUES * 3
+    classes = _kernel.null_classes()
+
+    hashes, codes = _kernel.classify_values(
+        values, special_characters, chunksize=7
+    )
+
+    expected_codes = [
+        classes.index(c) if c is not None else len(classes)
+        for c in (classify_null(x, special_characters) for x in values)
+    ]
+    expected_hashes = _kernel.fnv1a_hashes(
+        [fingerprint(x, special_characters) for x in values]
+    )
+
+    assert codes.tolist() == expected_codes
+    assert hashes.tolist() == expected_hashes.tolist()
+
+    python_hashes, python_codes = _kernel._classify_values_python(
+        values, special_characters
+    )
+    assert python_codes.tolist() == expected_codes
+    assert python_hashes.tolist() == expected_hashes.tolist()
+
+    _, array_codes = _kernel.classify_values(
+        np.array(values, dtype=object), special_characters, hashes=False
+    )
+    assert array_codes.tolist() == expected_codes
+
+
+def test_native_kernel():
+    speedups = pytest.importorskip('etl_toolbox._speedups')
+
+    assert _kernel.NATIVE
+
+    # Values the kernel can't classify exactly are left to Python
+    _, codes = speedups.classify_values(
+        ['abc', 'Ünknown', '[0]', 0, None],
+        '',
+        [x.encode('utf-8') for x in _kernel.NULL_INDICATORS],
+        [x.encode('utf-8') for x in _kernel.FALSEY_INDICATORS],
+    )
+    assert list(np.frombuffer(codes, dtype=np.int8)) == [
+        len(_kernel.null_classes()), -1, -1, -1, 0
+    ]
+
+    assert speedups.fingerprint('Ünknown', '') is None
+    assert speedups.fingerprint('(Aa_Bb_Cc)', '_') == 'aa_bb_cc'
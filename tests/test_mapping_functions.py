@@ -1,7 +1,11 @@
 import itertools
 import pytest
+import numpy as np
 
+from etl_toolbox import _kernel
 from etl_toolbox.mapping_functions import map_labels, rename_duplicate_labels
+from etl_toolbox.mapping_functions import hash_fingerprint_map
+from etl_toolbox.mapping_functions import hash_fingerprints
 
 
 ##
@@ -49,6 +53,82 @@ def test_map_labels_w_return_unmapped(labels, fingerprint_map, expected):
     assert map_labels(labels, fingerprint_map, return_unmapped=True) == expected
 
 
+@pytest.mark.parametrize("labels, fingerprint_map, special_characters", [
+    (
+        ['NAME1', 'NAME2', 'PHON#', None, 0],
+        {'name1': 'first_name', 'name2': 'last_name', 'phon': 'phone',
+         'none': 'none', '0': 0},
+        ''
+        ),
+    (
+        ['#', '$', 'EML_Addr', 'EML Addr', 'Ünknown', ''],
+        {'$': 'cost', '#': 'phone', 'emladdr': 'email', 'nknown': 'x'},
+        '$#'
+        )
+])
+def test_map_labels_w_hashed_fingerprint_map(labels, fingerprint_map,
+                                             special_characters):
+    hashed_map = hash_fingerprint_map(fingerprint_map)
+
+    assert map_labels(
+        labels, hashed_map, special_characters=special_characters,
+        return_unmapped=True
+    ) == map_labels(
+        labels, fingerprint_map, special_characters=special_characters,
+        return_unmapped=True
+    )
+
+
+def test_map_labels_transliterate():
+    labels = [u'Direcci\u00f3n', u'Stra\u00dfe', 'PHONE', u'\u00c9-mail', 5]
+    fingerprint_map = {
+        'direccion': 'address', 'strasse': 'street', 'phone': 'phone',
+        'email': 'email', '5': 'five',
+    }
+    expected = ['address', 'street', 'phone', 'email', 'five']
+
+    assert map_labels(labels, fingerprint_map, transliterate=True) == expected
+    assert map_labels(
+        labels, hash_fingerprint_map(fingerprint_map), transliterate=True
+    ) == expected
+
+    # Without transliterate, accented letters are dropped
+    assert map_labels(labels, fingerprint_map) == [
+        '-', '-', 'phone', '-', 'five'
+    ]
+
+
+@pytest.mark.parametrize('fingerprint_map', [
+    {'email': ('email', 'e'), 'phone': ('phone', 'p')},
+    {'email': ['email'], 'phone': ['phone']},
+    {'email': ('email', 'e')},
+])
+def test_hash_fingerprint_map_sequence_values(fingerprint_map):
+    hashed_map = hash_fingerprint_map(fingerprint_map)
+
+    assert hashed_map.values.shape == (len(fingerprint_map),)
+    assert map_labels(['E-mail', 'Phone', 'fax'], hashed_map) == map_labels(
+        ['E-mail', 'Phone', 'fax'], fingerprint_map
+    )
+
+
+def test_hash_fingerprints_collision(monkeypatch):
+    assert hash_fingerprints(['a', 'b', 'a']).tolist() == sorted(
+        _kernel.fnv1a_hashes(['a', 'b']).tolist()
+    )
+
+    monkeypatch.setattr(
+        _kernel, 'fnv1a_hashes',
+        lambda strings: np.zeros(len(strings), dtype=np.uint64)
+    )
+
+    with pytest.raises(ValueError):
+        hash_fingerprints(['a', 'b'])
+
+    with pytest.raises(ValueError):
+        hash_fingerprint_map({'a': 1, 'b': 2})
+
+
 ##
 ## rename_duplicate_labels() tests
 ##
@@ -0,0 +1,183 @@
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from etl_toolbox.dataframe_functions import merge_columns_by_label
+
+pa = pytest.importorskip('pyarrow')
+
+import pyarrow.dataset as ds  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from etl_toolbox.parquet_functions import PartitionedParquetWriter  # noqa: E402,E501
+from etl_toolbox.parquet_functions import write_parquet_dataset  # noqa: E402
+
+
+def read_dataset(root_path):
+    table = ds.dataset(root_path, partitioning='hive').to_table()
+    return table.to_pandas()
+
+
+def frames(count=10, rows=100):
+    for i in range(count):
+        ids = np.arange(i * rows, (i + 1) * rows)
+        yield pd.DataFrame({
+            'id': ids,
+            'state': np.array(['NY', 'CA', 'TX'])[ids % 3],
+            'status': np.array(['active', 'closed'])[ids % 2],
+            'name': ['name {}'.format(x) for x in ids],
+        })
+
+
+def test_write_parquet_dataset(tmp_path):
+    root_path = str(tmp_path / 'dataset')
+    files = write_parquet_dataset(frames(), root_path, ['state'])
+
+    assert sorted(os.listdir(root_path)) == [
+        'state=CA', 'state=NY', 'state=TX'
+    ]
+    assert len(files) == 3
+    assert all(os.path.exists(path) for path in files)
+
+    df = read_dataset(root_path).sort_values('id', ignore_index=True)
+    expected = pd.concat(frames(), ignore_index=True)
+    assert df['id'].tolist() == expected['id'].tolist()
+    assert df['name'].tolist() == expected['name'].tolist()
+    assert df['status'].tolist() == expected['status'].tolist()
+    assert df['state'].astype(str).tolist() == expected['state'].tolist()
+
+
+def test_row_group_sizing(tmp_path):
+    root_path = str(tmp_path / 'dataset')
+    row_group_bytes = 5000
+
+    files = write_parquet_dataset(
+        frames(count=20, rows=50), root_path, row_group_bytes=row_group_bytes
+    )
+    assert len(files) == 1
+
+    metadata = pq.ParquetFile(files[0]).metadata
+    assert metadata.num_rows == 1000
+    assert metadata.num_row_groups > 1
+
+    table = pq.read_table(files[0])
+    row_bytes = table.nbytes / table.num_rows
+    sizes = [metadata.row_group(i).num_rows
+             for i in range(metadata.num_row_groups)]
+    # Every row group but the last reaches the target size
+    for size in sizes[:-1]:
+        assert size * row_bytes >= row_group_bytes * 0.9
+        assert size * row_bytes < row_group_bytes + 50 * row_bytes * 1.1
+
+
+def test_max_buffered_bytes(tmp_path):
+    root_path = str(tmp_path / 'dataset')
+
+    with PartitionedParquetWriter(
+        root_path, ['state'], row_group_bytes=10**9, max_buffered_bytes=10000
+    ) as writer:
+        for df in frames():
+            writer.write(df)
+            assert writer._buffered_bytes <= 10000
+
+    assert len(read_dataset(root_path)) == 1000
+
+
+def test_dictionary_encoding(tmp_path):
+    root_path = str(tmp_path / 'dataset')
+    df = next(frames(rows=1000))
+    df['category'] = df['status'].astype('category')
+
+    files = write_parquet_dataset([df], root_path)
+
+    metadata = pq.ParquetFile(files[0]).metadata.row_group(0)
+    encodings = {
+        metadata.column(i).path_in_schema: metadata.column(i).encodings
+        for i in range(metadata.num_columns)
+    }
+    assert 'RLE_DICTIONARY' in encodings['status']
+    assert 'RLE_DICTIONARY' in encodings['category']
+    assert 'RLE_DICTIONARY' not in encodings['name']
+    assert 'RLE_DICTIONARY' not in encodings['id']
+
+
+def test_merged_list_columns(tmp_path):
+    root_path = str(tmp_path / 'dataset')
+    df = pd.DataFrame(
+        [['a@a.com', 'b@b.com', 'NY'],
+         [np.nan, 'c@c.com', 'CA'],
+         [np.nan, np.nan, 'CA']],
+        columns=['email', 'email', 'state'],
+    )
+    merge_columns_by_label(df)
+
+    write_parquet_dataset([df], root_path, ['state'])
+
+    schema = ds.dataset(root_path, partitioning='hive').schema
+    assert pa.types.is_list(schema.field('email').type)
+
+    result = read_dataset(root_path).sort_values('state')
+    assert [
+        None if x is None else list(x) for x in result['email']
+    ] == [['c@c.com'], [], ['a@a.com', 'b@b.com']]
+
+
+def test_mixed_and_null_columns(tmp_path):
+    root_path = str(tmp_path / 'dataset')
+
+    with PartitionedParquetWriter(root_path, ['state']) as writer:
+        writer.write(pd.DataFrame({
+            'state': ['NY', None],
+            'mixed': [1, 'a'],
+            'empty': [None, None],
+            'sparse': pd.arrays.SparseArray([np.nan, 1.0]),
+        }))
+        # Missing columns are written as nulls
+        writer.write(pd.DataFrame({'state': ['NY'], 'empty': ['x']}))
+
+        with pytest.raises(ValueError):
+            writer.write(pd.DataFrame({'state': ['NY'], 'new': [1]}))
+        with pytest.raises(ValueError):
+            writer.write(pd.DataFrame({'mixed': [1]}))
+        with pytest.raises(ValueError):
+            writer.write(pd.DataFrame([[1, 2]], columns=['state', 'state']))
+
+    assert sorted(os.listdir(root_path)) == [
+        'state=NY', 'state=__HIVE_DEFAULT_PARTITION__'
+    ]
+
+    table = ds.dataset(root_path, partitioning='hive').to_table()
+    assert table.schema.field('mixed').type == pa.string()
+    assert table.schema.field('empty').type == pa.string()
+
+    rows = sorted(table.to_pylist(), key=lambda row: str(row['state']))
+    assert [row['mixed'] for row in rows] == ['1', None, 'a']
+    assert [row['empty'] for row in rows] == [None, 'x', None]
+    assert [row['sparse'] for row in rows] == [None, None, 1.0]
+
+
+def test_partition_values_are_quoted(tmp_path):
+    root_path = str(tmp_path / 'dataset')
+    write_parquet_dataset(
+        [pd.DataFrame({'city': ['New York', 'a/b'], 'x': [1, 2]})],
+        root_path, ['city']
+    )
+
+    assert sorted(os.listdir(root_path)) == ['city=New%20York', 'city=a%2Fb']
+
+    df = read_dataset(root_path).sort_values('x')
+    assert df['city'].astype(str).tolist() == ['New York', 'a/b']
+
+
+def test_max_open_files(tmp_path):
+    root_path = str(tmp_path / 'dataset')
+
+    files = write_parquet_dataset(
+        frames(), root_path, ['state'], row_group_bytes=1, max_open_files=1
+    )
+
+    # Each partition starts a new file after another partition is written
+    assert len(files) > 3
+    assert len(read_dataset(root_path)) == 1000
@@ -0,0 +1,149 @@
+import concurrent.futures
+import functools
+
+import pytest
+import pandas as pd
+import numpy as np
+
+from etl_toolbox.dataframe_functions import dataframe_clean_null
+from etl_toolbox.partition_functions import map_partitions
+from etl_toolbox.partition_functions import partitioned_clean_null
+from etl_toolbox.partition_functions import partitioned_clean_whitespace
+from etl_toolbox.partition_functions import partitioned_map_labels
+
+
+ROWS = [
+    ['AAA', None, '111-111-1111', 'empty', '0'],
+    ['BAA', 'baa@baa.com', '-', '-', 'x'],
+    ['CAA', 'caa@caa.com', 'notavailable', '...', 'null'],
+    ['null', 'blocked', 'false', 'n/a', ''],
+    ['EAA', 'none', '444-444-4444', 'null', None],
+    ['FAA', 'none', 'none', 'null', 'false'],
+    ['GAA', 'gaa@gaa.com', None, 'null', '0']
+]
+COLUMNS = ['id', 'email', 'phone', 'col4', 'col5']
+
+
+def make_partitions(kind):
+    frames = [
+        pd.DataFrame(ROWS[:3], columns=COLUMNS),
+        pd.DataFrame(ROWS[3:5], columns=COLUMNS, index=[3, 4]),
+        pd.DataFrame(ROWS[5:], columns=COLUMNS, index=[5, 6])
+    ]
+
+    if kind == 'loaders':
+        return [functools.partial(frame.copy) for frame in frames]
+
+    return frames
+
+
+@pytest.mark.parametrize('empty_row_thresh, empty_column_thresh', [
+    (1, 1),
+    (2, 1),
+    (0, 2),
+    (3, 2),
+    (1, 0)
+])
+@pytest.mark.parametrize('falsey_is_null', [False, True])
+@pytest.mark.parametrize('kind', ['frames', 'loaders'])
+@pytest.mark.parametrize('use_executor', [False, True])
+def test_partitioned_clean_null(
+    empty_row_thresh, empty_column_thresh, falsey_is_null, kind, use_executor
+):
+    kwargs = {
+        'empty_row_thresh': empty_row_thresh,
+        'empty_column_thresh': empty_column_thresh,
+        'falsey_is_null': falsey_is_null
+    }
+
+    expected = pd.DataFrame(ROWS, columns=COLUMNS)
+    dataframe_clean_null(expected, **kwargs)
+
+    partitions = make_partitions(kind)
+    originals = [
+        df.copy() for df in partitions if isinstance(df, pd.DataFrame)
+    ]
+
+    if use_executor:
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            result = list(partitioned_clean_null(
+                partitions, executor=executor, max_pending=2, **kwargs
+            ))
+    else:
+        result = list(partitioned_clean_null(partitions, **kwargs))
+
+    result = pd.concat(result).reset_index(drop=True)
+
+    assert result.equals(expected)
+    assert result.columns.equals(expected.columns)
+
+    # Frames that were passed in are never changed
+    for df, original in zip(partitions, originals):
+        assert df.equals(original)
+
+
+def test_partitioned_clean_null_dask():
+    dd = pytest.importorskip('dask.dataframe')
+
+    ddf = dd.from_pandas(pd.DataFrame(ROWS, columns=COLUMNS), npartitions=3)
+
+    expected = pd.DataFrame(ROWS, columns=COLUMNS)
+    dataframe_clean_null(expected, empty_column_thresh=2)
+
+    result = partitioned_clean_null(ddf, empty_column_thresh=2)
+
+    assert isinstance(result, dd.DataFrame)
+
+    result = result.compute(scheduler='synchronous').reset_index(drop=True)
+
+    assert result.equals(expected)
+
+
+def test_partitioned_clean_whitespace():
+    partitions = [
+        pd.DataFrame({'a': [' x  y ', 1], 'b': [1.5, 2.5]}),
+        pd.DataFrame({'a': ['z\t\tz'], 'b': [np.nan]})
+    ]
+
+    result = list(partitioned_clean_whitespace(partitions))
+
+    assert result[0]['a'].tolist() == ['x y', 1]
+    assert result[1]['a'].tolist() == ['z z']
+    assert partitions[0]['a'].tolist() == [' x  y ', 1]
+
+
+def test_partitioned_map_labels():
+    dd = pytest.importorskip('dask.dataframe')
+
+    df = pd.DataFrame([[1, 2, 3]], columns=['E-mail', 'PHONE', 'other'])
+    fingerprint_map = {'email': 'email', 'phone': 'phone'}
+
+    for partitions in (
+        [df],
+        dd.from_pandas(df, npartitions=1)
+    ):
+        result = partitioned_map_labels(partitions, fingerprint_map)
+
+        if isinstance(result, dd.DataFrame):
+            assert result.columns.tolist() == ['email', 'phone', '-']
+            result = [result.compute(scheduler='synchronous')]
+
+        assert list(result)[0].columns.tolist() == ['email', 'phone', '-']
+
+
+def test_map_partitions_max_pending():
+    submitted = []
+
+    def func(df):
+        submitted.append(df)
+        return len(submitted)
+
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        results = map_partitions(
+            [pd.DataFrame()] * 5, func, executor=executor, max_pending=2
+        )
+
+        assert next(results) == 1
+        # Only max_pending partitions are submitted before the first result
+        assert len(submitted) <= 2
+        assert list(results) == [2, 3, 4, 5]
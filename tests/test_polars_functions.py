@@ -0,0 +1,157 @@
+import pytest
+import pandas as pd
+
+from etl_toolbox import dataframe_functions
+from etl_toolbox.cleaning_functions import fingerprint
+
+pl = pytest.importorskip('polars')
+
+from etl_toolbox.polars_functions import dataframe_clean_null  # noqa: E402
+from etl_toolbox.polars_functions import find_column_labels  # noqa: E402
+from etl_toolbox.polars_functions import fingerprint_expr  # noqa: E402
+
+
+@pytest.mark.parametrize("input, special_characters", [
+    ('(Aa_Bb_Cc)',              ''),
+    (' sdfD 432   ^%',          ''),
+    ('F\nP\n\t\tZ    ',         ''),
+    (u'aãaaåa�', ''),
+    ('Phone#',                  '#'),
+    ('\\backslashes\\',         '\\'),
+    ('%(MULTIPLE$@()_-]^',      '%_@(-]^')
+])
+def test_fingerprint_expr(input, special_characters):
+    df = pl.DataFrame({'x': [input]})
+
+    result = df.select(fingerprint_expr(pl.col('x'), special_characters))
+
+    assert result['x'][0] == fingerprint(input, special_characters)
+
+
+ROWS = [
+    ['AAA', None, '111-111-1111', 'empty', 0, 1.5],
+    ['BAA', 'baa@baa.com', '-', '-', 1, 0.0],
+    ['CAA', 'caa@caa.com', 'notavailable', '...', 2, None],
+    ['null', 'blocked', 'false', 'n/a', 0, None],
+    ['EAA', 'none', '444-444-4444', 'null', 0, 2.5]
+]
+COLUMNS = ['id', 'email', 'phone', 'col4', 'count', 'amount']
+
+
+@pytest.mark.parametrize('empty_row_thresh, empty_column_thresh', [
+    (1, 1),
+    (2, 1),
+    (0, 2),
+    (3, 2),
+    (1, 0)
+])
+@pytest.mark.parametrize('falsey_is_null', [False, True])
+@pytest.mark.parametrize('lazy', [False, True])
+def test_dataframe_clean_null(
+    empty_row_thresh, empty_column_thresh, falsey_is_null, lazy
+):
+    df = pl.DataFrame(ROWS, schema=COLUMNS, orient='row')
+    if lazy:
+        df = df.lazy()
+
+    expected = pd.DataFrame(ROWS, columns=COLUMNS)
+    dataframe_functions.dataframe_clean_null(
+        expected,
+        empty_row_thresh=empty_row_thresh,
+        empty_column_thresh=empty_column_thresh,
+        falsey_is_null=falsey_is_null,
+    )
+
+    # Polars frames are dispatched by the dataframe_functions module
+    result = dataframe_functions.dataframe_clean_null(
+        df,
+        empty_row_thresh=empty_row_thresh,
+        empty_column_thresh=empty_column_thresh,
+        falsey_is_null=falsey_is_null,
+    )
+
+    assert isinstance(result, type(df))
+    if lazy:
+        result = result.collect()
+
+    assert result.columns == expected.columns.tolist()
+    assert result.to_pandas().isna().equals(expected.isna())
+
+
+def test_dataframe_clean_null_lists():
+    df = pl.DataFrame({
+        'a': [['empty', None], [], ['x', None], None],
+        'b': ['b', 'b', 'b', 'b']
+    })
+
+    result = dataframe_clean_null(df)
+
+    assert result['a'].is_null().to_list() == [True, True, False, True]
+
+
+def test_dataframe_clean_null_nan():
+    data = {'a': [1.0, float('nan'), None], 'b': ['x', 'none', 'y']}
+
+    expected = pd.DataFrame(data)
+    dataframe_functions.dataframe_clean_null(expected)
+
+    result = dataframe_clean_null(pl.DataFrame(data))
+
+    assert result.columns == expected.columns.tolist()
+    assert result.to_pandas().isna().equals(expected.isna())
+    assert result['a'].to_list() == [1.0, None]
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_find_column_labels(lazy):
+    df = pl.DataFrame(
+        [
+            ['', 'created by: ', 'Brookcub Industries', None],
+            ['Dte', '2020-06-07', '3 rows', None],
+            ['EML-addr', 'Dte', 'phn-nmbr', 'EML-addr'],
+            ['test@test.com', '04mar14', '999-333-4444', 'AAA'],
+            ['green@green.com', None, '111-222-3333', 'BAA']
+        ],
+        orient='row'
+    )
+    if lazy:
+        df = df.lazy()
+
+    result = dataframe_functions.find_column_labels(
+        df, {'emladdr', 'dte', 'phnnmbr'}
+    )
+
+    assert isinstance(result, type(df))
+    if lazy:
+        result = result.collect()
+
+    assert result.columns == ['EML-addr_1', 'Dte', 'phn-nmbr', 'EML-addr_2']
+    assert result.rows() == [
+        ('test@test.com', '04mar14', '999-333-4444', 'AAA'),
+        ('green@green.com', None, '111-222-3333', 'BAA')
+    ]
+
+
+def test_find_column_labels_already_correct():
+    df = pl.DataFrame({'email': ['a'], 'date': ['b'], 'phone': ['c']})
+
+    assert find_column_labels(df, {'email', 'date', 'phone'}) is df
+
+
+@pytest.mark.parametrize('label_match_thresh, exception_type', [
+    (3, IndexError),
+    (0, ValueError)
+])
+def test_find_column_labels_exceptions(label_match_thresh, exception_type):
+    df = pl.DataFrame([['email', 'date', 'x'], ['a', 'b', 'c']], orient='row')
+
+    with pytest.raises(exception_type):
+        find_column_labels(
+            df, {'email', 'date'}, label_match_thresh=label_match_thresh
+        )
+
+
+def test_merge_columns_by_label():
+    df = pl.DataFrame({'email': ['a'], 'email_2': ['b']})
+
+    assert dataframe_functions.merge_columns_by_label(df) is df
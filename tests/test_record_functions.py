@@ -0,0 +1,132 @@
+import csv
+import itertools
+
+import pytest
+
+from etl_toolbox.cleaning_functions import clean_null, clean_whitespace
+from etl_toolbox.record_functions import clean_records
+
+
+VALUES = [
+    ' aaa ', 'n/a', None, float('nan'), 5, 0, 'False', ' -- ', [None],
+    'Jane\t\n Doe', '{None, None}', 'Ünknown', '', 1.5, True, '0'
+]
+
+
+def scalar_clean(x, falsey_is_null=False):
+    return clean_null(clean_whitespace(x), falsey_is_null=falsey_is_null)
+
+
+@pytest.mark.parametrize('falsey_is_null', [False, True])
+@pytest.mark.parametrize('batch_size', [1, 3, 1024])
+def test_clean_records_matches_scalar(falsey_is_null, batch_size):
+    records = [
+        {'a': x, 'b': y} for x, y in zip(VALUES, VALUES[::-1])
+    ] + [tuple(VALUES)]
+
+    expected = [
+        {'a': scalar_clean(x, falsey_is_null),
+         'b': scalar_clean(y, falsey_is_null)}
+        for x, y in zip(VALUES, VALUES[::-1])
+    ] + [tuple(scalar_clean(x, falsey_is_null) for x in VALUES)]
+
+    result = list(clean_records(
+        records, falsey_is_null=falsey_is_null, empty_record_thresh=0,
+        batch_size=batch_size
+    ))
+
+    assert result == expected
+
+
+def test_clean_records_empty_record_thresh():
+    records = [('a', None, 'b'), ('n/a', '', 'c'), ('null', None, '[]')]
+
+    assert list(clean_records(records)) == [
+        ('a', None, 'b'), (None, None, 'c')
+    ]
+    assert list(clean_records(records, empty_record_thresh=2)) == [
+        ('a', None, 'b')
+    ]
+    assert len(list(clean_records(records, empty_record_thresh=0))) == 3
+
+
+def test_clean_records_dict_reader():
+    fingerprint_map = {
+        'id': 'id', 'firstname': 'name', 'email': 'email', 'email2': 'email'
+    }
+
+    with open('test_data/random_pii_5.csv', newline='',
+              encoding='utf-8-sig') as f:
+        result = list(
+            clean_records(csv.DictReader(f), fingerprint_map, batch_size=16)
+        )
+
+    with open('test_data/random_pii_5.csv', newline='',
+              encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+
+    assert len(result) == len(rows)
+    for record, row in zip(result, rows):
+        assert list(record) == ['id', 'name', 'email_1', 'email_2']
+        assert record['email_2'] == clean_null(row['email2'])
+        assert record['name'] == clean_null(row['first_name'])
+
+
+def test_clean_records_labels():
+    records = [['  Jane ', 'jane@aaa.com', 'x'], ['n/a', 'none', 'y']]
+
+    assert list(clean_records(
+        records, {'name': 'name', 'eml': 'email'}, labels=['Name', 'EML', 'z']
+    )) == [{'name': 'Jane', 'email': 'jane@aaa.com'}]
+
+    assert list(clean_records(
+        records, labels=['a', 'b', 'c'], whitespace=False
+    )) == [
+        {'a': '  Jane ', 'b': 'jane@aaa.com', 'c': 'x'},
+        {'a': None, 'b': None, 'c': 'y'},
+    ]
+
+
+def test_clean_records_ragged_rows():
+    rows = list(csv.reader([
+        'Name,EML,z\n', ' Jane ,jane@aaa.com\n', 'n/a\n',
+        'John,john@aaa.com,x,extra, n/a \n',
+    ]))
+    labels, records = rows[0], rows[1:]
+
+    # Short rows are padded, and extra values are dropped
+    assert list(clean_records(records, labels=labels)) == [
+        {'Name': 'Jane', 'EML': 'jane@aaa.com', 'z': None},
+        {'Name': 'John', 'EML': 'john@aaa.com', 'z': 'x'},
+    ]
+
+    assert list(clean_records(
+        records, {'name': 'name', 'eml': 'email', 'z': 'z'}, labels=labels,
+        rest_label='rest'
+    )) == [
+        {'name': 'Jane', 'email': 'jane@aaa.com', 'z': None},
+        {'name': 'John', 'email': 'john@aaa.com', 'z': 'x',
+         'rest': ['extra', None]},
+    ]
+
+    # Extra values count as populated
+    assert list(clean_records(
+        [['n/a', 'x']], labels=['a'], rest_label='rest'
+    )) == [{'a': None, 'rest': ['x']}]
+
+
+def test_clean_records_is_lazy():
+    consumed = []
+
+    def records():
+        for i in itertools.count():
+            consumed.append(i)
+            yield {'n': i, 'empty': 'null'}
+
+    cleaned = clean_records(records(), batch_size=10)
+
+    assert next(cleaned) == {'n': 0, 'empty': None}
+    assert len(consumed) == 10
+
+    assert [r['n'] for r in itertools.islice(cleaned, 14)] == list(range(1, 15))
+    assert len(consumed) == 20
@@ -0,0 +1,103 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from etl_toolbox.cleaning_functions import clean_null, clean_whitespace
+from etl_toolbox.cleaning_functions import fingerprint
+from etl_toolbox.rule_functions import apply_rules, compile_rules
+from etl_toolbox.rule_functions import _column_plan
+
+
+VALUES = [
+    '  AAA@aaa.COM ', 'n/a', None, np.nan, 5, 0, 'False', ' -- ',
+    'Jane\t\n Doe', ' x y ', ['a'], 'Ünknown', '', 1.5, True
+]
+
+
+def scalar_clean_null(x):
+    x = clean_null(x)
+    return np.nan if x is None else x
+
+
+@pytest.mark.parametrize('steps, functions', [
+    (['clean_whitespace'], [clean_whitespace]),
+    (['strip', 'lower'], [lambda x: x.strip().lower() if isinstance(x, str)
+                          else x]),
+    (['upper'], [lambda x: x.upper() if isinstance(x, str) else x]),
+    (['fingerprint'], [fingerprint]),
+    (['clean_whitespace', 'clean_null'], [clean_whitespace, scalar_clean_null]),
+    (['clean_null', 'fingerprint'], [scalar_clean_null, fingerprint]),
+    (['lower', 'fingerprint', 'upper', repr],
+     [lambda x: x.lower() if isinstance(x, str) else x, fingerprint,
+      lambda x: x.upper(), repr]),
+])
+def test_apply_rules_matches_applymap(steps, functions):
+    df = pd.DataFrame({'a': VALUES, 'b': VALUES[::-1]})
+
+    expected = df.copy()
+    for function in functions:
+        expected = expected.applymap(function)
+
+    result = apply_rules(df, {'*': steps}, return_new=True)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_apply_rules_selectors():
+    df = pd.DataFrame(
+        [[' A ', ' B ', ' C ', ' D ', 1]],
+        columns=['email_1', 'email_2', 'name', 'email_1', 0]
+    )
+
+    apply_rules(df, {
+        'email*': ['strip'],
+        'email_1': ['lower'],
+        0: [lambda x: x + 1],
+        'n?me': [str.lower],
+    })
+
+    assert df.values.tolist() == [['a', 'B', ' c ', 'd', 2]]
+    assert df.columns.tolist() == ['email_1', 'email_2', 'name', 'email_1', 0]
+
+
+def test_apply_rules_non_string_columns():
+    df = pd.DataFrame({
+        'x': [0.0, 1.5, np.nan],
+        'y': pd.array(['  A', None, 'null'], dtype='string'),
+    })
+
+    apply_rules(df, {'*': ['strip', 'lower', 'clean_null']},
+                falsey_is_null=True)
+
+    assert df['x'].isna().tolist() == [True, False, True]
+    assert df['y'].tolist()[0] == 'a'
+    assert df['y'].isna().tolist() == [False, True, True]
+
+
+def test_compile_rules_cache():
+    spec = {'a': ['clean_whitespace', 'lower'], 'b*': ['clean_null']}
+    plan = compile_rules(spec)
+
+    assert compile_rules(dict(spec)) is plan
+    assert compile_rules(plan) is plan
+
+    # Consecutive string steps are fused, across rules too
+    assert [
+        [kind for kind, _ in stages]
+        for stages in _column_plan(plan, ('a', 'b1', 'c'))
+    ] == [['strings'], ['null'], []]
+
+    plan = compile_rules({'a': ['strip'], '*': ['lower', 'clean_null']})
+    stages = _column_plan(plan, ('a',))[0]
+    assert [kind for kind, _ in stages] == ['strings', 'null']
+    assert len(stages[0][1]) == 2
+
+    hits = _column_plan.cache_info().hits
+    apply_rules(pd.DataFrame({'a': ['X'], 'z': ['X']}), plan)
+    apply_rules(pd.DataFrame({'a': ['Y'], 'z': ['Y']}), plan)
+    assert _column_plan.cache_info().hits == hits + 1
+
+
+def test_compile_rules_exceptions():
+    with pytest.raises(ValueError):
+        compile_rules({'a': ['clean_whitespace', 'titlecase']})